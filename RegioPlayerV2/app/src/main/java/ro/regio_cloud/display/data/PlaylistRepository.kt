@@ -10,11 +10,13 @@ import kotlinx.coroutines.flow.firstOrNull
 import ro.regio_cloud.display.network.ApiService
 import ro.regio_cloud.display.network.ClientPlaylistItem
 import ro.regio_cloud.display.network.ClientPlaylistResponse
+import ro.regio_cloud.display.network.ManifestPush
 import ro.regio_cloud.display.network.PlaybackLog
 import ro.regio_cloud.display.network.ScreenRegister
 import java.io.File
 import java.io.FileOutputStream
 import java.io.IOException
+import java.security.MessageDigest
 
 class ScreenNotActivatedException(message: String = "Ecranul nu este încă activat.") : Exception(message)
 class ScreenNotFoundException(message: String = "Ecranul nu a fost găsit pe server (șters).") : Exception(message)
@@ -70,66 +72,7 @@ class PlaylistRepository(
             when (response.code()) {
                 200 -> {
                     val newPlaylist = response.body()!!
-                    userPrefsRepo.saveScreenName(newPlaylist.screenName)
-                    userPrefsRepo.savePlaylistName(newPlaylist.name)
-
-                    // --- Logica de sincronizare rotație ---
-                    val serverTimestamp = newPlaylist.rotationUpdatedAt
-                    val localTimestamp = userPrefsRepo.rotationTimestampFlow.firstOrNull()
-                    val currentRotation = userPrefsRepo.rotationFlow.firstOrNull() ?: 0
-                    
-                    Log.d("RepoSync", "=== VERIFICARE ROTAȚIE ===")
-                    Log.d("RepoSync", "Rotație server: ${newPlaylist.rotation}°")
-                    Log.d("RepoSync", "Rotație locală: $currentRotation°")
-                    Log.d("RepoSync", "Timestamp server: $serverTimestamp")
-                    Log.d("RepoSync", "Timestamp local: $localTimestamp")
-                    
-                    if (serverTimestamp != null && newPlaylist.rotation != null) {
-                        // SIMPLIFICARE: Verificăm dacă rotațiile sunt diferite
-                        val rotationChanged = newPlaylist.rotation != currentRotation
-                        
-                        val shouldUpdate = if (rotationChanged) {
-                            Log.d("RepoSync", "Rotația s-a schimbat ($currentRotation° -> ${newPlaylist.rotation}°)")
-                            true
-                        } else if (localTimestamp == null) {
-                            Log.d("RepoSync", "Local timestamp este null - se inițializează")
-                            true
-                        } else {
-                            try { 
-                                val serverInstant = java.time.Instant.parse(serverTimestamp)
-                                val localInstant = java.time.Instant.parse(localTimestamp)
-                                val isNewer = serverInstant > localInstant
-                                Log.d("RepoSync", "Server instant: $serverInstant")
-                                Log.d("RepoSync", "Local instant: $localInstant")
-                                Log.d("RepoSync", "Server mai nou? $isNewer")
-                                isNewer
-                            } catch (e: Exception) { 
-                                Log.w("RepoSync", "Eroare parsare timestamp: ${e.message}")
-                                true // În caz de eroare, actualizăm cu valoarea de pe server
-                            }
-                        }
-                        
-                        if (shouldUpdate) {
-                            userPrefsRepo.saveRotation(newPlaylist.rotation, serverTimestamp)
-                            Log.i("RepoSync", "✅ Rotație actualizată de la server: ${newPlaylist.rotation}°")
-                        } else {
-                            Log.i("RepoSync", "❌ Nu se actualizează rotația - aceeași valoare și timestamp local mai nou")
-                        }
-                    } else {
-                        Log.w("RepoSync", "Server timestamp sau rotație este null - nu se actualizează")
-                    }
-
-                    if (newPlaylist.name.contains("Ecran Neactivat", ignoreCase = true)) {
-                        throw ScreenNotActivatedException()
-                    }
-
-                    handleMediaFileSync(newPlaylist)
-                    _downloadProgress.value = null
-
-                    val newPlaylistJson = gson.toJson(newPlaylist)
-                    userPrefsRepo.savePlaylistJson(newPlaylistJson)
-                    userPrefsRepo.savePlaylistVersion(newPlaylist.playlistVersion)
-                    Result.success(newPlaylist)
+                    Result.success(applyRemotePlaylist(newPlaylist))
                 }
                 304 -> {
                     val cachedPlaylist = getCachedPlaylist() ?: return Result.failure(Exception("State inconsistency: 304 with empty cache."))
@@ -144,6 +87,86 @@ class PlaylistRepository(
         }
     }
 
+    /**
+     * Aplică un playlist primit de la server (prin /client/sync sau push pe WebSocket):
+     * rotație, descărcarea fișierelor media și salvarea în cache.
+     */
+    private suspend fun applyRemotePlaylist(newPlaylist: ClientPlaylistResponse): ClientPlaylistResponse {
+        userPrefsRepo.saveScreenName(newPlaylist.screenName)
+        userPrefsRepo.savePlaylistName(newPlaylist.name)
+
+        // --- Logica de sincronizare rotație ---
+        val serverTimestamp = newPlaylist.rotationUpdatedAt
+        val localTimestamp = userPrefsRepo.rotationTimestampFlow.firstOrNull()
+        val currentRotation = userPrefsRepo.rotationFlow.firstOrNull() ?: 0
+        
+        Log.d("RepoSync", "=== VERIFICARE ROTAȚIE ===")
+        Log.d("RepoSync", "Rotație server: ${newPlaylist.rotation}°")
+        Log.d("RepoSync", "Rotație locală: $currentRotation°")
+        Log.d("RepoSync", "Timestamp server: $serverTimestamp")
+        Log.d("RepoSync", "Timestamp local: $localTimestamp")
+        
+        if (serverTimestamp != null && newPlaylist.rotation != null) {
+            // SIMPLIFICARE: Verificăm dacă rotațiile sunt diferite
+            val rotationChanged = newPlaylist.rotation != currentRotation
+            
+            val shouldUpdate = if (rotationChanged) {
+                Log.d("RepoSync", "Rotația s-a schimbat ($currentRotation° -> ${newPlaylist.rotation}°)")
+                true
+            } else if (localTimestamp == null) {
+                Log.d("RepoSync", "Local timestamp este null - se inițializează")
+                true
+            } else {
+                try { 
+                    val serverInstant = java.time.Instant.parse(serverTimestamp)
+                    val localInstant = java.time.Instant.parse(localTimestamp)
+                    val isNewer = serverInstant > localInstant
+                    Log.d("RepoSync", "Server instant: $serverInstant")
+                    Log.d("RepoSync", "Local instant: $localInstant")
+                    Log.d("RepoSync", "Server mai nou? $isNewer")
+                    isNewer
+                } catch (e: Exception) { 
+                    Log.w("RepoSync", "Eroare parsare timestamp: ${e.message}")
+                    true // În caz de eroare, actualizăm cu valoarea de pe server
+                }
+            }
+            
+            if (shouldUpdate) {
+                userPrefsRepo.saveRotation(newPlaylist.rotation, serverTimestamp)
+                Log.i("RepoSync", "✅ Rotație actualizată de la server: ${newPlaylist.rotation}°")
+            } else {
+                Log.i("RepoSync", "❌ Nu se actualizează rotația - aceeași valoare și timestamp local mai nou")
+            }
+        } else {
+            Log.w("RepoSync", "Server timestamp sau rotație este null - nu se actualizează")
+        }
+
+        if (newPlaylist.name.contains("Ecran Neactivat", ignoreCase = true)) {
+            throw ScreenNotActivatedException()
+        }
+
+        handleMediaFileSync(newPlaylist)
+        _downloadProgress.value = null
+
+        val newPlaylistJson = gson.toJson(newPlaylist)
+        userPrefsRepo.savePlaylistJson(newPlaylistJson)
+        userPrefsRepo.savePlaylistVersion(newPlaylist.playlistVersion)
+        return newPlaylist
+    }
+
+    /** Manifestul trimis direct pe WebSocket (protocol 2) - fără încă un request HTTP */
+    suspend fun applyPushedManifest(message: String): Result<ClientPlaylistResponse> {
+        _downloadProgress.value = null
+        return try {
+            val push = gson.fromJson(message, ManifestPush::class.java)
+            if (push.encoding != "full") throw Exception("Codare manifest nesuportată: ${push.encoding}")
+            Result.success(applyRemotePlaylist(push.body))
+        } catch (e: Exception) {
+            _downloadProgress.value = null
+            Result.failure(e)
+        }
+    }
+
 
     fun getLocalFileFor(item: ClientPlaylistItem): File? {
         val mediaId = item.url.substringAfterLast('/')
@@ -157,7 +180,11 @@ class PlaylistRepository(
         val localFiles = mediaCacheDir.listFiles()?.map { it.name }?.toSet() ?: emptySet()
         val filesToDelete = localFiles - remoteFiles.keys
         filesToDelete.forEach { fileName -> File(mediaCacheDir, fileName).delete() }
-        val filesToDownload = remoteFiles.filterKeys { it !in localFiles }
+        // Un fișier existent dar cu altă dimensiune decât cea anunțată de server este
+        // învechit (re-encodat pe server) sau corupt (descărcare întreruptă): îl descărcăm din nou.
+        val filesToDownload = remoteFiles.filter { (fileName, item) ->
+            fileName !in localFiles || (item.size != null && File(mediaCacheDir, fileName).length() != item.size)
+        }
         var downloadedCount = 0
         filesToDownload.values.forEach { item ->
             val mediaId = item.url.substringAfterLast('/')
@@ -182,10 +209,26 @@ class PlaylistRepository(
                         }
                     }
                 }
+                if (item.sha256 != null && !item.sha256.equals(sha256Of(destination), ignoreCase = true)) {
+                    Log.w("PlaylistRepository", "Hash diferit pentru ${item.url}, fișierul descărcat este șters.")
+                    destination.delete()
+                }
             } else { if (destination.exists()) destination.delete() }
         } catch (e: Exception) { if (destination.exists()) destination.delete() }
     }
 
+    private fun sha256Of(file: File): String {
+        val digest = MessageDigest.getInstance("SHA-256")
+        file.inputStream().use { input ->
+            val buffer = ByteArray(64 * 1024)
+            var read: Int
+            while (input.read(buffer).also { read = it } != -1) {
+                digest.update(buffer, 0, read)
+            }
+        }
+        return digest.digest().joinToString("") { "%02x".format(it) }
+    }
+
     @Synchronized
     fun savePlaybackLog(log: PlaybackLog) {
         try {
@@ -20,7 +20,18 @@ data class ClientPlaylistItem(
     @SerializedName("type") val type: String,
     @SerializedName("duration") val duration: Int,
     // --- CÂMP NOU PENTRU CONȚINUT WEB ---
-    @SerializedName("web_refresh_interval") val webRefreshInterval: Int?
+    @SerializedName("web_refresh_interval") val webRefreshInterval: Int?,
+    // --- CÂMPURI NOI PENTRU VERIFICAREA CACHE-ULUI ---
+    @SerializedName("sha256") val sha256: String? = null,
+    @SerializedName("size") val size: Long? = null
+)
+
+// Mesajul "manifest" trimis pe WebSocket (protocol 2): corpul este exact răspunsul /client/sync
+data class ManifestPush(
+    @SerializedName("type") val type: String,
+    @SerializedName("encoding") val encoding: String,
+    @SerializedName("version") val version: String,
+    @SerializedName("body") val body: ClientPlaylistResponse
 )
 
 data class ScreenRegister(
@@ -12,6 +12,8 @@ import java.util.concurrent.TimeUnit
 
 class WebSocketClient(
     private val scope: CoroutineScope,
+    // Versiunea playlist-ului din cache; trimisă serverului ca să primim direct manifestul pe socket
+    private val playlistVersionProvider: suspend () -> String? = { null },
     private val onMessageReceived: (String) -> Unit
 ) {
     private var webSocket: WebSocket? = null
@@ -46,23 +48,32 @@ class WebSocketClient(
             override fun onOpen(webSocket: WebSocket, response: Response) {
                 Log.i("WebSocketClient", "Conexiune WebSocket stabilită cu succes!")
                 // --- MODIFICARE AICI: Trimitem informațiile la conectare ---
-                try {
-                    val deviceInfo = JSONObject().apply {
-                        put("type", "device_info")
-                        put("version", playerVersion)
-                        put("resolution", screenResolution)
+                scope.launch {
+                    try {
+                        val deviceInfo = JSONObject().apply {
+                            put("type", "device_info")
+                            put("version", playerVersion)
+                            put("resolution", screenResolution)
+                            // Protocol 2: serverul trimite manifestul complet pe socket, fără /client/sync
+                            put("protocol", MANIFEST_PUSH_PROTOCOL)
+                            put("playlist_version", playlistVersionProvider())
+                        }
+                        webSocket.send(deviceInfo.toString())
+                        Log.i("WebSocketClient", "S-au trimis datele dispozitivului: $deviceInfo")
+                    } catch (e: Exception) {
+                        Log.e("WebSocketClient", "Eroare la trimiterea datelor dispozitivului", e)
                     }
-                    webSocket.send(deviceInfo.toString())
-                    Log.i("WebSocketClient", "S-au trimis datele dispozitivului: $deviceInfo")
-                } catch (e: Exception) {
-                    Log.e("WebSocketClient", "Eroare la trimiterea datelor dispozitivului", e)
                 }
             }
 
             override fun onMessage(webSocket: WebSocket, text: String) {
                 Log.i("WebSocketClient", "Mesaj primit de la server: $text")
-                // Ignorăm mesajele de tip 'ping' primite de la server
-                if (text.contains("ping")) return
+                // Răspundem la ping-ul serverului; altfel mesajul nu ne interesează.
+                // Manifestul poate conține "ping" în nume sau URL-uri, deci îl excludem explicit.
+                if (!text.contains("\"manifest\"") && text.contains("ping")) {
+                    webSocket.send("{\"type\":\"pong\"}")
+                    return
+                }
 
                 onMessageReceived(text)
             }
@@ -89,6 +100,10 @@ class WebSocketClient(
         }
     }
 
+    companion object {
+        const val MANIFEST_PUSH_PROTOCOL = 2
+    }
+
     fun stop() {
         isStarted = false
         webSocket?.close(1000, "Client-ul a fost oprit manual.")
@@ -92,7 +92,9 @@ class PlayerViewModel(
         }
     }
 
-    private suspend fun checkScreenStatus() {
+    private suspend fun checkScreenStatus(
+        sync: suspend () -> Result<ClientPlaylistResponse> = { repository.syncRemotePlaylistAndCacheMedia() }
+    ) {
         val progressJob = viewModelScope.launch {
             repository.downloadProgress.collect { progress ->
                 if (progress != null) {
@@ -101,7 +103,7 @@ class PlayerViewModel(
             }
         }
 
-        val syncResult = repository.syncRemotePlaylistAndCacheMedia()
+        val syncResult = sync()
         progressJob.cancel()
 
         if (syncResult.isSuccess) {
@@ -148,9 +150,23 @@ class PlayerViewModel(
 
     private fun startWebSocket(key: String) {
         webSocketClient?.stop()
-        webSocketClient = WebSocketClient(viewModelScope) { message ->
-            Log.i("ViewModel", "🔔 NOTIFICARE WEBSOCKET PRIMITĂ: '$message'.")
-            if (message.contains("playlist_updated") || message.contains("screen_deleted")) {
+        webSocketClient = WebSocketClient(
+            viewModelScope,
+            playlistVersionProvider = { repository.userPrefsRepo.cachedPlaylistVersionFlow.first() }
+        ) { message ->
+            Log.i("ViewModel", "🔔 NOTIFICARE WEBSOCKET PRIMITĂ: '${message.take(200)}'.")
+            if (message.contains("\"type\":\"manifest\"")) {
+                // Serverul a trimis direct noul manifest: îl aplicăm fără încă o sincronizare HTTP
+                Log.i("ViewModel", "📦 Manifest primit pe WebSocket, se aplică direct.")
+                playbackJob?.cancel()
+                logEvent(activeItemForLogging, "END")
+                activeItemForLogging = null
+                _currentItem.value = null
+                stateManagementJob?.cancel()
+                stateManagementJob = viewModelScope.launch {
+                    checkScreenStatus { repository.applyPushedManifest(message) }
+                }
+            } else if (message.contains("playlist_updated") || message.contains("screen_deleted")) {
                 Log.i("ViewModel", "🔄 Mesaj relevant, se repornește mașina de stări pentru sincronizare.")
                 playbackJob?.cancel()
                 logEvent(activeItemForLogging, "END")
@@ -0,0 +1,16 @@
+-- Script pentru adăugarea hash-ului de conținut în tabelul media_files
+-- Rulează acest script în PostgreSQL/SQLite pentru a actualiza schema
+
+-- SHA-256 al fișierului stocat pe disc, trimis player-elor în manifestul de sincronizare
+ALTER TABLE media_files
+ADD COLUMN content_sha256 VARCHAR(64);
+
+-- Comentarii pentru clarificare
+-- content_sha256: hash-ul fișierului final (după re-encoding, dacă a existat)
+-- Fișierele existente rămân cu NULL până la următoarea procesare;
+-- player-ele tratează NULL ca "fără verificare".
+
+-- Verifică modificările
+SELECT COUNT(*) AS total, COUNT(content_sha256) AS with_hash
+FROM media_files
+WHERE type <> 'web/html';
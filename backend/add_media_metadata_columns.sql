@@ -0,0 +1,33 @@
+-- Script pentru salvarea metadatelor ffprobe în tabelul media_files
+-- Rulează acest script în PostgreSQL/SQLite pentru a actualiza schema
+
+-- Metadatele fișierului stocat (după procesare, dacă a existat)
+ALTER TABLE media_files ADD COLUMN width INTEGER;
+ALTER TABLE media_files ADD COLUMN height INTEGER;
+ALTER TABLE media_files ADD COLUMN video_codec VARCHAR(32);
+ALTER TABLE media_files ADD COLUMN video_profile VARCHAR(64);
+ALTER TABLE media_files ADD COLUMN video_level INTEGER;
+ALTER TABLE media_files ADD COLUMN bitrate INTEGER;
+ALTER TABLE media_files ADD COLUMN fps FLOAT;
+ALTER TABLE media_files ADD COLUMN audio_codec VARCHAR(32);
+ALTER TABLE media_files ADD COLUMN rotation INTEGER;
+ALTER TABLE media_files ADD COLUMN orientation INTEGER;
+ALTER TABLE media_files ADD COLUMN probe_data TEXT;
+ALTER TABLE media_files ADD COLUMN probed_at TIMESTAMP WITH TIME ZONE;
+
+-- Căutări în bibliotecă după rezoluție și codec
+CREATE INDEX IF NOT EXISTS ix_media_files_height ON media_files (height);
+CREATE INDEX IF NOT EXISTS ix_media_files_video_codec ON media_files (video_codec);
+
+-- Comentarii pentru clarificare
+-- probe_data: ieșirea ffprobe redusă la câmpurile folosite la procesare (JSON)
+-- rotation: rotația de afișare a video-ului; orientation: tag-ul EXIF Orientation (1-8) al imaginilor
+-- Fișierele existente rămân cu probed_at NULL; le analizează:
+--     python -m app.services.media_probe
+
+-- Verifică modificările
+SELECT video_codec, height, COUNT(*)
+FROM media_files
+WHERE type LIKE 'video/%'
+GROUP BY video_codec, height
+ORDER BY COUNT(*) DESC;
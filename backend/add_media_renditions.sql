@@ -0,0 +1,32 @@
+-- Script pentru variantele la rezoluție redusă ale video-urilor (media_renditions)
+-- Rulează acest script în PostgreSQL pentru a actualiza schema
+-- (tabela media_renditions este creată și automat de create_all la pornire)
+
+CREATE TABLE IF NOT EXISTS media_renditions (
+    id SERIAL PRIMARY KEY,
+    media_file_id INTEGER NOT NULL REFERENCES media_files(id) ON DELETE CASCADE,
+    height INTEGER NOT NULL,
+    width INTEGER,
+    bitrate_kbps INTEGER NOT NULL,
+    path VARCHAR NOT NULL,
+    size INTEGER NOT NULL,
+    content_sha256 VARCHAR(64),
+    created_at TIMESTAMPTZ DEFAULT now(),
+    CONSTRAINT uq_media_renditions_media_height UNIQUE (media_file_id, height)
+);
+
+CREATE INDEX IF NOT EXISTS ix_media_renditions_id ON media_renditions (id);
+CREATE INDEX IF NOT EXISTS ix_media_renditions_media_file_id ON media_renditions (media_file_id);
+
+-- Comentarii pentru clarificare
+-- height: treapta (latura scurtă a imaginii: 480 / 720 / 1080 / 1440 / 2160)
+-- width: latura lungă, la același raport de aspect ca originalul
+-- Variantele sunt generate după procesare, doar pentru treptele ecranelor active ale
+-- proprietarului care sunt mai mici decât originalul. Video-urile procesate înainte de
+-- această modificare primesc variante la următoarea re-procesare.
+
+-- Verifică modificările
+SELECT height, COUNT(*), SUM(size) AS total_bytes
+FROM media_renditions
+GROUP BY height
+ORDER BY height;
@@ -0,0 +1,33 @@
+-- Script pentru adăugarea programărilor pe ecrane (dayparting)
+-- Rulează acest script în PostgreSQL pentru a actualiza schema
+-- (tabela screen_schedules este creată și automat de create_all la pornire)
+
+-- Versiunea programărilor unui ecran; se schimbă la fiecare modificare a programărilor
+ALTER TABLE screens
+ADD COLUMN schedule_version VARCHAR;
+
+CREATE TABLE IF NOT EXISTS screen_schedules (
+    id SERIAL PRIMARY KEY,
+    screen_id INTEGER NOT NULL REFERENCES screens(id) ON DELETE CASCADE,
+    playlist_id INTEGER NOT NULL REFERENCES playlists(id) ON DELETE CASCADE,
+    start_time TIME NOT NULL,
+    end_time TIME NOT NULL,
+    days_of_week INTEGER NOT NULL DEFAULT 127,
+    priority INTEGER NOT NULL DEFAULT 0,
+    valid_from TIMESTAMPTZ,
+    valid_until TIMESTAMPTZ,
+    created_at TIMESTAMPTZ
+);
+
+CREATE INDEX IF NOT EXISTS ix_screen_schedules_screen_id ON screen_schedules (screen_id);
+
+-- Comentarii pentru clarificare
+-- start_time / end_time: ore locale (SCHEDULE_TIMEZONE); end_time <= start_time = fereastră peste miezul nopții
+-- days_of_week: bit 0 = luni ... bit 6 = duminică (127 = în fiecare zi)
+-- priority: la ferestre suprapuse câștigă prioritatea mai mare
+
+-- Verifică modificările
+SELECT column_name, data_type
+FROM information_schema.columns
+WHERE table_name = 'screen_schedules'
+ORDER BY ordinal_position;
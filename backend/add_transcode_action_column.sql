@@ -0,0 +1,17 @@
+-- Script pentru înregistrarea prelucrării alese pentru fiecare video
+-- Rulează acest script în PostgreSQL/SQLite pentru a actualiza schema
+
+-- Prelucrarea aleasă de services/transcode_plan.py pe baza ffprobe
+ALTER TABLE media_files
+ADD COLUMN transcode_action VARCHAR(16);
+
+-- Comentarii pentru clarificare
+-- transcode_action: none (fișier neschimbat), remux (stream copy + faststart),
+-- audio (doar audio re-encodat în AAC), transcode (re-encodare completă)
+-- Fișierele procesate înainte de această modificare rămân cu NULL.
+
+-- Verifică modificările
+SELECT transcode_action, COUNT(*)
+FROM media_files
+WHERE type LIKE 'video/%'
+GROUP BY transcode_action;
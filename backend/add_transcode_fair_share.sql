@@ -0,0 +1,36 @@
+-- Script pentru planificarea fair share a encodărilor video
+-- Rulează acest script în PostgreSQL pentru a actualiza schema
+
+-- Ponderea fiecărui utilizator în round-robin și limita opțională de encodări simultane
+ALTER TABLE users ADD COLUMN IF NOT EXISTS encode_weight INTEGER NOT NULL DEFAULT 1;
+ALTER TABLE users ADD COLUMN IF NOT EXISTS max_concurrent_encodes INTEGER;
+
+-- Proprietarul și dimensiunea fișierului sunt copiate pe job, ca ordonarea să nu necesite join
+ALTER TABLE transcode_jobs ADD COLUMN IF NOT EXISTS owner_id INTEGER REFERENCES users(id) ON DELETE CASCADE;
+ALTER TABLE transcode_jobs ADD COLUMN IF NOT EXISTS size_bytes INTEGER;
+ALTER TABLE transcode_jobs ADD COLUMN IF NOT EXISTS started_at TIMESTAMPTZ;
+
+CREATE INDEX IF NOT EXISTS ix_transcode_jobs_owner_id ON transcode_jobs (owner_id);
+
+-- Job-urile existente
+UPDATE transcode_jobs j
+SET owner_id = m.uploaded_by_id,
+    size_bytes = m.size
+FROM media_files m
+WHERE m.id = j.media_file_id
+  AND j.owner_id IS NULL;
+
+UPDATE transcode_jobs
+SET started_at = heartbeat_at
+WHERE started_at IS NULL AND heartbeat_at IS NOT NULL;
+
+-- Comentarii pentru clarificare
+-- encode_weight: un utilizator cu ponderea 2 primește de două ori mai multe sloturi decât unul cu ponderea 1
+-- max_concurrent_encodes: NULL = fără limită
+-- size_bytes: fișierele sub TRANSCODE_SMALL_FILE_BYTES trec înaintea celor mari ale aceluiași utilizator
+
+-- Verifică modificările
+SELECT owner_id, status, COUNT(*)
+FROM transcode_jobs
+GROUP BY owner_id, status
+ORDER BY owner_id, status;
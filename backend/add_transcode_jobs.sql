@@ -0,0 +1,47 @@
+-- Script pentru coada persistentă de procesare video (transcode_jobs)
+-- Rulează acest script în PostgreSQL pentru a actualiza schema
+-- (tabela transcode_jobs este creată și automat de create_all la pornire)
+
+DO $$ BEGIN
+    CREATE TYPE jobstatus AS ENUM ('QUEUED', 'RUNNING', 'DONE', 'FAILED');
+EXCEPTION
+    WHEN duplicate_object THEN NULL;
+END $$;
+
+CREATE TABLE IF NOT EXISTS transcode_jobs (
+    id SERIAL PRIMARY KEY,
+    media_file_id INTEGER NOT NULL REFERENCES media_files(id) ON DELETE CASCADE,
+    status jobstatus NOT NULL DEFAULT 'QUEUED',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    run_after TIMESTAMPTZ NOT NULL DEFAULT now(),
+    leased_by VARCHAR,
+    lease_expires_at TIMESTAMPTZ,
+    heartbeat_at TIMESTAMPTZ,
+    last_error VARCHAR,
+    created_at TIMESTAMPTZ DEFAULT now(),
+    finished_at TIMESTAMPTZ
+);
+
+CREATE INDEX IF NOT EXISTS ix_transcode_jobs_media_file_id ON transcode_jobs (media_file_id);
+CREATE INDEX IF NOT EXISTS ix_transcode_jobs_status ON transcode_jobs (status);
+
+-- Fișierele rămase în așteptare sau blocate în procesare (job-uri pierdute la restart
+-- când procesarea rula prin BackgroundTasks) sunt puse în coadă
+INSERT INTO transcode_jobs (media_file_id, status, attempts, max_attempts, run_after, created_at)
+SELECT m.id, 'QUEUED', 0, 3, now(), now()
+FROM media_files m
+WHERE m.processing_status IN ('PENDING', 'PROCESSING')
+  AND m.type LIKE 'video/%'
+  AND NOT EXISTS (SELECT 1 FROM transcode_jobs j WHERE j.media_file_id = m.id);
+
+-- Comentarii pentru clarificare
+-- status: QUEUED -> RUNNING -> DONE / FAILED (cu reîncercări până la max_attempts)
+-- leased_by / lease_expires_at: worker-ul care rulează job-ul; un lease expirat (worker oprit) permite preluarea de alt worker
+-- run_after: backoff exponențial între reîncercări
+
+-- Verifică modificările
+SELECT status, COUNT(*)
+FROM transcode_jobs
+GROUP BY status
+ORDER BY status;
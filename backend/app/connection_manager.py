@@ -1,76 +1,368 @@
 # Cale: app/connection_manager.py
 
 from fastapi import WebSocket
-from typing import Dict, List, Tuple
+from typing import Callable, Dict, List, Optional, Set, Tuple, Union
 import asyncio
+import json
+import os
+import time
 from datetime import datetime, timezone # Am adăugat timezone
 
+from .services.event_bus import event_bus
+from .services.heartbeat import HeartbeatWheel
+
+# Mesaje în așteptare per conexiune; o conexiune care rămâne în urmă cu mai mult este închisă
+WS_SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", "32"))
+# Timp maxim pentru trimiterea unui singur mesaj către un client lent
+WS_SEND_TIMEOUT = float(os.getenv("WS_SEND_TIMEOUT", "10"))
+# Cod de închidere trimis clienților evacuați ("Try Again Later" - player-ul se reconectează)
+WS_CLOSE_SLOW_CONSUMER = 1013
+# Player-ele care declară acest protocol în device_info primesc manifestul direct pe socket
+MANIFEST_PUSH_PROTOCOL = 2
+# Câte manifeste se construiesc simultan (în threadpool) la o invalidare a întregii flote
+MANIFEST_PUSH_CONCURRENCY = int(os.getenv("MANIFEST_PUSH_CONCURRENCY", "8"))
+
+Message = Union[str, dict]
+# (screen_key, versiunea cunoscută de player, acceptă delta) -> (versiune nouă, mesaj) sau None
+ManifestBuilder = Callable[[str, Optional[str], bool], Optional[Tuple[str, str]]]
+
+
+def playlist_updated_message(version: Optional[str] = None) -> str:
+    """
+    Mesajul trimis player-ului. Player-ul caută doar textul "playlist_updated", deci
+    varianta JSON rămâne compatibilă cu versiunile existente.
+    """
+    message = {"type": "playlist_updated"}
+    if version:
+        message["version"] = version
+    return json.dumps(message, separators=(",", ":"))
+
+
+class OutboundConnection:
+    """
+    Un WebSocket cu coada lui de trimitere și un task de scriere dedicat. Cine trimite
+    doar pune mesajul în coadă (fără await pe rețea), deci un client lent nu blochează
+    request-ul API care a declanșat notificarea și nici restul flotei.
+    """
+
+    def __init__(self, websocket: WebSocket, label: str, on_evict: Callable[["OutboundConnection", str], None],
+                 user_id: Optional[int] = None, max_queue: int = WS_SEND_QUEUE_SIZE):
+        self.websocket = websocket
+        self.label = label
+        self.user_id = user_id
+        self.connected_at = datetime.now(timezone.utc)
+        # Ultimul mesaj primit de la client (monotonic); folosit de HeartbeatWheel
+        self.last_receive = time.monotonic()
+        self.supports_pong = False
+        # Negociate prin device_info; protocolul 1 primește doar notificarea "playlist_updated"
+        self.protocol = 1
+        self.known_version: Optional[str] = None
+        self.accepts_delta = False
+        self.push_in_flight = False
+        self.push_again = False
+        self.queue: "asyncio.Queue[Message]" = asyncio.Queue(maxsize=max_queue)
+        self.closed = False
+        self._on_evict = on_evict
+        self._writer_task = asyncio.create_task(self._run_writer())
+
+    def touch(self, pong: bool = False):
+        """Apelat la fiecare mesaj primit de la client"""
+        self.last_receive = time.monotonic()
+        if pong:
+            self.supports_pong = True
+
+    def negotiate(self, protocol: int, known_version: Optional[str], accepts_delta: bool):
+        self.protocol = protocol
+        self.known_version = known_version
+        self.accepts_delta = accepts_delta
+
+    def enqueue(self, message: Message) -> bool:
+        if self.closed:
+            return False
+        try:
+            self.queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            self._on_evict(self, "queue_full")
+            return False
+
+    async def _run_writer(self):
+        while True:
+            message = await self.queue.get()
+            try:
+                if isinstance(message, str):
+                    send = self.websocket.send_text(message)
+                else:
+                    send = self.websocket.send_json(message)
+                await asyncio.wait_for(send, WS_SEND_TIMEOUT)
+            except asyncio.CancelledError:
+                raise
+            except asyncio.TimeoutError:
+                self._on_evict(self, "send_timeout")
+                return
+            except Exception:
+                self._on_evict(self, "send_error")
+                return
+
+    def close(self, code: Optional[int] = None):
+        """Oprește task-ul de scriere; cu `code`, închide și socket-ul (în fundal)"""
+        if self.closed:
+            return
+        self.closed = True
+        if self._writer_task is not asyncio.current_task():
+            self._writer_task.cancel()
+        if code is not None:
+            asyncio.create_task(self._close_socket(code))
+
+    async def _close_socket(self, code: int):
+        try:
+            await asyncio.wait_for(self.websocket.close(code=code), WS_SEND_TIMEOUT)
+        except Exception:
+            pass
+
+
 class ConnectionManager:
+    """
+    Ține socket-urile deschise în ACEST proces. Cu mai mulți workeri uvicorn, mesajele
+    pentru ecrane / utilizatori conectați la alt worker trec prin `event_bus`; fiecare
+    worker le livrează socket-urilor proprii în `handle_bus_event`.
+    """
+
     def __init__(self):
-        self.active_connections: Dict[str, Tuple[WebSocket, datetime]] = {}
-        self.user_connections: Dict[int, List[WebSocket]] = {}  # user_id -> lista WebSocket-uri pentru progress updates
+        self.active_connections: Dict[str, OutboundConnection] = {}
+        self.user_connections: Dict[int, List[OutboundConnection]] = {}  # user_id -> conexiunile pentru progress updates
+        # Index pentru fan-out fără interogări: user_id -> cheile ecranelor conectate ale utilizatorului
+        self.user_screens: Dict[int, Set[str]] = {}
+        self.screen_owners: Dict[str, int] = {}  # screen_key -> user_id (doar ecrane conectate și împerecheate)
+        # Contoare pentru conexiunile închise de server (vezi /admin/websocket-stats)
+        self.evictions: Dict[str, int] = {"queue_full": 0, "send_timeout": 0, "send_error": 0, "heartbeat_timeout": 0}
+        # Un singur task trimite ping-urile și detectează conexiunile moarte
+        self.heartbeat = HeartbeatWheel(on_dead=lambda connection: self._evict_screen(connection, "heartbeat_timeout"))
+        # Înregistrat de aplicație (client_router.build_manifest_push); fără el se trimite doar notificarea
+        self.manifest_builder: Optional[ManifestBuilder] = None
+        self._push_semaphore: Optional[asyncio.Semaphore] = None
+        self.manifest_pushes = {"sent": 0, "up_to_date": 0, "failed": 0}
+        # Înregistrat de progress_hub: reține stările de progress venite de la alți workeri
+        self.progress_observer: Optional[Callable[[int, List[dict]], None]] = None
+        # Înregistrat de aplicație (encode_registry.cancel): oprește encodările locale ale fișierelor șterse
+        self.encode_canceller: Optional[Callable[[List[int]], int]] = None
 
-    async def connect(self, websocket: WebSocket, screen_key: str):
+    async def connect(self, websocket: WebSocket, screen_key: str, owner_id: Optional[int] = None) -> OutboundConnection:
         await websocket.accept()
-        # --- MODIFICARE: Folosim datetime.now(timezone.utc) ---
-        self.active_connections[screen_key] = (websocket, datetime.now(timezone.utc))
+        previous = self.active_connections.get(screen_key)
+        if previous is not None:
+            # Player-ul s-a reconectat înainte ca vechiul socket să fie detectat ca închis
+            previous.close()
+            self.heartbeat.remove(previous)
+        connection = OutboundConnection(websocket, screen_key, self._evict_screen)
+        self.active_connections[screen_key] = connection
+        self.heartbeat.add(connection)
+        self._index_screen(screen_key, owner_id)
+        return connection
+
+    def disconnect(self, screen_key: str, websocket: Optional[WebSocket] = None):
+        connection = self.active_connections.get(screen_key)
+        if connection is None:
+            return
+        if websocket is not None and connection.websocket is not websocket:
+            return  # între timp a sosit o conexiune nouă pentru aceeași cheie
+        connection.close()
+        self.heartbeat.remove(connection)
+        del self.active_connections[screen_key]
+        self._unindex_screen(screen_key)
+
+    def _evict_screen(self, connection: OutboundConnection, reason: str):
+        self.evictions[reason] += 1
+        print(f"EROARE: Ecranul {connection.label} nu mai primește mesajele ({reason}), conexiunea este închisă")
+        self.heartbeat.remove(connection)
+        if self.active_connections.get(connection.label) is connection:
+            del self.active_connections[connection.label]
+            self._unindex_screen(connection.label)
+        connection.close(code=WS_CLOSE_SLOW_CONSUMER)
+
+    def set_screen_owner(self, screen_key: str, owner_id: Optional[int]):
+        """
+        Actualizează indexul user -> ecrane. Se apelează la împerechere, re-împerechere și
+        ștergere (owner_id=None). Ecranele care nu sunt conectate nu sunt indexate.
+        """
+        self._index_screen(screen_key, owner_id)
+        # Socket-ul ecranului poate fi ținut de alt worker
+        event_bus.publish_nowait({"kind": "screen_owner", "screen_key": screen_key, "owner_id": owner_id})
 
-    def disconnect(self, screen_key: str):
+    def _index_screen(self, screen_key: str, owner_id: Optional[int]):
+        self._unindex_screen(screen_key)
+        if owner_id is None or screen_key not in self.active_connections:
+            return
+        self.screen_owners[screen_key] = owner_id
+        self.user_screens.setdefault(owner_id, set()).add(screen_key)
+
+    def _unindex_screen(self, screen_key: str):
+        owner_id = self.screen_owners.pop(screen_key, None)
+        if owner_id is None:
+            return
+        keys = self.user_screens.get(owner_id)
+        if keys is not None:
+            keys.discard(screen_key)
+            if not keys:
+                del self.user_screens[owner_id]
+
+    async def send_to_screen(self, message: Message, screen_key: str):
         if screen_key in self.active_connections:
-            del self.active_connections[screen_key]
+            self._send_local_to_screen(message, screen_key)
+        else:
+            await event_bus.publish({"kind": "screen", "screen_key": screen_key, "message": message})
+
+    def _send_local_to_screen(self, message: Message, screen_key: str):
+        connection = self.active_connections.get(screen_key)
+        if connection is not None:
+            connection.enqueue(message)
+
+    async def broadcast_to_user_screens(self, message: Message, user_id: int):
+        self._broadcast_local_to_user_screens(message, user_id)
+        await event_bus.publish({"kind": "user_screens", "user_id": user_id, "message": message})
+
+    def _broadcast_local_to_user_screens(self, message: Message, user_id: int):
+        for screen_key in list(self.user_screens.get(user_id, ())):
+            self._send_local_to_screen(message, screen_key)
 
-    async def send_to_screen(self, message: str, screen_key: str):
+    async def notify_playlist_updated(self, screen_key: str, version: Optional[str] = None):
+        """Invalidare pentru un ecran: manifestul pe socket (protocol 2) sau notificarea clasică"""
         if screen_key in self.active_connections:
-            websocket, _ = self.active_connections[screen_key]
-            await websocket.send_text(message)
-
-    async def broadcast_to_user_screens(self, message: str, user_id: int, db_session):
-        from . import models
-        
-        user_screens = db_session.query(models.Screen).filter(models.Screen.created_by_id == user_id).all()
-        tasks = []
-        for screen in user_screens:
-            if screen.unique_key in self.active_connections:
-                websocket, _ = self.active_connections[screen.unique_key]
-                tasks.append(websocket.send_text(message))
-        
-        if tasks:
-            await asyncio.gather(*tasks)
-    
-    async def connect_user_progress(self, websocket: WebSocket, user_id: int):
+            self._notify_local_screen(screen_key, version)
+        else:
+            await event_bus.publish({"kind": "playlist_updated", "screen_key": screen_key, "version": version})
+
+    async def notify_user_playlists_updated(self, user_id: int, version: Optional[str] = None):
+        self._notify_local_user_screens(user_id, version)
+        await event_bus.publish({"kind": "user_playlists_updated", "user_id": user_id, "version": version})
+
+    def _notify_local_user_screens(self, user_id: int, version: Optional[str]):
+        for screen_key in list(self.user_screens.get(user_id, ())):
+            self._notify_local_screen(screen_key, version)
+
+    def _notify_local_screen(self, screen_key: str, version: Optional[str]):
+        connection = self.active_connections.get(screen_key)
+        if connection is None:
+            return
+        if connection.protocol >= MANIFEST_PUSH_PROTOCOL and self.manifest_builder is not None:
+            self.push_manifest(connection)
+        else:
+            connection.enqueue(playlist_updated_message(version))
+
+    def push_manifest(self, connection: OutboundConnection):
+        """
+        Programează construirea și trimiterea manifestului. O singură construcție rulează
+        per conexiune; invalidările care sosesc între timp produc încă o trecere la final.
+        """
+        if connection.push_in_flight:
+            connection.push_again = True
+            return
+        connection.push_in_flight = True
+        asyncio.create_task(self._push_manifest(connection))
+
+    async def _push_manifest(self, connection: OutboundConnection):
+        if self._push_semaphore is None:
+            self._push_semaphore = asyncio.Semaphore(MANIFEST_PUSH_CONCURRENCY)
+        try:
+            while not connection.closed:
+                connection.push_again = False
+                async with self._push_semaphore:
+                    result = await asyncio.to_thread(
+                        self.manifest_builder, connection.label, connection.known_version, connection.accepts_delta
+                    )
+                if result is None:
+                    self.manifest_pushes["up_to_date"] += 1
+                else:
+                    version, message = result
+                    if connection.enqueue(message):
+                        # Optimist: următoarea delta pornește de la versiunea trimisă acum
+                        connection.known_version = version
+                        self.manifest_pushes["sent"] += 1
+                if not connection.push_again:
+                    break
+        except Exception as e:
+            self.manifest_pushes["failed"] += 1
+            print(f"EROARE la trimiterea manifestului către {connection.label}: {e}")
+            # Player-ul se sincronizează singur prin HTTP
+            connection.enqueue(playlist_updated_message())
+        finally:
+            connection.push_in_flight = False
+
+    async def connect_user_progress(self, websocket: WebSocket, user_id: int) -> OutboundConnection:
         """Conectează un WebSocket pentru progress updates pentru un utilizator"""
         await websocket.accept()
-        if user_id not in self.user_connections:
-            self.user_connections[user_id] = []
-        self.user_connections[user_id].append(websocket)
-    
+        connection = OutboundConnection(websocket, f"progress:{user_id}", self._evict_progress, user_id=user_id)
+        self.user_connections.setdefault(user_id, []).append(connection)
+        return connection
+
     def disconnect_user_progress(self, websocket: WebSocket, user_id: int):
         """Deconectează WebSocket-ul de progress pentru un utilizator"""
-        if user_id in self.user_connections:
-            if websocket in self.user_connections[user_id]:
-                self.user_connections[user_id].remove(websocket)
-            if not self.user_connections[user_id]:
+        for connection in list(self.user_connections.get(user_id, ())):
+            if connection.websocket is websocket:
+                self._remove_progress_connection(connection, user_id)
+
+    def _remove_progress_connection(self, connection: OutboundConnection, user_id: int):
+        connections = self.user_connections.get(user_id)
+        if connections is not None and connection in connections:
+            connections.remove(connection)
+            if not connections:
                 del self.user_connections[user_id]
-    
-    async def send_progress_update(self, user_id: int, media_file_data: dict):
-        """Trimite update de progress către toate conexiunile unui utilizator"""
-        if user_id in self.user_connections:
-            message = {
-                "type": "media_progress",
-                "data": media_file_data
-            }
-            tasks = []
-            for websocket in self.user_connections[user_id].copy():  # copy pentru thread safety
-                try:
-                    tasks.append(websocket.send_json(message))
-                except Exception:
-                    # Conexiunea s-a închis, o eliminăm
-                    self.user_connections[user_id].remove(websocket)
-            
-            if tasks:
-                try:
-                    await asyncio.gather(*tasks, return_exceptions=True)
-                except Exception as e:
-                    print(f"Eroare la trimiterea progress update pentru user {user_id}: {e}")
+        connection.close()
+
+    def _evict_progress(self, connection: OutboundConnection, reason: str):
+        self.evictions[reason] += 1
+        print(f"EROARE: Conexiunea {connection.label} nu mai primește mesajele ({reason}), este închisă")
+        connection.close(code=WS_CLOSE_SLOW_CONSUMER)
+        self._remove_progress_connection(connection, connection.user_id)
+
+    async def send_progress_update(self, user_id: int, items: List[dict]):
+        """Trimite stările de progress (deja grupate de progress_hub) către toate tab-urile unui utilizator"""
+        self._send_local_progress_update(user_id, items)
+        await event_bus.publish({"kind": "user_progress", "user_id": user_id, "data": items})
+
+    def _send_local_progress_update(self, user_id: int, items: List[dict]):
+        connections = self.user_connections.get(user_id)
+        if not connections:
+            return
+        # Serializat o singură dată pentru toate tab-urile
+        message = json.dumps({"type": "media_progress_batch", "data": items}, separators=(",", ":"), default=str)
+        for connection in list(connections):
+            connection.enqueue(message)
+
+    async def handle_bus_event(self, event: dict):
+        """Livrează socket-urilor locale un eveniment publicat de alt worker"""
+        kind = event.get("kind")
+        if kind == "screen":
+            self._send_local_to_screen(event["message"], event["screen_key"])
+        elif kind == "user_screens":
+            self._broadcast_local_to_user_screens(event["message"], event["user_id"])
+        elif kind == "user_progress":
+            self._send_local_progress_update(event["user_id"], event["data"])
+            if self.progress_observer is not None:
+                self.progress_observer(event["user_id"], event["data"])
+        elif kind == "playlist_updated":
+            self._notify_local_screen(event["screen_key"], event.get("version"))
+        elif kind == "user_playlists_updated":
+            self._notify_local_user_screens(event["user_id"], event.get("version"))
+        elif kind == "screen_owner":
+            self._index_screen(event["screen_key"], event["owner_id"])
+        elif kind == "cancel_encodes":
+            if self.encode_canceller is not None:
+                await asyncio.to_thread(self.encode_canceller, event["media_ids"])
+
+    def stats(self) -> dict:
+        return {
+            "screen_connections": len(self.active_connections),
+            "progress_connections": sum(len(c) for c in self.user_connections.values()),
+            "queued_messages": sum(c.queue.qsize() for c in self.active_connections.values()),
+            "queue_size_limit": WS_SEND_QUEUE_SIZE,
+            "send_timeout_seconds": WS_SEND_TIMEOUT,
+            "evictions": dict(self.evictions),
+            "heartbeat": self.heartbeat.stats(),
+            "manifest_push_connections": sum(
+                1 for c in self.active_connections.values() if c.protocol >= MANIFEST_PUSH_PROTOCOL
+            ),
+            "manifest_pushes": dict(self.manifest_pushes),
+        }
 
 manager = ConnectionManager()
@@ -3,7 +3,8 @@
 import asyncio
 import json
 import os
-from fastapi import FastAPI, APIRouter, WebSocket, WebSocketDisconnect, status
+import uuid
+from fastapi import FastAPI, APIRouter, Request, Response, WebSocket, WebSocketDisconnect, status
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.staticfiles import StaticFiles
 from datetime import datetime, timezone
@@ -11,8 +12,16 @@ from datetime import datetime, timezone
 from . import models
 from .database import engine, SessionLocal
 from .routers import auth_router, users_router, media_router, playlist_router, screen_router, client_router, admin_router, dashboard_router, reports_router
-from .connection_manager import manager
-from .routers.media_router import set_main_event_loop
+from .connection_manager import manager, MANIFEST_PUSH_PROTOCOL
+from .services.presence_buffer import presence_buffer
+from .services.encode_registry import encode_registry
+from .services.event_bus import event_bus
+from .services.presence_registry import presence_registry
+from .services.notification_coalescer import notification_coalescer
+from .services.progress_hub import progress_hub
+from .services.progress_store import progress_store
+from .services.transcode_worker import EMBEDDED_TRANSCODE_WORKER, transcode_worker
+from .services.query_stats import QUERY_STATS_ENABLED, query_stats
 
 
 models.Base.metadata.create_all(bind=engine)
@@ -22,9 +31,26 @@ from contextlib import asynccontextmanager
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
-    set_main_event_loop()
+    presence_buffer.start()
+    await event_bus.start(manager.handle_bus_event)
+    presence_registry.start()
+    manager.heartbeat.start()
+    manager.manifest_builder = client_router.build_manifest_push
+    manager.encode_canceller = encode_registry.cancel
+    progress_hub.start()
+    if EMBEDDED_TRANSCODE_WORKER:
+        transcode_worker.start()
     yield
-    # Shutdown (dacă este necesar)
+    # Shutdown: scriem în baza de date datele de prezență rămase în buffer.
+    # Job-urile de procesare în curs nu sunt așteptate: FFmpeg-ul lor este oprit și sunt puse înapoi în coadă.
+    await asyncio.to_thread(transcode_worker.abort)
+    await manager.heartbeat.stop()
+    await notification_coalescer.stop()
+    await progress_hub.stop()
+    await progress_store.stop()
+    await presence_buffer.stop()
+    await presence_registry.stop()
+    await event_bus.stop()
 
 app = FastAPI(
     title="Digital Signage Management API",
@@ -37,8 +63,9 @@ app = FastAPI(
 
 # --- MODIFICARE FINALĂ: Căi absolute și diagnosticare ---
 # Folosim direct calea absolută pe care ai confirmat-o.
-STATIC_DIRECTORY = "/srv/signage-app/backend/app/static"
-THUMBNAIL_DIRECTORY = "/srv/signage-app/media_files/thumbnails"
+# Pot fi suprascrise prin variabile de mediu (ex: instanță locală pentru benchmark-uri)
+STATIC_DIRECTORY = os.getenv("STATIC_DIRECTORY", "/srv/signage-app/backend/app/static")
+THUMBNAIL_DIRECTORY = os.getenv("THUMBNAIL_DIRECTORY", "/srv/signage-app/media_files/thumbnails")
 
 # --- BLOC DE DIAGNOSTICARE LA PORNIREA SERVERULUI ---
 # Aceste mesaje vor apărea în log-urile `uvicorn` și ne vor ajuta.
@@ -89,59 +116,83 @@ api_router.include_router(admin_router.router)
 api_router.include_router(dashboard_router.router)
 api_router.include_router(reports_router.router)
 
-async def keep_alive(websocket: WebSocket):
-    while True:
-        await asyncio.sleep(15)
-        try:
-            await websocket.send_json({"type": "ping"})
-        except (WebSocketDisconnect, ConnectionResetError):
-            break
-        except Exception:
-            break
-
-@api_router.websocket("/ws/connect/{screen_key}")
-async def websocket_endpoint(websocket: WebSocket, screen_key: str):
-    await manager.connect(websocket, screen_key)
-    
+def get_screen_owner_id(screen_key: str):
+    """Proprietarul ecranului, pentru indexul user -> ecrane din ConnectionManager"""
     db = SessionLocal()
     try:
-        screen = db.query(models.Screen).filter(models.Screen.unique_key == screen_key).first()
-        if screen:
-            screen.last_seen = datetime.now(timezone.utc)
-            db.commit()
+        return db.query(models.Screen.created_by_id).filter(models.Screen.unique_key == screen_key).scalar()
     finally:
         db.close()
+
+@api_router.websocket("/ws/connect/{screen_key}")
+async def websocket_endpoint(websocket: WebSocket, screen_key: str):
+    # Interogarea rulează în threadpool: la o avalanșă de reconectări nu blochează celelalte socket-uri
+    owner_id = await asyncio.to_thread(get_screen_owner_id, screen_key)
+    connection = await manager.connect(websocket, screen_key, owner_id)
+    presence_buffer.record_seen(screen_key)
+    connection_id = uuid.uuid4().hex
+    await presence_registry.screen_connected(connection_id, screen_key, connection.connected_at)
     
-    keep_alive_task = asyncio.create_task(keep_alive(websocket))
-    
+    # Ping-urile sunt trimise de manager.heartbeat (un singur task pentru toate conexiunile)
     try:
         while True:
             data = await websocket.receive_text()
             try:
                 message = json.loads(data)
                 msg_type = message.get("type")
+                connection.touch(pong=(msg_type == "pong"))
 
                 if msg_type == "device_info":
-                    db = SessionLocal()
-                    try:
-                        screen_to_update = db.query(models.Screen).filter(models.Screen.unique_key == screen_key).first()
-                        if screen_to_update:
-                            screen_to_update.player_version = message.get("version")
-                            screen_to_update.screen_resolution = message.get("resolution")
-                            db.commit()
-                            print(f"INFO: S-au primit datele pentru ecranul {screen_key}: v{message.get('version')}, res {message.get('resolution')}")
-                    finally:
-                        db.close()
+                    presence_buffer.record_device_info(screen_key, message.get("version"), message.get("resolution"))
+                    print(f"INFO: S-au primit datele pentru ecranul {screen_key}: v{message.get('version')}, res {message.get('resolution')}")
+                    protocol = int(message.get("protocol") or 1)
+                    if protocol >= MANIFEST_PUSH_PROTOCOL:
+                        connection.negotiate(protocol, message.get("playlist_version"), bool(message.get("delta")))
+                        # Player-ul a pierdut modificări cât a fost deconectat: îi trimitem direct manifestul.
+                        # Fără versiune în cache, player-ul face oricum sincronizarea HTTP la pornire.
+                        if connection.known_version:
+                            manager.push_manifest(connection)
+                else:
+                    presence_buffer.record_seen(screen_key)
 
             except json.JSONDecodeError:
-                pass
+                connection.touch()
             except Exception as e:
                 print(f"EROARE la procesarea mesajului WebSocket: {e}")
 
     except WebSocketDisconnect:
-        manager.disconnect(screen_key)
+        pass
     finally:
-        keep_alive_task.cancel()
+        # Orice ieșire din buclă (inclusiv erori) scoate conexiunea din manager
+        manager.disconnect(screen_key, websocket)
+        await presence_registry.screen_disconnected(connection_id)
+
+# --- STATISTICI INTEROGĂRI (doar pentru benchmark, QUERY_STATS_ENABLED=1) ---
+if QUERY_STATS_ENABLED:
+    query_stats.install(engine)
+    print("INFO: Contorizarea interogărilor SQL per endpoint este activă (QUERY_STATS_ENABLED=1)")
+
+    @app.middleware("http")
+    async def count_queries_per_endpoint(request: Request, call_next):
+        token = query_stats.begin_request()
+        endpoint = request.url.path
+        try:
+            return await call_next(request)
+        finally:
+            route = request.scope.get("route")
+            if route is not None:
+                endpoint = getattr(route, "path", endpoint)
+            query_stats.end_request(token, f"{request.method} {endpoint}")
+
+    @api_router.get("/debug/query-stats", tags=["Debug"])
+    def get_query_stats():
+        return query_stats.snapshot()
+
+    @api_router.delete("/debug/query-stats", status_code=status.HTTP_204_NO_CONTENT, tags=["Debug"])
+    def reset_query_stats():
+        query_stats.reset()
+        return Response(status_code=status.HTTP_204_NO_CONTENT)
+# --- FINAL STATISTICI ---
 
 app.include_router(api_router)
 
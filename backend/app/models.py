@@ -1,6 +1,6 @@
 # Cale fișier: app/models.py
 
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Float, Enum as SQLAlchemyEnum
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Float, Text, Time, UniqueConstraint, Enum as SQLAlchemyEnum
 from sqlalchemy.orm import relationship
 from datetime import datetime, timezone
 from .database import Base
@@ -14,6 +14,12 @@ class ProcessingStatus(enum.Enum):
     COMPLETED = "COMPLETED"
     FAILED = "FAILED"
 
+class JobStatus(enum.Enum):
+    QUEUED = "QUEUED"
+    RUNNING = "RUNNING"
+    DONE = "DONE"
+    FAILED = "FAILED"
+
 class EventType(enum.Enum):
     START = "START"
     END = "END"
@@ -28,6 +34,9 @@ class User(Base):
     is_admin = Column(Boolean, default=False)
     is_verified = Column(Boolean, default=False, nullable=False)
     disk_quota_mb = Column(Integer, default=1024, nullable=False)
+    # Planificarea encodărilor (fair share): ponderea în round-robin și limita de encodări simultane
+    encode_weight = Column(Integer, default=1, nullable=False)
+    max_concurrent_encodes = Column(Integer, nullable=True)
     last_login_at = Column(DateTime(timezone=True), nullable=True)
 
 class MediaFile(Base):
@@ -39,6 +48,7 @@ class MediaFile(Base):
     thumbnail_path = Column(String, nullable=True)
     type = Column(String, nullable=False)
     size = Column(Integer, nullable=False)
+    content_sha256 = Column(String(64), nullable=True)  # SHA-256 al fișierului stocat (pentru verificare în player)
     duration = Column(Float, nullable=True)
     tags = Column(String, nullable=True)
     uploaded_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
@@ -47,6 +57,21 @@ class MediaFile(Base):
     processing_eta = Column(Integer, nullable=True)  # timp estimat rămas în secunde
     processing_speed = Column(String, nullable=True)  # viteză de procesare (ex: "2.5x")
     processing_started_at = Column(DateTime(timezone=True), nullable=True)
+    transcode_action = Column(String(16), nullable=True)  # none / remux / audio / transcode (vezi services/transcode_plan.py)
+
+    # --- METADATE FFPROBE (vezi services/media_probe.py), pentru fișierul stocat ---
+    width = Column(Integer, nullable=True)
+    height = Column(Integer, nullable=True, index=True)
+    video_codec = Column(String(32), nullable=True, index=True)
+    video_profile = Column(String(64), nullable=True)
+    video_level = Column(Integer, nullable=True)
+    bitrate = Column(Integer, nullable=True)  # bps, din containerul întreg
+    fps = Column(Float, nullable=True)
+    audio_codec = Column(String(32), nullable=True)
+    rotation = Column(Integer, nullable=True)  # rotația de afișare a video-ului (0 / 90 / 180 / 270)
+    orientation = Column(Integer, nullable=True)  # EXIF Orientation (1-8), doar pentru imagini
+    probe_data = Column(Text, nullable=True)  # ieșirea ffprobe redusă (JSON), pentru etapele de procesare
+    probed_at = Column(DateTime(timezone=True), nullable=True)
     uploaded_by_id = Column(Integer, ForeignKey("users.id"))
     uploader = relationship("User")
 
@@ -56,6 +81,7 @@ class MediaFile(Base):
     # --- FINAL CÂMPURI NOI ---
 
     playlist_items = relationship("PlaylistItem", back_populates="media_file")
+    renditions = relationship("MediaRendition", back_populates="media_file", cascade="all, delete-orphan")
 
 class Playlist(Base):
     __tablename__ = "playlists"
@@ -72,6 +98,46 @@ class Playlist(Base):
     
     items = relationship("PlaylistItem", back_populates="playlist", cascade="all, delete-orphan")
     playback_logs = relationship("PlaybackLog", back_populates="playlist", cascade="all, delete-orphan")
+    schedules = relationship("ScreenSchedule", back_populates="playlist", cascade="all, delete-orphan")
+
+class TranscodeJob(Base):
+    """Job de procesare video persistent; revendicat de workeri cu lease + heartbeat (vezi services/job_queue.py)"""
+    __tablename__ = "transcode_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    media_file_id = Column(Integer, ForeignKey("media_files.id", ondelete="CASCADE"), nullable=False, index=True)
+    owner_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=True, index=True)  # uploaded_by_id, pentru fair share
+    size_bytes = Column(Integer, nullable=True)  # fișierele mici primesc prioritate în coada utilizatorului
+    status = Column(SQLAlchemyEnum(JobStatus), nullable=False, default=JobStatus.QUEUED, index=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    run_after = Column(DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc))  # backoff între reîncercări
+    leased_by = Column(String, nullable=True)  # identificatorul worker-ului care rulează job-ul
+    lease_expires_at = Column(DateTime(timezone=True), nullable=True)  # după expirare, job-ul poate fi preluat de alt worker
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)
+    started_at = Column(DateTime(timezone=True), nullable=True)  # ultima revendicare
+    last_error = Column(String, nullable=True)
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    media_file = relationship("MediaFile")
+
+class MediaRendition(Base):
+    """Variantă la rezoluție redusă a unui video, pentru ecranele mai mici (vezi services/renditions.py)"""
+    __tablename__ = "media_renditions"
+    __table_args__ = (UniqueConstraint("media_file_id", "height", name="uq_media_renditions_media_height"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    media_file_id = Column(Integer, ForeignKey("media_files.id", ondelete="CASCADE"), nullable=False, index=True)
+    height = Column(Integer, nullable=False)  # treapta: latura scurtă a imaginii
+    width = Column(Integer, nullable=True)  # latura lungă
+    bitrate_kbps = Column(Integer, nullable=False)
+    path = Column(String, nullable=False)
+    size = Column(Integer, nullable=False)
+    content_sha256 = Column(String(64), nullable=True)
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+
+    media_file = relationship("MediaFile", back_populates="renditions")
 
 class PlaylistItem(Base):
     __tablename__ = "playlist_items"
@@ -109,6 +175,38 @@ class Screen(Base):
     assigned_playlist = relationship("Playlist")
     playback_logs = relationship("PlaybackLog", back_populates="screen", cascade="all, delete-orphan")
 
+    # --- PROGRAMĂRI (DAYPARTING) ---
+    # Se schimbă la fiecare modificare a programărilor, invalidând indexul din cache
+    schedule_version = Column(String, nullable=True)
+    schedules = relationship("ScreenSchedule", back_populates="screen", cascade="all, delete-orphan")
+
+class ScreenSchedule(Base):
+    __tablename__ = "screen_schedules"
+
+    id = Column(Integer, primary_key=True, index=True)
+    screen_id = Column(Integer, ForeignKey("screens.id", ondelete="CASCADE"), nullable=False, index=True)
+    playlist_id = Column(Integer, ForeignKey("playlists.id", ondelete="CASCADE"), nullable=False)
+    start_time = Column(Time, nullable=False)  # ora locală de început (SCHEDULE_TIMEZONE)
+    end_time = Column(Time, nullable=False)  # dacă end_time <= start_time, fereastra trece peste miezul nopții
+    days_of_week = Column(Integer, nullable=False, default=127)  # bit 0 = luni ... bit 6 = duminică
+    priority = Column(Integer, nullable=False, default=0)  # la suprapunere câștigă prioritatea mai mare
+    valid_from = Column(DateTime(timezone=True), nullable=True)
+    valid_until = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+
+    screen = relationship("Screen", back_populates="schedules")
+    playlist = relationship("Playlist", back_populates="schedules")
+
+class ScreenConnection(Base):
+    """Registru comun de prezență: o linie per conexiune WebSocket deschisă, în orice worker"""
+    __tablename__ = "screen_connections"
+
+    connection_id = Column(String, primary_key=True)
+    screen_key = Column(String, nullable=False, index=True)
+    worker_id = Column(String, nullable=False, index=True)
+    connected_at = Column(DateTime(timezone=True), nullable=False)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=False)  # reîmprospătat periodic de worker-ul care ține socket-ul
+
 class PlaybackLog(Base):
     __tablename__ = "playback_logs"
 
@@ -8,6 +8,10 @@ from sqlalchemy import func
 
 from .. import models, schemas, auth
 from ..database import get_db
+from ..connection_manager import manager
+from ..services.notification_coalescer import notification_coalescer
+from ..services.progress_hub import progress_hub
+from .media_router import THUMBNAIL_DIRECTORY, cancel_media_processing, remove_rendition_files
 
 router = APIRouter(
     prefix="/admin",
@@ -15,6 +19,11 @@ router = APIRouter(
     dependencies=[Depends(auth.get_admin_user)]
 )
 
+@router.get("/websocket-stats")
+def get_websocket_stats():
+    """Conexiunile WebSocket ale acestui worker și clienții închiși pentru că rămâneau în urmă"""
+    return {**manager.stats(), "notifications": notification_coalescer.stats(), "progress": progress_hub.stats()}
+
 @router.get("/users", response_model=List[schemas.UserPublic])
 def get_all_users(db: Session = Depends(get_db)):
     users = db.query(models.User).all()
@@ -63,13 +72,15 @@ def delete_user_by_admin(user_id: int, db: Session = Depends(get_db)):
     screens_to_delete = db.query(models.Screen).filter(models.Screen.created_by_id == user_id).all()
     media_files_to_delete = db.query(models.MediaFile).filter(models.MediaFile.uploaded_by_id == user_id).all()
 
-    # Pasul 2: Ștergem fișierele fizice de pe disc
+    # Pasul 2: Oprim procesările în curs, apoi ștergem fișierele fizice de pe disc
+    cancel_media_processing(db, [media_file.id for media_file in media_files_to_delete])
     for media_file in media_files_to_delete:
+        remove_rendition_files(media_file)
         try:
             if os.path.exists(media_file.path):
                 os.remove(media_file.path)
             if media_file.thumbnail_path:
-                full_thumb_path = os.path.join("/srv/signage-app/media_files/thumbnails", media_file.thumbnail_path)
+                full_thumb_path = os.path.join(THUMBNAIL_DIRECTORY, media_file.thumbnail_path)
                 if os.path.exists(full_thumb_path):
                     os.remove(full_thumb_path)
         except OSError as e:
@@ -100,4 +111,8 @@ def delete_user_by_admin(user_id: int, db: Session = Depends(get_db)):
 
     db.commit()
 
+    # Ecranele șterse nu mai primesc notificările fostului proprietar
+    for screen in screens_to_delete:
+        manager.set_screen_owner(screen.unique_key, None)
+
     return {"detail": f"User '{db_user.username}' and all their resources have been deleted successfully"}
@@ -1,18 +1,29 @@
 # Cale fișier: app/routers/client_router.py
 
-from typing import List, Optional
+import hashlib
+import json
+from typing import List, NamedTuple, Optional, Tuple
 from fastapi import APIRouter, Depends, HTTPException, Header, Response, status
 from sqlalchemy.orm import Session, joinedload
 from datetime import datetime, timezone
 
 from .. import models, schemas
-from ..database import get_db
+from ..database import get_db, SessionLocal
+from ..connection_manager import MANIFEST_PUSH_PROTOCOL, playlist_updated_message
+from ..services.manifest_cache import manifest_cache
+from ..services.presence_buffer import presence_buffer
+from ..services.playlist_history import playlist_history, compute_playlist_delta
+from ..services.renditions import pick_rendition, screen_rung
+from ..services.schedule_resolver import schedule_resolver, SCHEDULE_TIMEZONE
 
 router = APIRouter(
     prefix="/client",
     tags=["Sincronizare Player"]
 )
 
+# Valoarea header-ului A-IM prin care player-ul cere sincronizare delta
+PLAYLIST_DELTA_IM = "playlist-delta"
+
 @router.post("/register", status_code=201)
 def register_client(
     payload: schemas.ScreenRegister,
@@ -39,77 +50,318 @@ def register_client(
     return {"detail": "Ecran înregistrat cu succes, se așteaptă împerecherea."}
 
 
-@router.get("/sync", response_model=schemas.ClientPlaylistResponse)
-def sync_client_playlist(
-    response: Response,
-    x_screen_key: str = Header(..., description="Cheia unică a player-ului TV"),
-    x_playlist_version: Optional[str] = Header(None, description="Versiunea de playlist aflată în cache-ul player-ului"),
-    db: Session = Depends(get_db)
-):
+def build_sync_version(playlist_id: int, playlist_version: str, screen: models.Screen) -> str:
+    """
+    Versiunea trimisă player-ului: versiunea playlist-ului + o amprentă a stării ecranului.
+    Orice schimbare de playlist, rotație sau nume de ecran produce o versiune nouă.
+    """
+    rotation_updated_at = screen.rotation_updated_at.isoformat() if screen.rotation_updated_at else ""
+    rung = screen_rung(screen.screen_resolution)
+    screen_state = f"{playlist_id}|{screen.rotation}|{rotation_updated_at}|{screen.name or ''}|{rung or ''}"
+    state_hash = hashlib.sha1(screen_state.encode("utf-8")).hexdigest()[:12]
+    return f"{playlist_version}.{state_hash}"
+
+
+def resolve_active_playlist(db: Session, screen: models.Screen, now: datetime) -> Optional[models.Playlist]:
+    """Playlist-ul care rulează acum pe ecran: din programări sau, în afara lor, cel asignat direct"""
+    playlist_id = schedule_resolver.active_playlist_id(db, screen, now)
+    if playlist_id is None:
+        return None
+    if playlist_id == screen.assigned_playlist_id:
+        return screen.assigned_playlist
+    return db.query(models.Playlist).filter(models.Playlist.id == playlist_id).first()
+
+
+def get_active_screen(db: Session, screen_key: str) -> models.Screen:
     screen = (
         db.query(models.Screen)
-        .options(joinedload(models.Screen.assigned_playlist).joinedload(models.Playlist.items).joinedload(models.PlaylistItem.media_file))
-        .filter(models.Screen.unique_key == x_screen_key)
+        .options(joinedload(models.Screen.assigned_playlist))
+        .filter(models.Screen.unique_key == screen_key)
         .first()
     )
-
     if not screen:
         raise HTTPException(status_code=404, detail="Ecran neînregistrat")
-
     if not screen.is_active:
-        return schemas.ClientPlaylistResponse(
-            id=0, name="Ecran Neactivat", items=[], playlist_version="none",
-            screen_name=screen.name, rotation=screen.rotation, rotation_updated_at=screen.rotation_updated_at
-        )
-    
-    screen.last_seen = datetime.now(timezone.utc)
-    db.commit()
+        raise HTTPException(status_code=403, detail="Ecranul nu este activat")
+    return screen
 
-    if not screen.assigned_playlist:
-        return schemas.ClientPlaylistResponse(
-            id=0, name="Niciun Playlist Asignat", items=[], playlist_version="none",
-            screen_name=screen.name, rotation=screen.rotation, rotation_updated_at=screen.rotation_updated_at
-        )
-    
-    playlist = screen.assigned_playlist
 
-    # --- AICI ESTE MODIFICAREA CHEIE ---
-    # Am eliminat condiția "if playlist.playlist_version != x_playlist_version:".
-    # Acum, lista de itemi media este construită la fiecare apel de sincronizare.
+def manifest_variant(playlist_version: str, rung: Optional[int]) -> str:
+    """
+    Cheia manifestului în cache și în istoric: ecranele cu altă treaptă de rezoluție
+    primesc alte URL-uri (variantele video potrivite), deci alt manifest.
+    """
+    return playlist_version if rung is None else f"{playlist_version}@{rung}"
+
+
+def build_playlist_manifest(db: Session, playlist: models.Playlist, rung: Optional[int] = None) -> bytes:
+    """
+    Construiește manifestul serializat al unui playlist (fără câmpurile specifice ecranului).
+    Pentru video-uri, `rung` (treapta ecranului) alege varianta de rezoluție trimisă.
+    """
+    playlist_items = (
+        db.query(models.PlaylistItem)
+        .options(joinedload(models.PlaylistItem.media_file).selectinload(models.MediaFile.renditions))
+        .filter(models.PlaylistItem.playlist_id == playlist.id)
+        .order_by(models.PlaylistItem.order)
+        .all()
+    )
+
     client_items = []
-    for item in sorted(playlist.items, key=lambda x: x.order):
+    for item in playlist_items:
         media_file = item.media_file
         
         # Pentru conținutul web, folosim direct URL-ul web
         if media_file.type == "web/html" and media_file.web_url:
             media_url = media_file.web_url
             refresh_interval = media_file.web_refresh_interval
+            content_sha256, content_size = None, None
         else:
             # Pentru conținut media tradițional (imagini/video)
             media_url = f"https://display.regio-cloud.ro/api/media/serve/{media_file.id}"
             refresh_interval = None
+            content_sha256, content_size = media_file.content_sha256, media_file.size
+            rendition = pick_rendition(media_file, rung)
+            if rendition is not None:
+                # Playerele denumesc fișierul din cache după ultimul segment al URL-ului:
+                # acesta trebuie să fie unic per media și treaptă
+                media_url = f"{media_url}/rendition/{rendition.height}/{media_file.id}_{rendition.height}.mp4"
+                content_sha256, content_size = rendition.content_sha256, rendition.size
         
         client_item = schemas.ClientPlaylistItem(
             url=media_url, 
             type=media_file.type, 
             duration=item.duration,
-            web_refresh_interval=refresh_interval
+            web_refresh_interval=refresh_interval,
+            sha256=content_sha256,
+            size=content_size
         )
         client_items.append(client_item)
-    # --- FINAL MODIFICARE ---
 
-    response_data = schemas.ClientPlaylistResponse(
-        id=playlist.id, name=playlist.name, items=client_items,
-        playlist_version=playlist.playlist_version, screen_name=screen.name,
+    # Păstrăm revizia pentru a putea calcula delta față de versiunile următoare
+    playlist_history.record(playlist.id, manifest_variant(playlist.playlist_version, rung),
+                            [item.model_dump() for item in client_items])
+
+    manifest = schemas.ClientPlaylistManifest(id=playlist.id, name=playlist.name, items=client_items)
+    print(f"INFO: Manifest reconstruit pentru playlist {playlist.id} ({len(client_items)} itemi)")
+    return manifest.model_dump_json().encode("utf-8")
+
+
+def build_playlist_delta(playlist: models.Playlist, base_playlist_version: str,
+                         rung: Optional[int] = None) -> Optional[bytes]:
+    """
+    Construiește delta serializată între o versiune mai veche a playlist-ului și cea curentă.
+    Returnează None dacă versiunea de bază nu mai există în istoric.
+    """
+    new_items = playlist_history.get(playlist.id, manifest_variant(playlist.playlist_version, rung))
+    old_items = playlist_history.get(playlist.id, manifest_variant(base_playlist_version, rung))
+    if new_items is None or old_items is None:
+        return None
+
+    delta = schemas.ClientPlaylistDelta(
+        id=playlist.id, name=playlist.name,
+        **compute_playlist_delta(old_items, new_items)
+    )
+    return delta.model_dump_json().encode("utf-8")
+
+
+def merge_manifest_and_screen_state(manifest_body: bytes, screen_state: schemas.ClientScreenState) -> bytes:
+    """Lipește câmpurile ecranului la obiectul JSON din cache, fără a-l deserializa"""
+    state_body = screen_state.model_dump_json().encode("utf-8")
+    return manifest_body[:-1] + b"," + state_body[1:]
+
+
+class SyncPayload(NamedTuple):
+    status: int  # 200 = manifest complet, 226 = delta, 304 = player-ul are deja versiunea
+    version: str
+    body: bytes
+
+
+def build_sync_payload(db: Session, screen: models.Screen, known_version: Optional[str],
+                       accept_delta: bool) -> SyncPayload:
+    """
+    Răspunsul de sincronizare pentru un ecran activ, construit din manifestele din cache.
+    Folosit atât de /client/sync (HTTP), cât și de push-ul pe WebSocket.
+    """
+    playlist = resolve_active_playlist(db, screen, datetime.now(timezone.utc))
+    if playlist:
+        sync_version = build_sync_version(playlist.id, playlist.playlist_version, screen)
+    else:
+        sync_version = build_sync_version(0, "none", screen)
+
+    # Player-ul are deja această versiune în cache: nu mai încărcăm itemii și nu mai serializăm nimic
+    if known_version and known_version == sync_version:
+        return SyncPayload(status.HTTP_304_NOT_MODIFIED, sync_version, b"")
+
+    if not playlist:
+        empty = schemas.ClientPlaylistResponse(
+            id=0, name="Niciun Playlist Asignat", items=[], playlist_version=sync_version,
+            screen_name=screen.name, rotation=screen.rotation, rotation_updated_at=screen.rotation_updated_at
+        )
+        return SyncPayload(status.HTTP_200_OK, sync_version, empty.model_dump_json().encode("utf-8"))
+
+    rung = screen_rung(screen.screen_resolution)
+    manifest_body = manifest_cache.get_or_build(
+        playlist.id, manifest_variant(playlist.playlist_version, rung),
+        lambda: build_playlist_manifest(db, playlist, rung)
+    )
+
+    # Sincronizare delta (RFC 3229): player-ul trimite "A-IM: playlist-delta" și versiunea din cache.
+    # Dacă versiunea de bază a expirat din istoric sau delta nu e mai mică, trimitem manifestul complet.
+    base_playlist_version = known_version.rpartition(".")[0] if known_version else ""
+    if accept_delta and base_playlist_version:
+        delta_body = manifest_cache.get_or_build(
+            playlist.id, manifest_variant(f"{base_playlist_version}>{playlist.playlist_version}", rung),
+            lambda: build_playlist_delta(playlist, base_playlist_version, rung) or b""
+        )
+        if delta_body and len(delta_body) < len(manifest_body):
+            delta_state = schemas.ClientDeltaScreenState(
+                base_version=known_version, playlist_version=sync_version, screen_name=screen.name,
+                rotation=screen.rotation, rotation_updated_at=screen.rotation_updated_at
+            )
+            return SyncPayload(226, sync_version, merge_manifest_and_screen_state(delta_body, delta_state))
+
+    screen_state = schemas.ClientScreenState(
+        playlist_version=sync_version, screen_name=screen.name,
         rotation=screen.rotation, rotation_updated_at=screen.rotation_updated_at
     )
+    return SyncPayload(status.HTTP_200_OK, sync_version, merge_manifest_and_screen_state(manifest_body, screen_state))
+
+
+@router.get("/sync", response_model=schemas.ClientPlaylistResponse)
+def sync_client_playlist(
+    response: Response,
+    x_screen_key: str = Header(..., description="Cheia unică a player-ului TV"),
+    x_playlist_version: Optional[str] = Header(None, description="Versiunea de playlist aflată în cache-ul player-ului"),
+    a_im: Optional[str] = Header(None, description=f"'{PLAYLIST_DELTA_IM}' pentru a primi doar diferențele față de versiunea din cache"),
+    db: Session = Depends(get_db)
+):
+    # Interogare ușoară: doar ecranul și rândul playlist-ului, fără itemi și fișiere media
+    screen = (
+        db.query(models.Screen)
+        .options(joinedload(models.Screen.assigned_playlist))
+        .filter(models.Screen.unique_key == x_screen_key)
+        .first()
+    )
+
+    if not screen:
+        raise HTTPException(status_code=404, detail="Ecran neînregistrat")
+
+    if not screen.is_active:
+        return schemas.ClientPlaylistResponse(
+            id=0, name="Ecran Neactivat", items=[], playlist_version="none",
+            screen_name=screen.name, rotation=screen.rotation, rotation_updated_at=screen.rotation_updated_at
+        )
     
+    # last_seen se scrie în lot de către buffer-ul de prezență, nu la fiecare sync
+    presence_buffer.record_seen(x_screen_key)
+
+    payload = build_sync_payload(db, screen, x_playlist_version, bool(a_im and PLAYLIST_DELTA_IM in a_im))
+
+    if payload.status == status.HTTP_304_NOT_MODIFIED:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED)
+
+    if payload.status == 226:
+        return Response(
+            content=payload.body,
+            status_code=226,
+            headers={"IM": PLAYLIST_DELTA_IM},
+            media_type="application/json"
+        )
+
     print(f"=== SYNC RESPONSE PENTRU {x_screen_key[:8]}... ===")
     print(f"Screen rotation: {screen.rotation}°")
     print(f"Rotation updated at: {screen.rotation_updated_at}")
-    print(f"Response rotation: {response_data.rotation}°")
-    print(f"Response timestamp: {response_data.rotation_updated_at}")
-    
-    return response_data
+
+    return Response(content=payload.body, media_type="application/json")
+
+
+def build_manifest_push(screen_key: str, known_version: Optional[str], accept_delta: bool) -> Optional[Tuple[str, str]]:
+    """
+    Mesajul WebSocket cu manifestul (sau delta) pentru un player care a negociat protocolul
+    de push. Returnează (versiune, mesaj) sau None dacă player-ul are deja ultima versiune.
+    Corpul este exact răspunsul /client/sync, lipit din bytes-ii din cache.
+    """
+    db = SessionLocal()
+    try:
+        screen = (
+            db.query(models.Screen)
+            .options(joinedload(models.Screen.assigned_playlist))
+            .filter(models.Screen.unique_key == screen_key)
+            .first()
+        )
+        if not screen or not screen.is_active:
+            # Player-ul tratează singur activarea / ștergerea prin sincronizarea HTTP
+            return known_version or "", playlist_updated_message()
+
+        payload = build_sync_payload(db, screen, known_version, accept_delta)
+        if payload.status == status.HTTP_304_NOT_MODIFIED:
+            return None
+
+        encoding = "delta" if payload.status == 226 else "full"
+        header = json.dumps({
+            "type": "manifest", "protocol": MANIFEST_PUSH_PROTOCOL,
+            "encoding": encoding, "version": payload.version,
+        }, separators=(",", ":")).encode("utf-8")
+        message = header[:-1] + b',"body":' + payload.body + b"}"
+        return payload.version, message.decode("utf-8")
+    finally:
+        db.close()
+
+
+@router.get("/schedule", response_model=schemas.ClientScheduleResponse)
+def get_client_schedule(
+    x_screen_key: str = Header(..., description="Cheia unică a player-ului TV"),
+    db: Session = Depends(get_db)
+):
+    """
+    Returnează programul precalculat pentru următoarele 24 de ore, astfel încât player-ul
+    să poată schimba singur playlist-ul la granițele ferestrelor, fără polling.
+    """
+    screen = get_active_screen(db, x_screen_key)
+    now = datetime.now(timezone.utc)
+    segments = schedule_resolver.timeline(db, screen, now)
+
+    playlist_ids = {playlist_id for _, _, playlist_id in segments if playlist_id is not None}
+    versions = {}
+    if playlist_ids:
+        versions = dict(
+            db.query(models.Playlist.id, models.Playlist.playlist_version)
+            .filter(models.Playlist.id.in_(playlist_ids))
+            .all()
+        )
+
+    return schemas.ClientScheduleResponse(
+        generated_at=now,
+        timezone=SCHEDULE_TIMEZONE,
+        segments=[
+            schemas.ClientScheduleSegment(
+                start=start, end=end, playlist_id=playlist_id, playlist_version=versions.get(playlist_id)
+            )
+            for start, end, playlist_id in segments
+        ]
+    )
 
 
+@router.get("/manifest/{playlist_id}", response_model=schemas.ClientPlaylistManifest)
+def get_client_manifest(
+    playlist_id: int,
+    x_screen_key: str = Header(..., description="Cheia unică a player-ului TV"),
+    db: Session = Depends(get_db)
+):
+    """Manifestul unui playlist programat pe ecran, pentru descărcarea în avans a conținutului"""
+    screen = get_active_screen(db, x_screen_key)
+    scheduled_ids = {pid for _, _, pid in schedule_resolver.timeline(db, screen)}
+    if playlist_id not in scheduled_ids:
+        raise HTTPException(status_code=404, detail="Playlist-ul nu este programat pe acest ecran")
+
+    playlist = db.query(models.Playlist).filter(models.Playlist.id == playlist_id).first()
+    if not playlist:
+        raise HTTPException(status_code=404, detail="Playlist not found")
+
+    rung = screen_rung(screen.screen_resolution)
+    manifest_body = manifest_cache.get_or_build(
+        playlist.id, manifest_variant(playlist.playlist_version, rung),
+        lambda: build_playlist_manifest(db, playlist, rung)
+    )
+    return Response(content=manifest_body, media_type="application/json")
@@ -9,7 +9,7 @@ import os
 
 from .. import models, auth
 from ..database import get_db
-from ..connection_manager import manager
+from ..services.presence_registry import presence_registry
 
 router = APIRouter(
     prefix="/dashboard",
@@ -28,7 +28,8 @@ def get_server_uptime():
 def get_dashboard_summary(db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_user)):
     # 1. Starea playerelor
     screens = db.query(models.Screen).filter(models.Screen.created_by_id == current_user.id).all()
-    online_count = sum(1 for screen in screens if screen.unique_key in manager.active_connections)
+    online_since = presence_registry.online_since(db, [screen.unique_key for screen in screens])
+    online_count = sum(1 for screen in screens if screen.unique_key in online_since)
     
     # 2. Spațiu de stocare
     total_usage_bytes = db.query(func.sum(models.MediaFile.size)).filter(models.MediaFile.uploaded_by_id == current_user.id).scalar() or 0
@@ -51,7 +52,7 @@ def get_dashboard_summary(db: Session = Depends(get_db), current_user: models.Us
             "total": len(screens),
             "online": online_count,
             "offline": len(screens) - online_count,
-            "list": [{"name": s.name, "last_seen": s.last_seen, "is_online": s.unique_key in manager.active_connections} for s in screens[:5]]
+            "list": [{"name": s.name, "last_seen": s.last_seen, "is_online": s.unique_key in online_since} for s in screens[:5]]
         },
         "storage": {
             "used_mb": total_usage_mb,
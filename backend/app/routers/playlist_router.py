@@ -6,8 +6,10 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 
 from .. import models, schemas, auth
-from ..database import get_db, SessionLocal
-from ..connection_manager import manager
+from ..database import get_db
+from ..services.notification_coalescer import notification_coalescer
+from ..services.manifest_cache import manifest_cache
+from ..services.playlist_history import playlist_history
 
 router = APIRouter(
     prefix="/playlists",
@@ -51,11 +53,7 @@ async def create_playlist(
     db.commit()
     db.refresh(db_playlist)
     
-    db_session_for_ws = SessionLocal()
-    try:
-        await manager.broadcast_to_user_screens("playlist_updated", current_user.id, db_session_for_ws)
-    finally:
-        db_session_for_ws.close()
+    notification_coalescer.user_screens_changed(current_user.id, db_playlist.playlist_version)
     
     return db_playlist
 
@@ -114,16 +112,23 @@ async def delete_playlist(
         )
     # --- FINAL BLOC NOU ---
 
+    scheduled_on = db.query(models.Screen.name).join(
+        models.ScreenSchedule, models.ScreenSchedule.screen_id == models.Screen.id
+    ).filter(models.ScreenSchedule.playlist_id == playlist_id).distinct().all()
+    if scheduled_on:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Cannot delete playlist. It is scheduled on the following screen(s): {', '.join(name for name, in scheduled_on)}."
+        )
+
     # Logica de dezasignare automată a fost eliminată.
     # Ștergerea are loc doar dacă verificarea de mai sus trece.
     db.delete(db_playlist)
     db.commit()
+    manifest_cache.invalidate_playlist(playlist_id)
+    playlist_history.forget(playlist_id)
     
-    db_session_for_ws = SessionLocal()
-    try:
-        await manager.broadcast_to_user_screens("playlist_updated", current_user.id, db_session_for_ws)
-    finally:
-        db_session_for_ws.close()
+    notification_coalescer.user_screens_changed(current_user.id)
 
 @router.put("/{playlist_id}", response_model=schemas.PlaylistPublic)
 async def update_playlist(
@@ -142,6 +147,21 @@ async def update_playlist(
 
     db_playlist.name = playlist_data.name
     db_playlist.playlist_version = str(uuid.uuid4())
+
+    # Fereastra de valabilitate a playlist-ului limitează programările care îl folosesc.
+    # Se modifică doar dacă a fost trimisă: editorul de playlist nu trimite aceste câmpuri.
+    window = playlist_data.model_dump(include={"schedule_start", "schedule_end"}, exclude_unset=True)
+    schedule_start = window.get("schedule_start", db_playlist.schedule_start)
+    schedule_end = window.get("schedule_end", db_playlist.schedule_end)
+    if (db_playlist.schedule_start, db_playlist.schedule_end) != (schedule_start, schedule_end):
+        db_playlist.schedule_start = schedule_start
+        db_playlist.schedule_end = schedule_end
+        scheduled_screen_ids = db.query(models.ScreenSchedule.screen_id).filter(
+            models.ScreenSchedule.playlist_id == playlist_id
+        )
+        db.query(models.Screen).filter(
+            models.Screen.id.in_(scheduled_screen_ids)
+        ).update({models.Screen.schedule_version: str(uuid.uuid4())}, synchronize_session=False)
     
     db.query(models.PlaylistItem).filter(models.PlaylistItem.playlist_id == playlist_id).delete()
 
@@ -166,11 +186,8 @@ async def update_playlist(
 
     db.commit()
     db.refresh(db_playlist)
+    manifest_cache.invalidate_playlist(playlist_id)
     
-    db_session_for_ws = SessionLocal()
-    try:
-        await manager.broadcast_to_user_screens("playlist_updated", current_user.id, db_session_for_ws)
-    finally:
-        db_session_for_ws.close()
+    notification_coalescer.user_screens_changed(current_user.id, db_playlist.playlist_version)
     
     return db_playlist
@@ -1,6 +1,7 @@
 # Cale: routers/screen_router.py
 
 import asyncio
+import uuid
 from typing import List
 from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.orm import Session
@@ -9,6 +10,8 @@ from datetime import datetime, timezone # Am adăugat timezone
 from .. import models, schemas, auth
 from ..database import get_db, SessionLocal
 from ..connection_manager import manager
+from ..services.notification_coalescer import notification_coalescer
+from ..services.presence_registry import presence_registry
 
 router = APIRouter(
     prefix="/screens",
@@ -41,7 +44,8 @@ async def pair_screen(
     db.commit()
     db.refresh(screen_to_pair)
     
-    await manager.send_to_screen("playlist_updated", screen_to_pair.unique_key)
+    manager.set_screen_owner(screen_to_pair.unique_key, current_user.id)
+    notification_coalescer.screen_changed(screen_to_pair.unique_key)
     
     return screen_to_pair
 
@@ -74,7 +78,7 @@ async def assign_playlist_to_screen(
     db.commit()
     db.refresh(db_screen)
 
-    await manager.send_to_screen("playlist_updated", db_screen.unique_key)
+    notification_coalescer.screen_changed(db_screen.unique_key)
     
     return db_screen
 
@@ -115,12 +119,97 @@ async def set_screen_rotation(
     db.refresh(db_screen)
 
     print(f"✅ Rotație salvată în DB. Se trimite WebSocket notification...")
-    await manager.send_to_screen("playlist_updated", db_screen.unique_key)
+    notification_coalescer.screen_changed(db_screen.unique_key)
     print(f"✅ WebSocket notification trimisă la {db_screen.unique_key}")
     
     return db_screen
 # --- FINAL ENDPOINT NOU ---
 
+# --- PROGRAMĂRI (DAYPARTING) ---
+@router.get("/{screen_id}/schedules", response_model=List[schemas.ScreenSchedulePublic])
+def get_screen_schedules(
+    screen_id: int,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    db_screen = db.query(models.Screen).filter(
+        models.Screen.id == screen_id,
+        models.Screen.created_by_id == current_user.id
+    ).first()
+
+    if not db_screen:
+        raise HTTPException(status_code=404, detail="Screen not found")
+
+    return db.query(models.ScreenSchedule).filter(
+        models.ScreenSchedule.screen_id == screen_id
+    ).order_by(models.ScreenSchedule.start_time).all()
+
+@router.post("/{screen_id}/schedules", response_model=schemas.ScreenSchedulePublic, status_code=201)
+async def create_screen_schedule(
+    screen_id: int,
+    payload: schemas.ScreenScheduleCreate,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    db_screen = db.query(models.Screen).filter(
+        models.Screen.id == screen_id,
+        models.Screen.created_by_id == current_user.id
+    ).first()
+
+    if not db_screen:
+        raise HTTPException(status_code=404, detail="Screen not found")
+
+    db_playlist = db.query(models.Playlist).filter(
+        models.Playlist.id == payload.playlist_id,
+        models.Playlist.created_by_id == current_user.id
+    ).first()
+    if not db_playlist:
+        raise HTTPException(status_code=404, detail="Playlist not found")
+
+    if payload.valid_from and payload.valid_until and payload.valid_until <= payload.valid_from:
+        raise HTTPException(status_code=400, detail="valid_until must be after valid_from.")
+
+    db_schedule = models.ScreenSchedule(screen_id=screen_id, **payload.model_dump())
+    db.add(db_schedule)
+    db_screen.schedule_version = str(uuid.uuid4())
+    db.commit()
+    db.refresh(db_schedule)
+
+    notification_coalescer.screen_changed(db_screen.unique_key)
+
+    return db_schedule
+
+@router.delete("/{screen_id}/schedules/{schedule_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_screen_schedule(
+    screen_id: int,
+    schedule_id: int,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    db_screen = db.query(models.Screen).filter(
+        models.Screen.id == screen_id,
+        models.Screen.created_by_id == current_user.id
+    ).first()
+
+    if not db_screen:
+        raise HTTPException(status_code=404, detail="Screen not found")
+
+    db_schedule = db.query(models.ScreenSchedule).filter(
+        models.ScreenSchedule.id == schedule_id,
+        models.ScreenSchedule.screen_id == screen_id
+    ).first()
+    if not db_schedule:
+        raise HTTPException(status_code=404, detail="Schedule not found")
+
+    db.delete(db_schedule)
+    db_screen.schedule_version = str(uuid.uuid4())
+    db.commit()
+
+    notification_coalescer.screen_changed(db_screen.unique_key)
+
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+# --- FINAL PROGRAMĂRI ---
+
 @router.get("/{screen_id}", response_model=schemas.ScreenPublic)
 def get_screen(
     screen_id: int,
@@ -135,10 +224,10 @@ def get_screen(
     if not db_screen:
         raise HTTPException(status_code=404, detail="Screen not found")
 
-    if db_screen.unique_key in manager.active_connections:
+    online_since = presence_registry.online_since(db, [db_screen.unique_key])
+    if db_screen.unique_key in online_since:
         db_screen.is_online = True
-        _, start_time = manager.active_connections[db_screen.unique_key]
-        db_screen.connected_since = start_time
+        db_screen.connected_since = online_since[db_screen.unique_key]
 
     return db_screen
 
@@ -185,7 +274,7 @@ async def update_screen(
     db.commit()
     db.refresh(db_screen)
 
-    await manager.send_to_screen("playlist_updated", db_screen.unique_key)
+    notification_coalescer.screen_changed(db_screen.unique_key)
 
     return db_screen
 
@@ -201,11 +290,11 @@ def get_screens(
         models.Screen.created_by_id == current_user.id
     ).offset(skip).limit(limit).all()
 
+    online_since = presence_registry.online_since(db, [screen.unique_key for screen in screens])
     for screen in screens:
-        if screen.unique_key in manager.active_connections:
+        if screen.unique_key in online_since:
             screen.is_online = True
-            _, start_time = manager.active_connections[screen.unique_key]
-            screen.connected_since = start_time
+            screen.connected_since = online_since[screen.unique_key]
 
     return screens
 
@@ -245,8 +334,11 @@ async def re_pair_screen(
     db.commit()
     db.refresh(new_player_instance)
     
+    manager.set_screen_owner(old_unique_key, None)
+    manager.set_screen_owner(new_player_instance.unique_key, new_player_instance.created_by_id)
+    notification_coalescer.discard_screen(old_unique_key)
     await manager.send_to_screen("screen_deleted", old_unique_key)
-    await manager.send_to_screen("playlist_updated", new_player_instance.unique_key)
+    notification_coalescer.screen_changed(new_player_instance.unique_key)
 
     return new_player_instance
 
@@ -268,6 +360,8 @@ async def delete_screen(
     db.delete(db_screen)
     db.commit()
     
+    manager.set_screen_owner(unique_key, None)
+    notification_coalescer.discard_screen(unique_key)
     await manager.send_to_screen("screen_deleted", unique_key)
     
     return Response(status_code=status.HTTP_204_NO_CONTENT)
@@ -1,7 +1,7 @@
 # Cale fișier: app/schemas.py
 from pydantic import BaseModel, EmailStr, conint
 from typing import List, Optional, Generic, TypeVar
-from datetime import datetime
+from datetime import datetime, time
 from pydantic.generics import GenericModel
 from .models import EventType
 from .models import EventType, ProcessingStatus # Adăugăm ProcessingStatus
@@ -18,6 +18,8 @@ class UserPublic(BaseModel):
     username: str
     is_admin: bool
     disk_quota_mb: int
+    encode_weight: int = 1
+    max_concurrent_encodes: Optional[int] = None
     current_usage_mb: float = 0.0
     last_login_at: Optional[datetime] = None
 
@@ -67,6 +69,7 @@ class MediaFilePublic(BaseModel):
     filename: str
     type: str
     size: int
+    content_sha256: Optional[str] = None
     duration: Optional[float] = None
     tags: Optional[str] = None
     thumbnail_path: Optional[str] = None
@@ -76,6 +79,21 @@ class MediaFilePublic(BaseModel):
     processing_eta: Optional[int] = None
     processing_speed: Optional[str] = None
     processing_started_at: Optional[datetime] = None
+    transcode_action: Optional[str] = None
+    # Metadate ffprobe ale fișierului stocat
+    width: Optional[int] = None
+    height: Optional[int] = None
+    video_codec: Optional[str] = None
+    video_profile: Optional[str] = None
+    video_level: Optional[int] = None
+    bitrate: Optional[int] = None
+    fps: Optional[float] = None
+    audio_codec: Optional[str] = None
+    rotation: Optional[int] = None
+    orientation: Optional[int] = None
+    # Doar pentru fișierele în așteptare: poziția în coada de encodare și ora estimată de start
+    queue_position: Optional[int] = None
+    estimated_start_at: Optional[datetime] = None
     # --- CÂMPURI NOI PENTRU CONȚINUT WEB ---
     web_url: Optional[str] = None
     web_refresh_interval: Optional[int] = None
@@ -151,6 +169,37 @@ class ScreenUpdate(BaseModel):
     rotation: Optional[int] = None
     assigned_playlist_id: Optional[int] = None
 
+# --- PROGRAMĂRI (DAYPARTING) ---
+class ScreenScheduleBase(BaseModel):
+    playlist_id: int
+    start_time: time
+    end_time: time
+    days_of_week: conint(ge=1, le=127) = 127  # bit 0 = luni ... bit 6 = duminică
+    priority: conint(ge=0, le=100) = 0
+    valid_from: Optional[datetime] = None
+    valid_until: Optional[datetime] = None
+
+class ScreenScheduleCreate(ScreenScheduleBase):
+    pass
+
+class ScreenSchedulePublic(ScreenScheduleBase):
+    id: int
+    screen_id: int
+
+    class Config:
+        from_attributes = True
+
+class ClientScheduleSegment(BaseModel):
+    start: datetime
+    end: datetime
+    playlist_id: Optional[int] = None
+    playlist_version: Optional[str] = None
+
+class ClientScheduleResponse(BaseModel):
+    generated_at: datetime
+    timezone: str
+    segments: List[ClientScheduleSegment]
+
 class PlaylistAssign(BaseModel):
     playlist_id: Optional[int] = None
 
@@ -161,6 +210,8 @@ class ClientPlaylistItem(BaseModel):
     # --- CÂMP NOU PENTRU CONȚINUT WEB ---
     web_refresh_interval: Optional[int] = None  # interval de refresh pentru conținut web
     # --- FINAL CÂMP NOU ---
+    sha256: Optional[str] = None  # hash-ul fișierului, pentru deduplicare și verificarea cache-ului
+    size: Optional[int] = None  # dimensiunea în bytes a fișierului servit
 
 class ClientPlaylistResponse(BaseModel):
     id: int
@@ -172,6 +223,42 @@ class ClientPlaylistResponse(BaseModel):
     rotation: Optional[int] = None
     rotation_updated_at: Optional[datetime] = None
 
+# Partea comună a manifestului (cache-uită per versiune de playlist)
+class ClientPlaylistManifest(BaseModel):
+    id: int
+    name: str
+    items: List[ClientPlaylistItem]
+
+# Câmpurile specifice fiecărui ecran, adăugate peste manifestul din cache
+class ClientScreenState(BaseModel):
+    playlist_version: Optional[str] = None
+    screen_name: Optional[str] = None
+    rotation: Optional[int] = None
+    rotation_updated_at: Optional[datetime] = None
+
+# --- SINCRONIZARE DELTA (A-IM: playlist-delta) ---
+class ClientPlaylistItemAdded(BaseModel):
+    key: str
+    index: int
+    item: ClientPlaylistItem
+
+class ClientPlaylistItemRetimed(BaseModel):
+    key: str
+    duration: int
+    web_refresh_interval: Optional[int] = None
+
+# Partea comună a unei delta între două versiuni de playlist (cache-uită)
+class ClientPlaylistDelta(BaseModel):
+    id: int
+    name: str
+    removed: List[str] = []
+    added: List[ClientPlaylistItemAdded] = []
+    reordered: Optional[List[str]] = None
+    retimed: List[ClientPlaylistItemRetimed] = []
+
+class ClientDeltaScreenState(ClientScreenState):
+    base_version: str
+
 class ClientSyncRequest(BaseModel):
     unique_key: str
 
@@ -184,6 +271,8 @@ class AdminUserUpdate(BaseModel):
     password: Optional[str] = None
     is_admin: Optional[bool] = None
     disk_quota_mb: Optional[int] = None
+    encode_weight: Optional[conint(ge=1, le=100)] = None
+    max_concurrent_encodes: Optional[conint(ge=1)] = None
 
 DataType = TypeVar('DataType')
 
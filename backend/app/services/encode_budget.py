@@ -0,0 +1,136 @@
+# Cale: app/services/encode_budget.py
+# Controlul de admitere pentru encodările FFmpeg: pornim job-uri noi doar cât timp mașina are resurse
+
+import multiprocessing
+import os
+import threading
+from typing import NamedTuple, Optional
+
+import psutil
+
+MEDIA_DIRECTORY = os.getenv("MEDIA_DIRECTORY", "/srv/signage-app/media_files")
+
+# Core-uri lăsate pentru API, baza de date și sistem
+ENCODE_RESERVED_CORES = int(os.getenv("ENCODE_RESERVED_CORES", "1"))
+# Un job nou pornește doar dacă load average-ul (1 min) + thread-urile lui încap în core-urile disponibile x acest raport
+ENCODE_MAX_LOAD_RATIO = float(os.getenv("ENCODE_MAX_LOAD_RATIO", "1.0"))
+# Memoria care trebuie să rămână liberă după pornirea unui job (plus estimarea per job)
+ENCODE_MIN_FREE_MEMORY_MB = int(os.getenv("ENCODE_MIN_FREE_MEMORY_MB", "1024"))
+ENCODE_MEMORY_PER_JOB_MB = int(os.getenv("ENCODE_MEMORY_PER_JOB_MB", "512"))
+# Spațiul liber minim în MEDIA_DIRECTORY (fișierul procesat este scris lângă original)
+ENCODE_MIN_FREE_DISK_MB = int(os.getenv("ENCODE_MIN_FREE_DISK_MB", "2048"))
+# Prioritatea proceselor FFmpeg: nice 0-19 și ionice best-effort 0-7 (7 = cea mai mică)
+ENCODE_NICE = int(os.getenv("ENCODE_NICE", "10"))
+ENCODE_IONICE_LEVEL = int(os.getenv("ENCODE_IONICE_LEVEL", "7"))
+
+
+class EncodeTicket(NamedTuple):
+    """Permisiunea de a rula o encodare; `threads` se transmite lui FFmpeg (-threads)"""
+    threads: int
+
+
+class EncodeBudget:
+    """
+    Înainte să revendice un job, fiecare slot al worker-ului cere un tichet. Tichetul este
+    refuzat când mașina este deja ocupată (load average), memoria disponibilă sau spațiul
+    din MEDIA_DIRECTORY scad sub prag; slotul reîncearcă la următorul poll, iar job-ul
+    rămâne în coadă pentru alt worker.
+
+    Core-urile utilizabile sunt împărțite egal între sloturi, deci N encodări simultane
+    folosesc cel mult (cores - ENCODE_RESERVED_CORES) thread-uri, nu N x cores.
+    Primul job este admis indiferent de load (altfel o mașină ocupată de altceva nu ar
+    procesa nimic), dar nu și fără memorie sau spațiu pe disc.
+    """
+
+    def __init__(self, media_directory: str = MEDIA_DIRECTORY):
+        self.media_directory = media_directory
+        self.cores = multiprocessing.cpu_count()
+        self.usable_cores = max(self.cores - ENCODE_RESERVED_CORES, 1)
+        self.active_threads = 0
+        self.active_jobs = 0
+        self.admitted = 0
+        self.deferred = 0
+        self.last_deferral: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def threads_per_job(self, slots: int) -> int:
+        return max(self.usable_cores // max(slots, 1), 1)
+
+    def sample(self) -> dict:
+        try:
+            free_disk_mb = psutil.disk_usage(self.media_directory).free / (1024 * 1024)
+        except OSError:
+            free_disk_mb = None
+        return {
+            "load_1m": psutil.getloadavg()[0],
+            "available_memory_mb": psutil.virtual_memory().available / (1024 * 1024),
+            "free_disk_mb": free_disk_mb,
+        }
+
+    def _deferral_reason(self, sample: dict, threads: int) -> Optional[str]:
+        if sample["free_disk_mb"] is not None and sample["free_disk_mb"] < ENCODE_MIN_FREE_DISK_MB:
+            return f"spațiu liber insuficient în {self.media_directory} ({sample['free_disk_mb']:.0f} MB)"
+        if sample["available_memory_mb"] < ENCODE_MIN_FREE_MEMORY_MB + ENCODE_MEMORY_PER_JOB_MB:
+            return f"memorie disponibilă insuficientă ({sample['available_memory_mb']:.0f} MB)"
+        if self.active_jobs and sample["load_1m"] + threads > self.usable_cores * ENCODE_MAX_LOAD_RATIO:
+            return f"load average prea mare ({sample['load_1m']:.2f} pe {self.usable_cores} core-uri)"
+        return None
+
+    def admit(self, slots: int) -> Optional[EncodeTicket]:
+        """Tichet pentru o encodare nouă sau None dacă bugetul este depășit"""
+        threads = self.threads_per_job(slots)
+        sample = self.sample()
+        with self._lock:
+            reason = self._deferral_reason(sample, threads)
+            if reason is not None:
+                if reason != self.last_deferral:
+                    print(f"INFO: Encodare nouă amânată: {reason}")
+                self.last_deferral = reason
+                self.deferred += 1
+                return None
+            self.last_deferral = None
+            self.active_jobs += 1
+            self.active_threads += threads
+            self.admitted += 1
+        return EncodeTicket(threads)
+
+    def release(self, ticket: EncodeTicket):
+        with self._lock:
+            self.active_jobs = max(self.active_jobs - 1, 0)
+            self.active_threads = max(self.active_threads - ticket.threads, 0)
+
+    def stats(self) -> dict:
+        sample = self.sample()
+        return {
+            "cores": self.cores,
+            "usable_cores": self.usable_cores,
+            "max_load": self.usable_cores * ENCODE_MAX_LOAD_RATIO,
+            "min_free_memory_mb": ENCODE_MIN_FREE_MEMORY_MB + ENCODE_MEMORY_PER_JOB_MB,
+            "min_free_disk_mb": ENCODE_MIN_FREE_DISK_MB,
+            "nice": ENCODE_NICE,
+            "ionice_level": ENCODE_IONICE_LEVEL,
+            "active_jobs": self.active_jobs,
+            "active_threads": self.active_threads,
+            "admitted": self.admitted,
+            "deferred": self.deferred,
+            "deferral_reason": self.last_deferral,
+            **{key: round(value, 2) if value is not None else None for key, value in sample.items()},
+        }
+
+
+def apply_encoder_priority(pid: int):
+    """Coboară prioritatea CPU și I/O a unui proces FFmpeg abia pornit"""
+    try:
+        process = psutil.Process(pid)
+        if os.name == "nt":
+            process.nice(psutil.BELOW_NORMAL_PRIORITY_CLASS)
+            return
+        process.nice(ENCODE_NICE)
+        if hasattr(process, "ionice"):
+            process.ionice(psutil.IOPRIO_CLASS_BE, ENCODE_IONICE_LEVEL)
+    except (psutil.Error, OSError, ValueError) as e:
+        # Procesul s-a terminat deja sau sistemul nu permite schimbarea; encodarea continuă normal
+        print(f"AVERTISMENT: Nu pot coborî prioritatea procesului FFmpeg {pid}: {e}")
+
+
+encode_budget = EncodeBudget()
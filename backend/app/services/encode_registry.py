@@ -0,0 +1,150 @@
+# Cale: app/services/encode_registry.py
+# Procesele FFmpeg active ale acestui proces, pentru anularea encodărilor fișierelor șterse
+
+import os
+import signal
+import subprocess
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Set
+
+
+class EncodeCancelled(Exception):
+    """Fișierul a fost șters sau resetat în timpul procesării; nu mai scriem nimic pentru el"""
+
+
+class _ActiveEncode:
+    __slots__ = ("output_path", "processes")
+
+    def __init__(self, output_path: str):
+        self.output_path = output_path
+        # Mai multe procese simultan la encodarea pe segmente (vezi segment_encode)
+        self.processes: List[subprocess.Popen] = []
+
+
+class EncodeRegistry:
+    """
+    media_id -> procesarea în curs (fișierul temporar `_processed.mp4` și procesele FFmpeg).
+
+    Anularea este cooperativă: `cancel` marchează fișierul, omoară grupul de procese
+    FFmpeg și șterge fișierul temporar; `process_video_background_task` observă marcajul
+    (EncodeCancelled) și iese fără să mai scrie în baza de date sau pe disc. Mutarea
+    rezultatului peste original se face sub același lock (`finalizing`), deci un fișier
+    șters nu poate fi readus pe disc de o encodare care tocmai se termina.
+    """
+
+    def __init__(self):
+        self._active: Dict[int, _ActiveEncode] = {}
+        self._cancelled: Set[int] = set()
+        self._lock = threading.Lock()
+        self._closed = False
+        self.cancelled_total = 0
+
+    def begin(self, media_id: int, output_path: str):
+        """Se apelează și pentru fiecare ieșire următoare a aceleiași procesări (variantele de rezoluție)"""
+        with self._lock:
+            encode = self._active.get(media_id)
+            if encode is None:
+                self._active[media_id] = _ActiveEncode(output_path)
+            else:
+                encode.output_path = output_path
+                encode.processes = []
+
+    def attach(self, media_id: int, process: subprocess.Popen):
+        """Procesul FFmpeg tocmai a pornit; dacă anularea a venit între timp, îl oprim imediat"""
+        with self._lock:
+            encode = self._active.get(media_id)
+            if encode is not None:
+                encode.processes = [p for p in encode.processes if p.poll() is None] + [process]
+            cancelled = media_id in self._cancelled or self._closed
+        if cancelled:
+            _kill_process_group(process)
+            raise EncodeCancelled(f"Procesarea media ID {media_id} a fost anulată")
+
+    def end(self, media_id: int):
+        with self._lock:
+            self._active.pop(media_id, None)
+            self._cancelled.discard(media_id)
+
+    def is_cancelled(self, media_id: int) -> bool:
+        with self._lock:
+            return media_id in self._cancelled
+
+    def check(self, media_id: int):
+        if self.is_cancelled(media_id):
+            raise EncodeCancelled(f"Procesarea media ID {media_id} a fost anulată")
+
+    @contextmanager
+    def finalizing(self, media_id: int):
+        """Pasul care scrie rezultatul pe disc; nu se suprapune cu o anulare"""
+        with self._lock:
+            if media_id in self._cancelled:
+                raise EncodeCancelled(f"Procesarea media ID {media_id} a fost anulată")
+            yield
+
+    def cancel(self, media_ids: Iterable[int]) -> int:
+        """Oprește procesările locale ale fișierelor; returnează câte erau în curs"""
+        to_stop = []
+        with self._lock:
+            for media_id in media_ids:
+                encode = self._active.get(media_id)
+                if encode is None or media_id in self._cancelled:
+                    continue
+                self._cancelled.add(media_id)
+                to_stop.append((media_id, list(encode.processes), encode.output_path))
+            self.cancelled_total += len(to_stop)
+
+        for media_id, processes, output_path in to_stop:
+            for process in processes:
+                _kill_process_group(process)
+            try:
+                if os.path.exists(output_path):
+                    os.remove(output_path)
+            except OSError as e:
+                print(f"EROARE la ștergerea fișierului temporar {output_path}: {e}")
+            print(f"INFO: Procesarea media ID {media_id} a fost anulată")
+        return len(to_stop)
+
+    def stop_processes(self, media_id: int) -> int:
+        """
+        Oprește procesele FFmpeg ale fișierului fără să anuleze procesarea (ex: segmentele încă
+        active după ce un alt segment a eșuat, înainte de reluarea cu un singur proces)
+        """
+        with self._lock:
+            encode = self._active.get(media_id)
+            processes = [process for process in encode.processes if process.poll() is None] if encode else []
+        for process in processes:
+            _kill_process_group(process)
+        return len(processes)
+
+    def close(self) -> int:
+        """Oprirea procesului: encodările în curs sunt anulate, iar FFmpeg-uri noi nu mai pornesc"""
+        with self._lock:
+            self._closed = True
+            media_ids = list(self._active)
+        return self.cancel(media_ids)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "active_encodes": len(self._active),
+                "cancelling": len(self._cancelled),
+                "cancelled_total": self.cancelled_total,
+            }
+
+
+def _kill_process_group(process: subprocess.Popen):
+    if process.poll() is not None:
+        return
+    try:
+        if os.name == "nt":
+            process.kill()
+        else:
+            # FFmpeg pornește în propria sesiune (start_new_session), deci grupul are PID-ul lui
+            os.killpg(process.pid, signal.SIGKILL)
+        process.wait(timeout=5)
+    except (ProcessLookupError, subprocess.TimeoutExpired, OSError) as e:
+        print(f"AVERTISMENT: Nu pot opri procesul FFmpeg {process.pid}: {e}")
+
+
+encode_registry = EncodeRegistry()
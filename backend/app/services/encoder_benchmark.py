@@ -0,0 +1,277 @@
+# Cale: app/services/encoder_benchmark.py
+# Benchmark-ul encoderului pe mașina curentă și profilul recomandat (preset, CRF, procese paralele)
+
+import argparse
+import json
+import os
+import re
+import shutil
+import socket
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, List, NamedTuple, Optional
+
+import psutil
+
+from .encode_budget import encode_budget
+
+MEDIA_DIRECTORY = os.getenv("MEDIA_DIRECTORY", "/srv/signage-app/media_files")
+# Profilul este specific mașinii, deci stă lângă fișierele pe care le encodează
+ENCODER_PROFILE_PATH = os.getenv("ENCODER_PROFILE_PATH", os.path.join(MEDIA_DIRECTORY, "encoder_profile.json"))
+# Viteza minimă a unui job (secunde de video encodate pe secundă) când toate sloturile sunt ocupate
+ENCODER_TARGET_REALTIME = float(os.getenv("ENCODER_TARGET_REALTIME", "1.5"))
+# Calitatea minimă (SSIM mediu față de sursă) pentru CRF-ul recomandat
+ENCODER_MIN_SSIM = float(os.getenv("ENCODER_MIN_SSIM", "0.97"))
+
+DEFAULT_PRESETS = ("veryfast", "faster", "fast", "medium")  # de la cel mai rapid la cel mai eficient
+DEFAULT_CRFS = (20, 23, 26)
+
+# Clipurile sintetice (lavfi): conținut static tip slide, mișcare moderată, detaliu fin în mișcare
+BENCHMARK_CLIPS = {
+    "bars": "smptehdbars=size={size}:rate={rate}",
+    "testsrc": "testsrc2=size={size}:rate={rate}",
+    "mandelbrot": "mandelbrot=size={size}:rate={rate}",
+}
+
+
+class BenchmarkResult(NamedTuple):
+    preset: str
+    crf: int
+    concurrency: int
+    threads: int
+    seconds: float            # durata totală a video-ului encodat
+    wall_time: float
+    realtime_factor: float    # viteza unui job (secunde de video / secundă)
+    throughput: float         # viteza agregată a mașinii (toate job-urile simultane)
+    output_bytes: int
+    cpu_percent: float
+    ssim: Optional[float] = None
+
+
+def _run(command: List[str]):
+    result = subprocess.run(command, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"FFmpeg a eșuat ({' '.join(command[:6])} ...): {result.stderr.strip()[-300:]}")
+    return result
+
+
+def render_clips(work_dir: str, duration: int, size: str, rate: int) -> Dict[str, str]:
+    """Randează clipurile lavfi o singură dată (lossless), ca benchmark-ul să măsoare doar decodare + encodare"""
+    clips = {}
+    for name, source in BENCHMARK_CLIPS.items():
+        path = os.path.join(work_dir, f"{name}.mkv")
+        _run(["ffmpeg", "-hide_banner", "-f", "lavfi", "-i", source.format(size=size, rate=rate),
+              "-t", str(duration), "-c:v", "libx264", "-preset", "ultrafast", "-qp", "0",
+              "-pix_fmt", "yuv420p", "-y", path])
+        clips[name] = path
+    return clips
+
+
+def encode_command(source_path: str, output_path: str, preset: str, crf: int, threads: int) -> List[str]:
+    """Aceeași encodare CPU ca în process_video_background_task"""
+    return ["ffmpeg", "-hide_banner", "-i", source_path, "-c:v", "libx264", "-preset", preset,
+            "-crf", str(crf), "-threads", str(threads), "-y", output_path]
+
+
+def measure_ssim(encoded_path: str, reference_path: str) -> Optional[float]:
+    result = subprocess.run(["ffmpeg", "-hide_banner", "-i", encoded_path, "-i", reference_path,
+                             "-lavfi", "[0:v][1:v]ssim", "-f", "null", "-"], capture_output=True, text=True)
+    match = re.search(r"All:([0-9.]+)", result.stderr)
+    return float(match.group(1)) if match else None
+
+
+def run_encodes(clips: List[str], work_dir: str, preset: str, crf: int, concurrency: int,
+                duration: int, with_ssim: bool = False) -> BenchmarkResult:
+    """
+    `concurrency` sloturi simultane; fiecare encodează toate clipurile, pe rând (începând cu
+    clipuri diferite), deci fiecare nivel de concurență are aceeași încărcare per job.
+    """
+    threads = encode_budget.threads_per_job(concurrency)
+
+    def run_slot(slot: int) -> List[tuple]:
+        encoded = []
+        for i in range(len(clips)):
+            source = clips[(slot + i) % len(clips)]
+            output = os.path.join(work_dir, f"out_{slot}_{i}.mp4")
+            _run(encode_command(source, output, preset, crf, threads))
+            encoded.append((source, output))
+        return encoded
+
+    psutil.cpu_percent(interval=None)
+    started = time.time()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        jobs = [job for slot_jobs in executor.map(run_slot, range(concurrency)) for job in slot_jobs]
+    wall_time = max(time.time() - started, 0.001)
+    cpu_percent = psutil.cpu_percent(interval=None)
+
+    ssim = None
+    if with_ssim:
+        values = [value for source, output in jobs if (value := measure_ssim(output, source)) is not None]
+        ssim = round(sum(values) / len(values), 5) if values else None
+    output_bytes = sum(os.path.getsize(output) for _, output in jobs)
+    for _, output in jobs:
+        os.remove(output)
+
+    seconds_per_job = duration * len(clips)
+    return BenchmarkResult(
+        preset=preset, crf=crf, concurrency=concurrency, threads=threads,
+        seconds=seconds_per_job * concurrency, wall_time=round(wall_time, 3),
+        realtime_factor=round(seconds_per_job / wall_time, 3),
+        throughput=round(seconds_per_job * concurrency / wall_time, 3),
+        output_bytes=output_bytes, cpu_percent=cpu_percent, ssim=ssim,
+    )
+
+
+def default_concurrency_levels() -> List[int]:
+    cores = encode_budget.usable_cores
+    return sorted({level for level in (1, 2, 4, cores // 2, cores) if 1 <= level <= cores})
+
+
+def recommend_crf(quality_results: List[BenchmarkResult]) -> tuple:
+    """Cel mai mare CRF (fișiere mai mici) cu SSIM mediu >= ENCODER_MIN_SSIM; returnează (crf, ssim)"""
+    crfs = sorted({result.crf for result in quality_results})
+    ssim_by_crf = {}
+    for crf in crfs:
+        values = [result.ssim for result in quality_results if result.crf == crf and result.ssim is not None]
+        ssim_by_crf[crf] = sum(values) / len(values) if values else 0.0
+    acceptable = [crf for crf in crfs if ssim_by_crf[crf] >= ENCODER_MIN_SSIM]
+    crf = max(acceptable) if acceptable else min(crfs)
+    return crf, ssim_by_crf[crf]
+
+
+def recommend(crf: int, ssim: float, parallel_results: List[BenchmarkResult], presets: List[str]) -> dict:
+    """
+    Preset + procese paralele: cel mai eficient preset (ordinea din `presets`) pentru care
+    fiecare job păstrează ENCODER_TARGET_REALTIME; dintre nivelurile de paralelism ale
+    preset-ului, cel cu cea mai mare viteză agregată. Fără nicio combinație care să atingă
+    ținta: combinația cu cea mai mare viteză agregată.
+    """
+    candidates = [result for result in parallel_results if result.realtime_factor >= ENCODER_TARGET_REALTIME]
+    if candidates:
+        preset = max({result.preset for result in candidates}, key=presets.index)
+        chosen = max((result for result in candidates if result.preset == preset), key=lambda r: r.throughput)
+        reason = f"cel mai eficient preset cu >= {ENCODER_TARGET_REALTIME}x per job"
+    else:
+        chosen = max(parallel_results, key=lambda result: result.throughput)
+        reason = f"niciun preset nu atinge {ENCODER_TARGET_REALTIME}x per job; viteza agregată maximă"
+
+    return {
+        "preset": chosen.preset,
+        "crf": crf,
+        "max_parallel_processes": chosen.concurrency,
+        "throughput": chosen.throughput,
+        "realtime_factor": chosen.realtime_factor,
+        "ssim": round(ssim, 5),
+        "reason": reason,
+    }
+
+
+def run_benchmark(duration: int = 10, size: str = "1920x1080", rate: int = 30,
+                  presets: Optional[List[str]] = None, crfs: Optional[List[int]] = None,
+                  concurrency_levels: Optional[List[int]] = None) -> dict:
+    """
+    Două etape, pe clipurile sintetice:
+    1. calitate și dimensiune: fiecare preset x CRF, un job odată, cu SSIM față de sursă
+    2. paralelism: fiecare preset la CRF-ul ales, la fiecare nivel de concurență, cu
+       thread-urile împărțite ca în encode_budget (viteză per job, agregată și CPU)
+    """
+    presets = list(presets or DEFAULT_PRESETS)
+    crfs = list(crfs or DEFAULT_CRFS)
+    concurrency_levels = concurrency_levels or default_concurrency_levels()
+    work_dir = tempfile.mkdtemp(prefix="encoder_benchmark_")
+    try:
+        print(f"INFO: Randez clipurile de test ({size}, {duration}s)")
+        clips = list(render_clips(work_dir, duration, size, rate).values())
+
+        quality_results = []
+        for preset in presets:
+            for crf in crfs:
+                for clip in clips:
+                    result = run_encodes([clip], work_dir, preset, crf, 1, duration, with_ssim=True)
+                    quality_results.append(result)
+                    print(f"INFO: {preset:>9} crf {crf}: {result.realtime_factor:.2f}x, "
+                          f"{result.output_bytes / 1024:.0f} KB, SSIM {result.ssim}")
+
+        crf, ssim = recommend_crf(quality_results)
+        parallel_results = []
+        for preset in presets:
+            for level in concurrency_levels:
+                result = run_encodes(clips, work_dir, preset, crf, level, duration)
+                parallel_results.append(result)
+                print(f"INFO: {preset:>9} x{level} ({result.threads} thread-uri): {result.realtime_factor:.2f}x per job, "
+                      f"{result.throughput:.2f}x total, CPU {result.cpu_percent:.0f}%")
+
+        version = _run(["ffmpeg", "-version"]).stdout.split("\n")[0]
+        return {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "host": {
+                "hostname": socket.gethostname(),
+                "cores": encode_budget.cores,
+                "usable_cores": encode_budget.usable_cores,
+                "ffmpeg": version,
+            },
+            "clip": {"duration": duration, "size": size, "rate": rate, "sources": list(BENCHMARK_CLIPS)},
+            "recommended": recommend(crf, ssim, parallel_results, presets),
+            "quality_results": [result._asdict() for result in quality_results],
+            "parallel_results": [result._asdict() for result in parallel_results],
+        }
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def save_profile(profile: dict, path: str = ENCODER_PROFILE_PATH):
+    temp_path = path + ".tmp"
+    with open(temp_path, "w") as f:
+        json.dump(profile, f, indent=2)
+    os.replace(temp_path, path)
+
+
+def load_profile(path: str = ENCODER_PROFILE_PATH) -> Optional[dict]:
+    """Profilul salvat de benchmark sau None (se folosesc valorile implicite)"""
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path) as f:
+            profile = json.load(f)
+        recommended = profile["recommended"]
+        return {
+            "preset": str(recommended["preset"]),
+            "crf": int(recommended["crf"]),
+            "max_parallel_processes": int(recommended["max_parallel_processes"]),
+            "cores": profile.get("host", {}).get("cores"),
+            "created_at": profile.get("created_at"),
+        }
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        print(f"AVERTISMENT: Profilul encoderului {path} nu poate fi citit: {e}")
+        return None
+
+
+def main():
+    # python -m app.services.encoder_benchmark [--duration 10] [--presets veryfast,fast] ...
+    parser = argparse.ArgumentParser(description="Benchmark FFmpeg / libx264 pe mașina curentă")
+    parser.add_argument("--duration", type=int, default=10, help="durata fiecărui clip de test (secunde)")
+    parser.add_argument("--size", default="1920x1080")
+    parser.add_argument("--rate", type=int, default=30)
+    parser.add_argument("--presets", default=",".join(DEFAULT_PRESETS), help="de la cel mai rapid la cel mai lent")
+    parser.add_argument("--crfs", default=",".join(str(crf) for crf in DEFAULT_CRFS))
+    parser.add_argument("--concurrency", default=None, help="ex. 1,2,4 (implicit: din numărul de core-uri)")
+    parser.add_argument("--output", default=ENCODER_PROFILE_PATH)
+    args = parser.parse_args()
+
+    profile = run_benchmark(
+        duration=args.duration, size=args.size, rate=args.rate,
+        presets=args.presets.split(","),
+        crfs=[int(crf) for crf in args.crfs.split(",")],
+        concurrency_levels=[int(level) for level in args.concurrency.split(",")] if args.concurrency else None,
+    )
+    save_profile(profile, args.output)
+    recommended = profile["recommended"]
+    print(f"INFO: Profil salvat în {args.output}: preset {recommended['preset']}, CRF {recommended['crf']}, "
+          f"{recommended['max_parallel_processes']} procese paralele ({recommended['reason']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,389 @@
+# Cale: app/services/event_bus.py
+# Magistrală de evenimente între procesele uvicorn (notificări WebSocket)
+
+import asyncio
+import fcntl
+import json
+import os
+import socket
+import uuid
+from typing import Awaitable, Callable, Dict, List, Optional
+
+# "local" (un singur worker), "postgres" (LISTEN/NOTIFY) sau "unix" (broker pe socket Unix)
+EVENT_BUS_BACKEND = os.getenv("EVENT_BUS_BACKEND", "local").lower()
+EVENT_BUS_SOCKET = os.getenv("EVENT_BUS_SOCKET", "/tmp/signage-event-bus.sock")
+EVENT_BUS_CHANNEL = "signage_events"
+EVENT_BUS_RECONNECT_DELAY = 2.0
+# Linii în așteptare per abonat al brokerului Unix; un abonat care rămâne în urmă cu mai mult este deconectat
+EVENT_BUS_CLIENT_QUEUE_SIZE = int(os.getenv("EVENT_BUS_CLIENT_QUEUE_SIZE", "256"))
+# Timp maxim pentru golirea buffer-ului de scriere către un abonat (sau către broker)
+EVENT_BUS_DRAIN_TIMEOUT = float(os.getenv("EVENT_BUS_DRAIN_TIMEOUT", "5"))
+# NOTIFY respinge payload-urile de 8000 de octeți sau mai mari
+PG_NOTIFY_MAX_PAYLOAD = 7900
+# Câmpul listă după care un eveniment prea mare pentru NOTIFY este împărțit în mai multe
+SPLITTABLE_EVENT_FIELDS = {"user_progress": "data", "cancel_encodes": "media_ids"}
+
+# Identificatorul acestui proces; evenimentele proprii nu sunt livrate de două ori
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+EventHandler = Callable[[dict], Awaitable[None]]
+
+
+class EventBus:
+    """
+    Interfața comună. Fiecare worker livrează singur evenimentele către socket-urile lui
+    locale și publică pe magistrală doar pentru celelalte procese. La primire, evenimentele
+    cu `origin` egal cu WORKER_ID sunt ignorate.
+    """
+
+    distributed = False
+
+    def __init__(self):
+        self._handler: Optional[EventHandler] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def start(self, handler: EventHandler):
+        self._handler = handler
+        self._loop = asyncio.get_running_loop()
+
+    async def stop(self):
+        pass
+
+    async def publish(self, event: dict):
+        pass
+
+    def publish_nowait(self, event: dict):
+        """Publică din cod sincron (handler-e FastAPI care rulează în threadpool)"""
+        if not self.distributed or self._loop is None or self._loop.is_closed():
+            return
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+        if running_loop is self._loop:
+            self._loop.create_task(self.publish(event))
+        else:
+            asyncio.run_coroutine_threadsafe(self.publish(event), self._loop)
+
+    def _encode(self, event: dict) -> str:
+        return json.dumps({**event, "origin": WORKER_ID}, separators=(",", ":"), default=str)
+
+    def _dispatch(self, payload: str):
+        try:
+            event = json.loads(payload)
+        except (TypeError, ValueError):
+            print(f"EROARE: Eveniment invalid pe magistrală: {payload!r:.200}")
+            return
+        if event.get("origin") == WORKER_ID or self._handler is None:
+            return
+        self._loop.create_task(self._safe_handle(event))
+
+    async def _safe_handle(self, event: dict):
+        try:
+            await self._handler(event)
+        except Exception as e:
+            print(f"EROARE la livrarea evenimentului {event.get('kind')}: {e}")
+
+
+class LocalEventBus(EventBus):
+    """Un singur proces: livrarea locală este suficientă, nu se publică nimic"""
+
+
+class PostgresEventBus(EventBus):
+    """
+    Folosește LISTEN/NOTIFY din PostgreSQL. O conexiune dedicată ascultă canalul și este
+    citită direct din event loop (add_reader), publicarea trece prin pool-ul SQLAlchemy.
+    """
+
+    distributed = True
+
+    def __init__(self):
+        super().__init__()
+        self._listen_conn = None
+        self._reconnect_task: Optional[asyncio.Task] = None
+
+    async def start(self, handler: EventHandler):
+        await super().start(handler)
+        await asyncio.to_thread(self._open_listener)
+        print(f"INFO: Magistrala de evenimente PostgreSQL pornită (canal {EVENT_BUS_CHANNEL}, worker {WORKER_ID})")
+
+    def _open_listener(self):
+        from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+        from ..database import engine
+
+        fairy = engine.raw_connection()
+        fairy.detach()  # conexiunea rămâne deschisă permanent, în afara pool-ului
+        conn = fairy.dbapi_connection
+        conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+        with conn.cursor() as cursor:
+            cursor.execute(f"LISTEN {EVENT_BUS_CHANNEL}")
+        self._listen_conn = conn
+        self._loop.call_soon_threadsafe(self._loop.add_reader, conn.fileno(), self._on_readable)
+
+    def _on_readable(self):
+        try:
+            self._listen_conn.poll()
+        except Exception as e:
+            print(f"EROARE: Conexiunea LISTEN a căzut: {e}")
+            self._close_listener()
+            if self._reconnect_task is None or self._reconnect_task.done():
+                self._reconnect_task = self._loop.create_task(self._reconnect())
+            return
+        while self._listen_conn.notifies:
+            notify = self._listen_conn.notifies.pop(0)
+            self._dispatch(notify.payload)
+
+    async def _reconnect(self):
+        while self._listen_conn is None:
+            await asyncio.sleep(EVENT_BUS_RECONNECT_DELAY)
+            try:
+                await asyncio.to_thread(self._open_listener)
+                print("INFO: Conexiunea LISTEN a fost refăcută")
+            except Exception as e:
+                print(f"EROARE la reconectarea magistralei PostgreSQL: {e}")
+
+    def _close_listener(self):
+        if self._listen_conn is None:
+            return
+        try:
+            self._loop.remove_reader(self._listen_conn.fileno())
+        except Exception:
+            pass
+        try:
+            self._listen_conn.close()
+        except Exception:
+            pass
+        self._listen_conn = None
+
+    async def stop(self):
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+        self._close_listener()
+
+    async def publish(self, event: dict):
+        payloads = self._notify_payloads(event)
+        if payloads:
+            await asyncio.to_thread(self._notify, payloads)
+
+    def _notify_payloads(self, event: dict) -> List[str]:
+        """Evenimentul codificat; un lot prea mare (ex: user_progress) este împărțit în jumătăți"""
+        payload = self._encode(event)
+        if len(payload.encode()) < PG_NOTIFY_MAX_PAYLOAD:
+            return [payload]
+        field = SPLITTABLE_EVENT_FIELDS.get(event.get("kind"))
+        items = event.get(field) if field else None
+        if not items or len(items) < 2:
+            print(f"EROARE: Evenimentul {event.get('kind')} depășește limita NOTIFY "
+                  f"({len(payload.encode())} octeți) și nu poate fi împărțit, eveniment pierdut")
+            return []
+        middle = len(items) // 2
+        return (self._notify_payloads({**event, field: items[:middle]}) +
+                self._notify_payloads({**event, field: items[middle:]}))
+
+    def _notify(self, payloads: List[str]):
+        from sqlalchemy import text
+        from ..database import engine
+
+        try:
+            with engine.connect() as conn:
+                for payload in payloads:
+                    conn.execute(text("SELECT pg_notify(:channel, :payload)"),
+                                 {"channel": EVENT_BUS_CHANNEL, "payload": payload})
+                conn.commit()
+        except Exception as e:
+            print(f"EROARE la publicarea evenimentului în PostgreSQL: {e}")
+
+
+class UnixSocketBroker:
+    """
+    Broker minimal: fiecare linie primită de la un client este retrimisă tuturor celorlalți.
+    Fiecare abonat are coada lui și un task de scriere care așteaptă golirea buffer-ului;
+    un abonat blocat sau prea lent este deconectat (se reconectează singur), ca memoria
+    brokerului să nu crească nelimitat.
+    Rulează fie în primul worker care obține lock-ul, fie separat:
+        python -m app.services.event_bus
+    """
+
+    def __init__(self, path: str = EVENT_BUS_SOCKET, max_queue: int = EVENT_BUS_CLIENT_QUEUE_SIZE):
+        self.path = path
+        self.max_queue = max_queue
+        self._clients: Dict[asyncio.StreamWriter, asyncio.Queue] = {}
+        self._senders: Dict[asyncio.StreamWriter, asyncio.Task] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._lock_file = None
+
+    def try_acquire(self) -> bool:
+        """Un singur proces per socket devine broker (flock pe un fișier alăturat)"""
+        lock_file = open(f"{self.path}.lock", "w")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        return True
+
+    async def start(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)  # socket rămas de la un broker oprit
+        self._server = await asyncio.start_unix_server(self._serve_client, path=self.path)
+        print(f"INFO: Broker de evenimente pornit pe {self.path} (pid {os.getpid()})")
+
+    async def _serve_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._clients[writer] = asyncio.Queue(maxsize=self.max_queue)
+        self._senders[writer] = asyncio.create_task(self._run_sender(writer, self._clients[writer]))
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                for client, queue in list(self._clients.items()):
+                    if client is writer:
+                        continue
+                    try:
+                        queue.put_nowait(line)
+                    except asyncio.QueueFull:
+                        self._evict(client, "queue_full")
+        finally:
+            self._remove(writer)
+            writer.close()
+
+    async def _run_sender(self, writer: asyncio.StreamWriter, queue: asyncio.Queue):
+        while True:
+            writer.write(await queue.get())
+            # Liniile adunate între timp pleacă împreună, cu o singură așteptare de drain
+            while not queue.empty():
+                writer.write(queue.get_nowait())
+            try:
+                await asyncio.wait_for(writer.drain(), EVENT_BUS_DRAIN_TIMEOUT)
+            except asyncio.CancelledError:
+                raise
+            except asyncio.TimeoutError:
+                self._evict(writer, "drain_timeout")
+                return
+            except Exception:
+                self._evict(writer, "send_error")
+                return
+
+    def _evict(self, writer: asyncio.StreamWriter, reason: str):
+        if writer not in self._clients:
+            return
+        print(f"EROARE: Un abonat al brokerului de evenimente rămâne în urmă ({reason}), este deconectat")
+        self._remove(writer)
+        # abort, nu close: un abonat blocat nu ar goli niciodată buffer-ul
+        writer.transport.abort()
+
+    def _remove(self, writer: asyncio.StreamWriter):
+        self._clients.pop(writer, None)
+        sender = self._senders.pop(writer, None)
+        if sender is not None and sender is not asyncio.current_task():
+            sender.cancel()
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        for client in list(self._clients):
+            self._remove(client)
+            client.close()
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+
+class UnixSocketEventBus(EventBus):
+    """Magistrală pentru mai mulți workeri pe aceeași mașină, fără dependențe externe"""
+
+    distributed = True
+
+    def __init__(self, path: str = EVENT_BUS_SOCKET):
+        super().__init__()
+        self.path = path
+        self._broker: Optional[UnixSocketBroker] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._client_task: Optional[asyncio.Task] = None
+
+    async def start(self, handler: EventHandler):
+        await super().start(handler)
+        self._client_task = asyncio.create_task(self._client_loop())
+        print(f"INFO: Magistrala de evenimente Unix pornită ({self.path}, worker {WORKER_ID})")
+
+    async def _ensure_broker(self):
+        if self._broker is not None:
+            return
+        broker = UnixSocketBroker(self.path)
+        if broker.try_acquire():
+            await broker.start()
+            self._broker = broker
+
+    async def _client_loop(self):
+        while True:
+            try:
+                await self._ensure_broker()
+                reader, writer = await asyncio.open_unix_connection(self.path)
+                self._writer = writer
+                while True:
+                    line = await reader.readline()
+                    if not line:
+                        break
+                    self._dispatch(line.decode())
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"EROARE: Conexiunea la brokerul de evenimente a eșuat: {e}")
+            finally:
+                if self._writer is not None:
+                    self._writer.close()
+                    self._writer = None
+            # Brokerul a dispărut - reîncercăm (eventual devenim noi broker)
+            await asyncio.sleep(EVENT_BUS_RECONNECT_DELAY)
+
+    async def publish(self, event: dict):
+        if self._writer is None:
+            print(f"EROARE: Brokerul de evenimente nu este disponibil, eveniment pierdut: {event.get('kind')}")
+            return
+        writer = self._writer
+        writer.write(self._encode(event).encode() + b"\n")
+        try:
+            await asyncio.wait_for(writer.drain(), EVENT_BUS_DRAIN_TIMEOUT)
+        except asyncio.TimeoutError:
+            # Brokerul nu mai citește: închidem conexiunea, _client_loop se reconectează
+            print(f"EROARE: Brokerul de evenimente nu răspunde, eveniment pierdut: {event.get('kind')}")
+            writer.transport.abort()
+
+    async def stop(self):
+        if self._client_task is not None:
+            self._client_task.cancel()
+            try:
+                await self._client_task
+            except asyncio.CancelledError:
+                pass
+        if self._broker is not None:
+            await self._broker.stop()
+            self._broker = None
+
+
+def create_event_bus(backend: str = EVENT_BUS_BACKEND) -> EventBus:
+    if backend == "postgres":
+        return PostgresEventBus()
+    if backend == "unix":
+        return UnixSocketEventBus()
+    if backend != "local":
+        print(f"EROARE: EVENT_BUS_BACKEND necunoscut '{backend}', se folosește 'local'")
+    return LocalEventBus()
+
+
+event_bus = create_event_bus()
+
+
+async def run_standalone_broker():
+    broker = UnixSocketBroker()
+    if not broker.try_acquire():
+        raise SystemExit(f"EROARE: Un alt broker rulează deja pe {EVENT_BUS_SOCKET}")
+    await broker.start()
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    asyncio.run(run_standalone_broker())
@@ -0,0 +1,110 @@
+# Cale: app/services/heartbeat.py
+# Heartbeat central (timer wheel) pentru conexiunile WebSocket ale ecranelor
+
+import asyncio
+import os
+import time
+from typing import Callable, Dict, List, Optional
+
+# La câte secunde primește fiecare conexiune un ping
+WS_PING_INTERVAL = float(os.getenv("WS_PING_INTERVAL", "15"))
+# Granularitatea roții: la fiecare tick se procesează un singur slot
+WS_HEARTBEAT_TICK = float(os.getenv("WS_HEARTBEAT_TICK", "1"))
+# O conexiune care a răspuns vreodată cu "pong" și apoi tace atât timp este considerată moartă
+WS_DEAD_TIMEOUT = float(os.getenv("WS_DEAD_TIMEOUT", str(WS_PING_INTERVAL * 3)))
+
+
+class HeartbeatWheel:
+    """
+    Înlocuiește task-ul keep_alive pornit pentru fiecare socket. Conexiunile sunt
+    împărțite round-robin în WS_PING_INTERVAL / WS_HEARTBEAT_TICK sloturi; un singur
+    task avansează roata cu un slot la fiecare tick, deci fiecare conexiune este vizitată
+    o dată pe interval, iar munca este distribuită uniform în timp.
+
+    La vizitare:
+      - conexiunile care au confirmat vreodată un ping, dar nu au mai trimis nimic de
+        WS_DEAD_TIMEOUT secunde, sunt raportate prin `on_dead` și scoase din roată;
+      - celelalte primesc un ping (pus în coada lor de trimitere). Un client vechi, care
+        nu răspunde la ping, este detectat prin eșecul trimiterii (vezi OutboundConnection).
+
+    Conexiunile trebuie să expună `last_receive`, `supports_pong` și `enqueue(message)`.
+    """
+
+    def __init__(self, on_dead: Callable[[object], None], interval: float = WS_PING_INTERVAL,
+                 tick: float = WS_HEARTBEAT_TICK, dead_timeout: float = WS_DEAD_TIMEOUT):
+        self.tick = tick
+        self.dead_timeout = dead_timeout
+        self.slots: List[Dict[int, object]] = [{} for _ in range(max(int(round(interval / tick)), 1))]
+        self._slot_of: Dict[int, int] = {}
+        self._cursor = 0
+        self._next_slot = 0
+        self._on_dead = on_dead
+        self._task: Optional[asyncio.Task] = None
+        self.pings_sent = 0
+        self.dead_evicted = 0
+
+    def add(self, connection):
+        # Round-robin: și o avalanșă de reconectări se împarte uniform pe toate sloturile
+        slot = self._next_slot
+        self._next_slot = (self._next_slot + 1) % len(self.slots)
+        self.slots[slot][id(connection)] = connection
+        self._slot_of[id(connection)] = slot
+
+    def remove(self, connection):
+        slot = self._slot_of.pop(id(connection), None)
+        if slot is not None:
+            self.slots[slot].pop(id(connection), None)
+
+    def __len__(self):
+        return len(self._slot_of)
+
+    def process_slot(self, now: Optional[float] = None) -> int:
+        """Procesează slotul curent și avansează cursorul. Returnează câte conexiuni au fost vizitate."""
+        now = now if now is not None else time.monotonic()
+        slot = self.slots[self._cursor]
+        self._cursor = (self._cursor + 1) % len(self.slots)
+
+        visited = 0
+        for connection in list(slot.values()):
+            visited += 1
+            if connection.supports_pong and now - connection.last_receive > self.dead_timeout:
+                self.remove(connection)
+                self.dead_evicted += 1
+                self._on_dead(connection)
+                continue
+            if connection.enqueue({"type": "ping"}):
+                self.pings_sent += 1
+        return visited
+
+    async def _run(self):
+        next_tick = time.monotonic()
+        while True:
+            next_tick += self.tick
+            try:
+                self.process_slot()
+            except Exception as e:
+                print(f"EROARE în bucla de heartbeat WebSocket: {e}")
+            await asyncio.sleep(max(next_tick - time.monotonic(), 0))
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "connections": len(self),
+            "slots": len(self.slots),
+            "tick_seconds": self.tick,
+            "dead_timeout_seconds": self.dead_timeout,
+            "pings_sent": self.pings_sent,
+            "dead_evicted": self.dead_evicted,
+        }
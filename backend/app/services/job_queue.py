@@ -0,0 +1,409 @@
+# Cale: app/services/job_queue.py
+# Coada persistentă de procesare video (tabela transcode_jobs)
+
+import heapq
+import os
+import threading
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import and_, func, or_, update
+from sqlalchemy.orm import Session
+
+from .. import models
+from ..database import SessionLocal
+from ..models import JobStatus, ProcessingStatus
+
+# Cât timp rămâne un job al unui worker fără heartbeat înainte să poată fi preluat de altul
+TRANSCODE_JOB_LEASE = float(os.getenv("TRANSCODE_JOB_LEASE", "120"))
+TRANSCODE_JOB_HEARTBEAT = float(os.getenv("TRANSCODE_JOB_HEARTBEAT", "30"))
+TRANSCODE_JOB_MAX_ATTEMPTS = int(os.getenv("TRANSCODE_JOB_MAX_ATTEMPTS", "3"))
+# Backoff exponențial între reîncercări: 30s, 60s, 120s, ... (maxim 15 minute)
+TRANSCODE_RETRY_BASE_DELAY = float(os.getenv("TRANSCODE_RETRY_BASE_DELAY", "30"))
+TRANSCODE_RETRY_MAX_DELAY = 900.0
+# Fișierele sub acest prag trec înaintea celor mari din coada aceluiași utilizator
+TRANSCODE_SMALL_FILE_BYTES = int(os.getenv("TRANSCODE_SMALL_FILE_BYTES", str(50 * 1024 * 1024)))
+# Durata presupusă a unui job când nu există încă job-uri terminate (pentru ora estimată de start)
+TRANSCODE_DEFAULT_JOB_SECONDS = 120.0
+TRANSCODE_ESTIMATE_SAMPLE = 20
+
+# Semnalizat la fiecare job nou, ca worker-ul din același proces să nu aștepte următorul poll
+job_available = threading.Event()
+
+
+class ClaimedJob(NamedTuple):
+    id: int
+    media_file_id: int
+    attempt: int
+    path: Optional[str]
+
+
+class QueuedJob(NamedTuple):
+    id: int
+    media_file_id: int
+    owner_id: Optional[int]
+    size_bytes: Optional[int]
+    run_after: datetime
+
+
+def enqueue_transcode(db: Session, media_file: models.MediaFile) -> models.TranscodeJob:
+    """Adaugă job-ul în sesiune; devine vizibil pentru workeri la commit-ul apelantului"""
+    job = models.TranscodeJob(
+        media_file_id=media_file.id,
+        owner_id=media_file.uploaded_by_id,
+        size_bytes=media_file.size,
+        max_attempts=TRANSCODE_JOB_MAX_ATTEMPTS,
+    )
+    db.add(job)
+    job_available.set()
+    return job
+
+
+def retry_delay(attempt: int) -> float:
+    return min(TRANSCODE_RETRY_BASE_DELAY * (2 ** max(attempt - 1, 0)), TRANSCODE_RETRY_MAX_DELAY)
+
+
+def _claimable(now: datetime):
+    return or_(
+        and_(models.TranscodeJob.status == JobStatus.QUEUED, models.TranscodeJob.run_after <= now),
+        # Worker-ul care îl rula s-a oprit fără să-l elibereze
+        and_(models.TranscodeJob.status == JobStatus.RUNNING, models.TranscodeJob.lease_expires_at < now),
+    )
+
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    # SQLite întoarce datetime-uri fără fus orar
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def _job_priority(job: QueuedJob) -> Tuple:
+    small = job.size_bytes is not None and job.size_bytes < TRANSCODE_SMALL_FILE_BYTES
+    return (not small, _as_utc(job.run_after), job.id)
+
+
+def fair_share_order(jobs: Iterable[QueuedJob], running: Dict[Optional[int], int],
+                     last_started: Dict[Optional[int], datetime],
+                     weights: Dict[Optional[int], int]) -> List[QueuedJob]:
+    """
+    Ordinea în care job-urile din coadă ar trebui pornite: round-robin ponderat între
+    utilizatori. Următorul job vine mereu de la utilizatorul cu cele mai puține encodări
+    (în curs + deja alese) raportat la `encode_weight`; la egalitate, de la cel servit
+    cel mai demult. Un utilizator cu 200 de video-uri în coadă nu poate întârzia
+    upload-ul altuia cu mai mult de un job per slot.
+
+    În coada fiecărui utilizator, fișierele mici trec înaintea celor mari, apoi FIFO.
+    """
+    per_owner: Dict[Optional[int], deque] = {}
+    for job in sorted(jobs, key=_job_priority):
+        per_owner.setdefault(job.owner_id, deque()).append(job)
+
+    epoch = datetime.min.replace(tzinfo=timezone.utc)
+    heap = []
+    for sequence, owner_id in enumerate(per_owner):
+        weight = max(weights.get(owner_id) or 1, 1)
+        served_at = (_as_utc(last_started.get(owner_id)) or epoch).timestamp()
+        heap.append((running.get(owner_id, 0) / weight, served_at, sequence, owner_id))
+    heapq.heapify(heap)
+
+    # Utilizatorii aleși în simulare sunt considerați serviți după toți cei reali
+    served_after = datetime.now(timezone.utc).timestamp()
+    sequence = len(heap)
+    order = []
+    while heap:
+        load, _, _, owner_id = heapq.heappop(heap)
+        queue = per_owner[owner_id]
+        order.append(queue.popleft())
+        if queue:
+            sequence += 1
+            weight = max(weights.get(owner_id) or 1, 1)
+            heapq.heappush(heap, (load + 1 / weight, served_after + sequence, sequence, owner_id))
+    return order
+
+
+class _QueueState(NamedTuple):
+    queued: List[QueuedJob]
+    running: Dict[Optional[int], int]
+    last_started: Dict[Optional[int], datetime]
+    weights: Dict[Optional[int], int]
+    caps: Dict[Optional[int], Optional[int]]
+
+
+def _load_queue_state(db: Session, now: datetime, ready_only: bool = True) -> _QueueState:
+    job = models.TranscodeJob
+    queued_filter = [job.status == JobStatus.QUEUED]
+    if ready_only:
+        queued_filter.append(job.run_after <= now)
+    queued = [
+        QueuedJob(*row) for row in
+        db.query(job.id, job.media_file_id, job.owner_id, job.size_bytes, job.run_after)
+        .filter(*queued_filter)
+        .all()
+    ]
+    running = dict(
+        db.query(job.owner_id, func.count(job.id))
+        .filter(job.status == JobStatus.RUNNING, job.lease_expires_at >= now)
+        .group_by(job.owner_id)
+        .all()
+    )
+    owner_ids = {queued_job.owner_id for queued_job in queued} - {None}
+    last_started, weights, caps = {}, {}, {}
+    if owner_ids:
+        last_started = dict(
+            db.query(job.owner_id, func.max(job.started_at))
+            .filter(job.owner_id.in_(owner_ids), job.started_at.isnot(None))
+            .group_by(job.owner_id)
+            .all()
+        )
+        for user_id, weight, cap in (
+            db.query(models.User.id, models.User.encode_weight, models.User.max_concurrent_encodes)
+            .filter(models.User.id.in_(owner_ids))
+            .all()
+        ):
+            weights[user_id] = weight
+            caps[user_id] = cap
+    return _QueueState(queued, running, last_started, weights, caps)
+
+
+def _claim_candidates(db: Session, now: datetime) -> List[int]:
+    """Job-urile rămase fără lease sunt reluate primele; restul în ordinea fair share"""
+    orphaned = [
+        job_id for (job_id,) in
+        db.query(models.TranscodeJob.id)
+        .filter(models.TranscodeJob.status == JobStatus.RUNNING, models.TranscodeJob.lease_expires_at < now)
+        .order_by(models.TranscodeJob.lease_expires_at)
+        .all()
+    ]
+    state = _load_queue_state(db, now)
+    candidates = []
+    for queued_job in fair_share_order(state.queued, state.running, state.last_started, state.weights):
+        cap = state.caps.get(queued_job.owner_id)
+        if cap is not None and state.running.get(queued_job.owner_id, 0) >= cap:
+            continue
+        candidates.append(queued_job.id)
+    return orphaned + candidates
+
+
+def claim_next_job(worker_id: str) -> Optional[ClaimedJob]:
+    """
+    Revendică următorul job, în ordinea dată de `fair_share_order`; utilizatorii care au
+    atins `max_concurrent_encodes` sunt săriți. În PostgreSQL rândul este blocat cu
+    FOR UPDATE SKIP LOCKED, deci workerii concurenți nu se așteaptă unii pe alții;
+    UPDATE-ul condiționat de `attempts` garantează exclusivitatea și acolo unde
+    SKIP LOCKED nu există (SQLite).
+    """
+    db = SessionLocal()
+    try:
+        now = datetime.now(timezone.utc)
+        for job_id in _claim_candidates(db, now):
+            job = (
+                db.query(models.TranscodeJob)
+                .filter(models.TranscodeJob.id == job_id, _claimable(now))
+                .with_for_update(skip_locked=True)
+                .first()
+            )
+            if job is None:
+                db.rollback()
+                continue  # preluat sau blocat de alt worker
+
+            if job.status == JobStatus.RUNNING:
+                print(f"AVERTISMENT: Job-ul {job.id} a rămas fără lease (worker {job.leased_by}), este preluat din nou")
+
+            if job.attempts >= job.max_attempts:
+                # Job-ul a oprit deja worker-ul de prea multe ori (ex: FFmpeg omorât de OOM)
+                _mark_failed(db, job, job.last_error or "Lease expirat de prea multe ori")
+                db.commit()
+                continue
+
+            attempt = job.attempts + 1
+            claimed = db.execute(
+                update(models.TranscodeJob)
+                .where(models.TranscodeJob.id == job.id, models.TranscodeJob.attempts == job.attempts,
+                       _claimable(now))
+                .values(status=JobStatus.RUNNING, attempts=attempt, leased_by=worker_id,
+                        lease_expires_at=now + timedelta(seconds=TRANSCODE_JOB_LEASE), heartbeat_at=now,
+                        started_at=now)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            media_file = db.get(models.MediaFile, job.media_file_id) if claimed else None
+            db.commit()
+            if claimed:
+                return ClaimedJob(job.id, job.media_file_id, attempt, media_file.path if media_file else None)
+        db.rollback()
+        return None
+    finally:
+        db.close()
+
+
+def _lease_held(job_id: int, worker_id: str, attempt: int):
+    return and_(
+        models.TranscodeJob.id == job_id,
+        models.TranscodeJob.leased_by == worker_id,
+        models.TranscodeJob.attempts == attempt,
+        models.TranscodeJob.status == JobStatus.RUNNING,
+    )
+
+
+def heartbeat(job: ClaimedJob, worker_id: str) -> bool:
+    """Prelungește lease-ul. False dacă job-ul a fost între timp preluat de alt worker sau anulat."""
+    db = SessionLocal()
+    try:
+        now = datetime.now(timezone.utc)
+        renewed = db.execute(
+            update(models.TranscodeJob)
+            .where(_lease_held(job.id, worker_id, job.attempt))
+            .values(heartbeat_at=now, lease_expires_at=now + timedelta(seconds=TRANSCODE_JOB_LEASE))
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.commit()
+        return bool(renewed)
+    finally:
+        db.close()
+
+
+def _mark_failed(db: Session, job: models.TranscodeJob, error: str):
+    job.status = JobStatus.FAILED
+    job.last_error = error
+    job.leased_by = None
+    job.lease_expires_at = None
+    job.finished_at = datetime.now(timezone.utc)
+    media_file = db.get(models.MediaFile, job.media_file_id)
+    if media_file is not None:
+        media_file.processing_status = ProcessingStatus.FAILED
+
+
+def finish_job(job: ClaimedJob, worker_id: str, error: Optional[str] = None) -> JobStatus:
+    """
+    Marchează rezultatul. La eroare, job-ul revine în coadă cu backoff până la
+    max_attempts, iar fișierul este afișat din nou ca "în așteptare".
+    """
+    db = SessionLocal()
+    try:
+        db_job = (
+            db.query(models.TranscodeJob)
+            .filter(_lease_held(job.id, worker_id, job.attempt))
+            .with_for_update()
+            .first()
+        )
+        if db_job is None:
+            return JobStatus.FAILED  # lease pierdut: rezultatul aparține altui worker
+
+        now = datetime.now(timezone.utc)
+        if error is None:
+            db_job.status = JobStatus.DONE
+            db_job.finished_at = now
+        elif db_job.attempts < db_job.max_attempts:
+            db_job.status = JobStatus.QUEUED
+            db_job.run_after = now + timedelta(seconds=retry_delay(db_job.attempts))
+            db_job.last_error = error
+            media_file = db.get(models.MediaFile, db_job.media_file_id)
+            if media_file is not None:
+                media_file.processing_status = ProcessingStatus.PENDING
+            print(f"INFO: Job-ul {db_job.id} va fi reîncercat după {retry_delay(db_job.attempts):.0f}s "
+                  f"(încercarea {db_job.attempts}/{db_job.max_attempts}): {error}")
+        else:
+            _mark_failed(db, db_job, error)
+        db_job.leased_by = None
+        db_job.lease_expires_at = None
+        db.commit()
+        return db_job.status
+    finally:
+        db.close()
+
+
+def release_job(job: ClaimedJob, worker_id: str) -> bool:
+    """
+    Worker-ul se oprește în timpul job-ului: job-ul revine imediat în coadă, fără să consume
+    o încercare (altfel ar aștepta expirarea lease-ului). False dacă lease-ul era deja pierdut.
+    """
+    db = SessionLocal()
+    try:
+        db_job = (
+            db.query(models.TranscodeJob)
+            .filter(_lease_held(job.id, worker_id, job.attempt))
+            .with_for_update()
+            .first()
+        )
+        if db_job is None:
+            return False
+        db_job.status = JobStatus.QUEUED
+        db_job.attempts = max(db_job.attempts - 1, 0)
+        db_job.run_after = datetime.now(timezone.utc)
+        db_job.leased_by = None
+        db_job.lease_expires_at = None
+        media_file = db.get(models.MediaFile, db_job.media_file_id)
+        if media_file is not None:
+            media_file.processing_status = ProcessingStatus.PENDING
+        db.commit()
+        return True
+    finally:
+        db.close()
+
+
+def cancel_jobs_for_media(db: Session, media_file_ids: Iterable[int]) -> int:
+    """Oprește job-urile încă active ale fișierelor (în sesiunea apelantului)"""
+    media_file_ids = list(media_file_ids)
+    if not media_file_ids:
+        return 0
+    return db.execute(
+        update(models.TranscodeJob)
+        .where(models.TranscodeJob.media_file_id.in_(media_file_ids),
+               models.TranscodeJob.status.in_([JobStatus.QUEUED, JobStatus.RUNNING]))
+        .values(status=JobStatus.FAILED, last_error="Anulat", leased_by=None, lease_expires_at=None,
+                finished_at=datetime.now(timezone.utc))
+        .execution_options(synchronize_session=False)
+    ).rowcount
+
+
+def queue_stats(db: Session) -> Dict[str, int]:
+    counts = dict(
+        db.query(models.TranscodeJob.status, func.count(models.TranscodeJob.id))
+        .group_by(models.TranscodeJob.status)
+        .all()
+    )
+    return {status.value.lower(): counts.get(status, 0) for status in JobStatus}
+
+
+def _average_job_seconds(db: Session) -> float:
+    finished = (
+        db.query(models.TranscodeJob.started_at, models.TranscodeJob.finished_at)
+        .filter(models.TranscodeJob.status == JobStatus.DONE, models.TranscodeJob.started_at.isnot(None))
+        .order_by(models.TranscodeJob.finished_at.desc())
+        .limit(TRANSCODE_ESTIMATE_SAMPLE)
+        .all()
+    )
+    durations = [(_as_utc(end) - _as_utc(start)).total_seconds() for start, end in finished if end is not None]
+    return sum(durations) / len(durations) if durations else TRANSCODE_DEFAULT_JOB_SECONDS
+
+
+def queue_estimates(db: Session, media_file_ids: Iterable[int]) -> Dict[int, Tuple[int, datetime]]:
+    """
+    Poziția în coadă (1 = următorul pornit) și ora estimată de start pentru fișierele date,
+    simulând ordinea fair share. Capacitatea este aproximată prin numărul de job-uri în curs,
+    iar durata prin media ultimelor job-uri terminate; limitele per utilizator sunt ignorate.
+    """
+    media_file_ids = set(media_file_ids)
+    if not media_file_ids:
+        return {}
+    now = datetime.now(timezone.utc)
+    state = _load_queue_state(db, now, ready_only=False)
+    if not any(job.media_file_id in media_file_ids for job in state.queued):
+        return {}
+
+    running_total = sum(state.running.values())
+    slots = max(running_total, 1)
+    job_seconds = _average_job_seconds(db)
+    # Când toate sloturile sunt ocupate, primul loc se eliberează în medie după o jumătate de job
+    offset = 0.5 if running_total else 0.0
+
+    estimates = {}
+    order = fair_share_order(state.queued, state.running, state.last_started, state.weights)
+    for position, job in enumerate(order, start=1):
+        if job.media_file_id not in media_file_ids:
+            continue
+        wave = (position - 1) // slots
+        start_at = now + timedelta(seconds=(wave + offset) * job_seconds)
+        estimates[job.media_file_id] = (position, max(start_at, _as_utc(job.run_after)))
+    return estimates
@@ -0,0 +1,87 @@
+# Cale: app/services/manifest_cache.py
+# Cache în memorie pentru manifestele de playlist trimise player-elor (/client/sync)
+
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Tuple
+
+ManifestKey = Tuple[int, str]
+
+
+class ManifestCache:
+    """
+    Păstrează manifestul serializat (bytes JSON) al fiecărui playlist, cheiat după
+    (playlist_id, playlist_version). Câmpurile specifice ecranului (rotație, nume)
+    NU sunt incluse - acestea sunt adăugate de handler-ul de sincronizare.
+
+    Reconstrucțiile sunt "single-flight": dacă sute de ecrane cer aceeași versiune
+    în același timp, doar un singur thread interoghează baza de date, restul așteaptă
+    rezultatul lui.
+    """
+
+    def __init__(self, max_entries: int = 512, build_timeout: float = 30.0):
+        self.max_entries = max_entries
+        self.build_timeout = build_timeout
+        self._entries: "OrderedDict[ManifestKey, bytes]" = OrderedDict()
+        self._building: Dict[ManifestKey, threading.Event] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_build(self, playlist_id: int, playlist_version: str, builder: Callable[[], bytes]) -> bytes:
+        """Returnează manifestul din cache sau îl construiește (o singură dată per cheie)"""
+        key = (playlist_id, playlist_version)
+        while True:
+            with self._lock:
+                body = self._entries.get(key)
+                if body is not None:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return body
+                build_event = self._building.get(key)
+                is_builder = build_event is None
+                if is_builder:
+                    build_event = threading.Event()
+                    self._building[key] = build_event
+                    self.misses += 1
+
+            if not is_builder:
+                # Altcineva construiește deja manifestul - așteptăm și verificăm din nou.
+                # Dacă acela eșuează, următoarea iterație preia construcția.
+                build_event.wait(self.build_timeout)
+                continue
+
+            try:
+                body = builder()
+                with self._lock:
+                    self._entries[key] = body
+                    self._entries.move_to_end(key)
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+                return body
+            finally:
+                with self._lock:
+                    self._building.pop(key, None)
+                build_event.set()
+
+    def invalidate_playlist(self, playlist_id: int):
+        """Elimină toate versiunile cache-uite ale unui playlist"""
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == playlist_id]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "building": len(self._building),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+manifest_cache = ManifestCache()
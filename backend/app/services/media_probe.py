@@ -0,0 +1,170 @@
+# Cale: app/services/media_probe.py
+# Metadatele fișierelor media (ffprobe o singură dată per fișier stocat, salvate în media_files)
+
+import json
+import struct
+import sys
+from datetime import datetime, timezone
+from typing import Optional
+
+import ffmpeg
+
+from .. import models
+
+# Din ieșirea ffprobe păstrăm doar ce folosesc etapele de procesare (vezi transcode_plan)
+STORED_FORMAT_KEYS = ("format_name", "duration", "bit_rate")
+STORED_STREAM_KEYS = ("index", "codec_type", "codec_name", "profile", "level", "pix_fmt", "field_order",
+                      "width", "height", "avg_frame_rate", "r_frame_rate", "bit_rate", "disposition",
+                      "side_data_list", "tags")
+
+
+def run_probe(path: str) -> Optional[dict]:
+    """ffprobe redus la câmpurile păstrate; None dacă fișierul nu poate fi analizat"""
+    try:
+        probe = ffmpeg.probe(path)
+    except Exception as e:
+        print(f"AVERTISMENT: Nu pot analiza fișierul {path}: {e}")
+        return None
+    return {
+        "format": {key: value for key, value in probe.get("format", {}).items() if key in STORED_FORMAT_KEYS},
+        "streams": [
+            {key: value for key, value in stream.items() if key in STORED_STREAM_KEYS}
+            for stream in probe.get("streams", [])
+        ],
+    }
+
+
+def _frame_rate(value: Optional[str]) -> Optional[float]:
+    try:
+        numerator, denominator = (value or "").split("/")
+        return round(int(numerator) / int(denominator), 3) if int(denominator) else None
+    except ValueError:
+        return None
+
+
+def _to_int(value) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _rotation(stream: dict) -> int:
+    """Rotația de afișare (0 / 90 / 180 / 270) din tag-ul `rotate` sau din Display Matrix"""
+    rotate = _to_int(stream.get("tags", {}).get("rotate"))
+    if rotate is None:
+        for side_data in stream.get("side_data_list", []):
+            if "rotation" in side_data:
+                # Display Matrix exprimă rotația în sens trigonometric
+                rotate = -int(side_data["rotation"])
+                break
+    return (rotate or 0) % 360
+
+
+def read_exif_orientation(path: str) -> Optional[int]:
+    """Tag-ul EXIF Orientation (1-8) dintr-un JPEG, fără dependențe suplimentare"""
+    try:
+        with open(path, "rb") as f:
+            if f.read(2) != b"\xff\xd8":
+                return None
+            while True:
+                marker = f.read(2)
+                if len(marker) < 2 or marker[0] != 0xFF or marker[1] in (0xD9, 0xDA):
+                    return None
+                length = struct.unpack(">H", f.read(2))[0]
+                if marker[1] != 0xE1:
+                    f.seek(length - 2, 1)
+                    continue
+                segment = f.read(length - 2)
+                if not segment.startswith(b"Exif\x00\x00"):
+                    continue
+                tiff = segment[6:]
+                endian = "<" if tiff[:2] == b"II" else ">"
+                ifd_offset = struct.unpack(endian + "I", tiff[4:8])[0]
+                entries = struct.unpack(endian + "H", tiff[ifd_offset:ifd_offset + 2])[0]
+                for i in range(entries):
+                    entry = tiff[ifd_offset + 2 + i * 12:ifd_offset + 14 + i * 12]
+                    tag, _, _, value = struct.unpack(endian + "HHI4s", entry)
+                    if tag == 0x0112:
+                        return struct.unpack(endian + "H", value[:2])[0]
+                return None
+    except (OSError, struct.error, IndexError):
+        return None
+
+
+def apply_probe(media_file: models.MediaFile, probe: Optional[dict], path: Optional[str] = None):
+    """Completează coloanele de metadate ale fișierului (în sesiunea apelantului)"""
+    media_file.probed_at = datetime.now(timezone.utc)
+    if probe is None:
+        media_file.probe_data = None
+        return
+    media_file.probe_data = json.dumps(probe, separators=(",", ":"))
+
+    streams = probe.get("streams", [])
+    video = next((s for s in streams if s.get("codec_type") == "video"
+                  and not s.get("disposition", {}).get("attached_pic")), None)
+    audio = next((s for s in streams if s.get("codec_type") == "audio"), None)
+    is_image = media_file.type.startswith("image/")
+
+    media_file.width = video.get("width") if video else None
+    media_file.height = video.get("height") if video else None
+    media_file.video_codec = video.get("codec_name") if video else None
+    media_file.video_profile = video.get("profile") if video else None
+    media_file.video_level = _to_int(video.get("level")) if video else None
+    media_file.fps = _frame_rate(video.get("avg_frame_rate") or video.get("r_frame_rate")) if video and not is_image else None
+    media_file.rotation = _rotation(video) if video else None
+    media_file.audio_codec = audio.get("codec_name") if audio else None
+    media_file.bitrate = _to_int(probe.get("format", {}).get("bit_rate"))
+    if not is_image:
+        duration = probe.get("format", {}).get("duration")
+        if duration is not None:
+            media_file.duration = float(duration)
+    media_file.orientation = read_exif_orientation(path or media_file.path) if is_image else None
+
+
+def probe_media_file(media_file: models.MediaFile, path: Optional[str] = None) -> Optional[dict]:
+    """Analizează fișierul stocat (sau `path`, ex. rezultatul unei procesări) și salvează metadatele"""
+    probe = run_probe(path or media_file.path)
+    apply_probe(media_file, probe, path)
+    return probe
+
+
+def stored_probe(media_file: models.MediaFile) -> Optional[dict]:
+    """Rezultatul ffprobe salvat; None dacă fișierul nu a fost analizat sau analiza a eșuat"""
+    if not media_file.probe_data:
+        return None
+    try:
+        return json.loads(media_file.probe_data)
+    except ValueError:
+        return None
+
+
+def backfill_missing_metadata(batch_size: int = 100) -> int:
+    """Analizează fișierele încărcate înainte de salvarea metadatelor"""
+    from ..database import SessionLocal
+
+    db = SessionLocal()
+    probed = 0
+    try:
+        while True:
+            media_files = (
+                db.query(models.MediaFile)
+                .filter(models.MediaFile.probed_at.is_(None),
+                        models.MediaFile.type.like("video/%") | models.MediaFile.type.like("image/%"))
+                .limit(batch_size)
+                .all()
+            )
+            if not media_files:
+                return probed
+            for media_file in media_files:
+                probe_media_file(media_file)
+                probed += 1
+            db.commit()
+            print(f"INFO: Metadate salvate pentru {probed} fișiere")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    # python -m app.services.media_probe [batch_size]
+    backfill_missing_metadata(int(sys.argv[1]) if len(sys.argv) > 1 else 100)
@@ -0,0 +1,92 @@
+# Cale: app/services/notification_coalescer.py
+# Grupează notificările "playlist_updated" trimise player-elor într-o fereastră scurtă
+
+import asyncio
+import os
+from typing import Dict, Optional
+
+from ..connection_manager import manager
+
+# Fereastra de grupare (secunde). O modificare izolată este trimisă după cel mult atât.
+NOTIFY_COALESCE_WINDOW = float(os.getenv("NOTIFY_COALESCE_WINDOW", "1.0"))
+
+
+class NotificationCoalescer:
+    """
+    Colectează invalidările per ecran și per utilizator și le trimite o singură dată la
+    finalul ferestrei, cu ultima versiune cunoscută. Un editor care salvează de cinci ori
+    în aceeași fereastră produce un singur re-sync al flotei.
+
+    Fereastra este fixă (pornește la prima invalidare), nu glisantă: editările continue
+    nu pot amâna notificarea la nesfârșit.
+    """
+
+    def __init__(self, window: float = NOTIFY_COALESCE_WINDOW):
+        self.window = window
+        self._pending_screens: Dict[str, Optional[str]] = {}
+        self._pending_users: Dict[int, Optional[str]] = {}
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.received = 0
+        self.sent = 0
+
+    def screen_changed(self, screen_key: str, version: Optional[str] = None):
+        self.received += 1
+        self._pending_screens[screen_key] = version or self._pending_screens.get(screen_key)
+        self._schedule_flush()
+
+    def user_screens_changed(self, user_id: int, version: Optional[str] = None):
+        self.received += 1
+        self._pending_users[user_id] = version or self._pending_users.get(user_id)
+        self._schedule_flush()
+
+    def discard_screen(self, screen_key: str):
+        """Ecranul a fost șters - notificarea în așteptare nu mai are sens"""
+        self._pending_screens.pop(screen_key, None)
+
+    def _schedule_flush(self):
+        if self._flush_handle is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        if self.window <= 0:
+            self._flush_handle = self._loop.call_soon(self._start_flush)
+        else:
+            self._flush_handle = self._loop.call_later(self.window, self._start_flush)
+
+    def _start_flush(self):
+        self._flush_handle = None
+        self._loop.create_task(self.flush())
+
+    async def flush(self):
+        screens, self._pending_screens = self._pending_screens, {}
+        users, self._pending_users = self._pending_users, {}
+
+        for user_id, version in users.items():
+            await manager.notify_user_playlists_updated(user_id, version)
+            self.sent += 1
+
+        for screen_key, version in screens.items():
+            # Ecranul primește deja mesajul prin broadcast-ul proprietarului
+            if manager.screen_owners.get(screen_key) in users:
+                continue
+            await manager.notify_playlist_updated(screen_key, version)
+            self.sent += 1
+
+    async def stop(self):
+        """La shutdown trimitem imediat ce a rămas în așteptare"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "window_seconds": self.window,
+            "pending_screens": len(self._pending_screens),
+            "pending_users": len(self._pending_users),
+            "received": self.received,
+            "sent": self.sent,
+        }
+
+
+notification_coalescer = NotificationCoalescer()
@@ -0,0 +1,110 @@
+# Cale: app/services/playlist_history.py
+# Istoric scurt al reviziilor de playlist, folosit pentru sincronizarea delta a player-elor
+
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+# Câte versiuni păstrăm pentru fiecare playlist și pentru câte playlist-uri în total
+PLAYLIST_HISTORY_DEPTH = 8
+PLAYLIST_HISTORY_MAX_PLAYLISTS = 1024
+
+
+def item_keys(items: List[dict]) -> List[str]:
+    """
+    Cheia unui item este URL-ul lui + numărul aparițiilor anterioare ale aceluiași URL.
+    Player-ul o poate calcula singur din manifestul pe care îl are deja în cache.
+    """
+    seen: Dict[str, int] = {}
+    keys = []
+    for item in items:
+        occurrence = seen.get(item["url"], 0)
+        seen[item["url"]] = occurrence + 1
+        keys.append(f"{item['url']}#{occurrence}")
+    return keys
+
+
+def _content_fields(item: dict) -> tuple:
+    return item.get("type"), item.get("sha256"), item.get("size")
+
+
+def compute_playlist_delta(old_items: List[dict], new_items: List[dict]) -> dict:
+    """
+    Calculează diferențele dintre două revizii ale listei de itemi.
+
+    Player-ul aplică delta astfel: elimină cheile din `removed`, rearanjează itemii
+    rămași după `reordered` (dacă există), inserează `added` în ordinea crescătoare a
+    indexului și actualizează duratele din `retimed`.
+    """
+    old_keys = item_keys(old_items)
+    new_keys = item_keys(new_items)
+    old_by_key = dict(zip(old_keys, old_items))
+
+    # Itemii păstrați sunt cei prezenți în ambele revizii cu același conținut. Un item al
+    # cărui conținut s-a schimbat (ex: fișier re-encodat, alt hash) este trimis ca
+    # eliminat + adăugat, pentru ca player-ul să-l descarce din nou.
+    kept = {
+        key for key, item in zip(new_keys, new_items)
+        if key in old_by_key and _content_fields(old_by_key[key]) == _content_fields(item)
+    }
+
+    removed = [key for key in old_keys if key not in kept]
+    added = [
+        {"key": key, "index": index, "item": item}
+        for index, (key, item) in enumerate(zip(new_keys, new_items))
+        if key not in kept
+    ]
+
+    surviving_old_order = [key for key in old_keys if key in kept]
+    surviving_new_order = [key for key in new_keys if key in kept]
+    reordered = surviving_new_order if surviving_new_order != surviving_old_order else None
+
+    retimed = []
+    for key, item in zip(new_keys, new_items):
+        if key not in kept:
+            continue
+        old_item = old_by_key[key]
+        if (old_item["duration"] != item["duration"] or
+                old_item.get("web_refresh_interval") != item.get("web_refresh_interval")):
+            retimed.append({
+                "key": key,
+                "duration": item["duration"],
+                "web_refresh_interval": item.get("web_refresh_interval"),
+            })
+
+    return {"removed": removed, "added": added, "reordered": reordered, "retimed": retimed}
+
+
+class PlaylistHistory:
+    """Păstrează ultimele PLAYLIST_HISTORY_DEPTH revizii (lista de itemi) ale fiecărui playlist"""
+
+    def __init__(self, depth: int = PLAYLIST_HISTORY_DEPTH, max_playlists: int = PLAYLIST_HISTORY_MAX_PLAYLISTS):
+        self.depth = depth
+        self.max_playlists = max_playlists
+        self._revisions: "OrderedDict[int, OrderedDict[str, List[dict]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def record(self, playlist_id: int, playlist_version: str, items: List[dict]):
+        with self._lock:
+            revisions = self._revisions.setdefault(playlist_id, OrderedDict())
+            self._revisions.move_to_end(playlist_id)
+            revisions[playlist_version] = items
+            revisions.move_to_end(playlist_version)
+            while len(revisions) > self.depth:
+                revisions.popitem(last=False)
+            while len(self._revisions) > self.max_playlists:
+                self._revisions.popitem(last=False)
+
+    def get(self, playlist_id: int, playlist_version: str) -> Optional[List[dict]]:
+        with self._lock:
+            revisions = self._revisions.get(playlist_id)
+            if revisions is None:
+                return None
+            return revisions.get(playlist_version)
+
+    def forget(self, playlist_id: int):
+        with self._lock:
+            self._revisions.pop(playlist_id, None)
+
+
+playlist_history = PlaylistHistory()
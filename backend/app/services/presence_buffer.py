@@ -0,0 +1,119 @@
+# Cale: app/services/presence_buffer.py
+# Buffer write-behind pentru datele de prezență ale ecranelor (last_seen, device_info)
+
+import asyncio
+import os
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import case, update
+
+from .. import models
+from ..database import SessionLocal
+
+PRESENCE_FLUSH_INTERVAL = float(os.getenv("PRESENCE_FLUSH_INTERVAL", "5"))
+# Număr maxim de ecrane actualizate într-un singur UPDATE
+PRESENCE_FLUSH_BATCH_SIZE = 500
+
+
+class PresenceBuffer:
+    """
+    Colectează în memorie actualizările de prezență venite de la player-e
+    (/client/sync, conectare WebSocket, mesaje device_info) și le scrie în tabela
+    `screens` printr-un singur UPDATE la fiecare câteva secunde.
+
+    Pentru fiecare ecran se păstrează doar ultima valoare, deci un player care
+    face sync de 10 ori între două flush-uri produce o singură scriere.
+    """
+
+    def __init__(self, flush_interval: float = PRESENCE_FLUSH_INTERVAL):
+        self.flush_interval = flush_interval
+        self._last_seen: Dict[str, datetime] = {}
+        self._device_info: Dict[str, Tuple[Optional[str], Optional[str]]] = {}
+        self._lock = threading.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+
+    def record_seen(self, screen_key: str, seen_at: Optional[datetime] = None):
+        with self._lock:
+            self._last_seen[screen_key] = seen_at or datetime.now(timezone.utc)
+
+    def record_device_info(self, screen_key: str, player_version: Optional[str], screen_resolution: Optional[str]):
+        with self._lock:
+            self._device_info[screen_key] = (player_version, screen_resolution)
+            self._last_seen[screen_key] = datetime.now(timezone.utc)
+
+    def flush(self) -> int:
+        """Scrie în baza de date tot ce s-a acumulat. Returnează numărul de ecrane atinse."""
+        with self._lock:
+            last_seen, self._last_seen = self._last_seen, {}
+            device_info, self._device_info = self._device_info, {}
+
+        if not last_seen and not device_info:
+            return 0
+
+        db = SessionLocal()
+        try:
+            seen_items = list(last_seen.items())
+            for start in range(0, len(seen_items), PRESENCE_FLUSH_BATCH_SIZE):
+                batch = dict(seen_items[start:start + PRESENCE_FLUSH_BATCH_SIZE])
+                db.execute(
+                    update(models.Screen)
+                    .where(models.Screen.unique_key.in_(batch.keys()))
+                    .values(last_seen=case(batch, value=models.Screen.unique_key))
+                    .execution_options(synchronize_session=False)
+                )
+
+            info_items = list(device_info.items())
+            for start in range(0, len(info_items), PRESENCE_FLUSH_BATCH_SIZE):
+                batch = dict(info_items[start:start + PRESENCE_FLUSH_BATCH_SIZE])
+                db.execute(
+                    update(models.Screen)
+                    .where(models.Screen.unique_key.in_(batch.keys()))
+                    .values(
+                        player_version=case({k: v[0] for k, v in batch.items()}, value=models.Screen.unique_key),
+                        screen_resolution=case({k: v[1] for k, v in batch.items()}, value=models.Screen.unique_key),
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+
+            db.commit()
+            return len(set(last_seen) | set(device_info))
+        except Exception as e:
+            db.rollback()
+            print(f"EROARE la scrierea datelor de prezență: {e}")
+            # Punem valorile înapoi, fără a suprascrie ce a sosit între timp
+            with self._lock:
+                for key, value in last_seen.items():
+                    self._last_seen.setdefault(key, value)
+                for key, value in device_info.items():
+                    self._device_info.setdefault(key, value)
+            return 0
+        finally:
+            db.close()
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await asyncio.to_thread(self.flush)
+            except Exception as e:
+                print(f"EROARE în bucla de flush a prezenței: {e}")
+
+    def start(self):
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        """Oprește bucla periodică și scrie ultimele valori (la shutdown)"""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        await asyncio.to_thread(self.flush)
+
+
+presence_buffer = PresenceBuffer()
@@ -0,0 +1,147 @@
+# Cale: app/services/presence_registry.py
+# Registrul de prezență al ecranelor (online / conectat de când), comun tuturor workerilor
+
+import asyncio
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import delete, func, update
+from sqlalchemy.orm import Session
+
+from .. import models
+from ..connection_manager import manager
+from ..database import SessionLocal
+from .event_bus import WORKER_ID, event_bus
+
+PRESENCE_HEARTBEAT_INTERVAL = float(os.getenv("PRESENCE_HEARTBEAT_INTERVAL", "15"))
+# O conexiune fără heartbeat în acest interval aparține unui worker oprit și e ignorată
+PRESENCE_TTL = PRESENCE_HEARTBEAT_INTERVAL * 3
+
+
+class LocalPresenceRegistry:
+    """Un singur worker: prezența se citește direct din ConnectionManager, fără baza de date"""
+
+    def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def screen_connected(self, connection_id: str, screen_key: str, connected_at: datetime):
+        pass
+
+    async def screen_disconnected(self, connection_id: str):
+        pass
+
+    def online_since(self, db: Session, screen_keys: Iterable[str]) -> Dict[str, datetime]:
+        result = {}
+        for screen_key in screen_keys:
+            connection = manager.active_connections.get(screen_key)
+            if connection is not None:
+                result[screen_key] = connection.connected_at
+        return result
+
+
+class DatabasePresenceRegistry(LocalPresenceRegistry):
+    """
+    Mai mulți workeri: fiecare conexiune este înregistrată în `screen_connections`.
+    Worker-ul reîmprospătează heartbeat-ul tuturor conexiunilor lui printr-un singur UPDATE;
+    liniile rămase de la workeri opriți expiră după PRESENCE_TTL și sunt șterse periodic.
+    """
+
+    def __init__(self, heartbeat_interval: float = PRESENCE_HEARTBEAT_INTERVAL):
+        self.heartbeat_interval = heartbeat_interval
+        self._heartbeat_task: Optional[asyncio.Task] = None
+
+    def _execute(self, statement):
+        db = SessionLocal()
+        try:
+            db.execute(statement)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"EROARE la actualizarea registrului de prezență: {e}")
+        finally:
+            db.close()
+
+    async def screen_connected(self, connection_id: str, screen_key: str, connected_at: datetime):
+        def insert():
+            db = SessionLocal()
+            try:
+                db.add(models.ScreenConnection(
+                    connection_id=connection_id,
+                    screen_key=screen_key,
+                    worker_id=WORKER_ID,
+                    connected_at=connected_at,
+                    heartbeat_at=datetime.now(timezone.utc),
+                ))
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                print(f"EROARE la înregistrarea conexiunii ecranului {screen_key}: {e}")
+            finally:
+                db.close()
+
+        await asyncio.to_thread(insert)
+
+    async def screen_disconnected(self, connection_id: str):
+        await asyncio.to_thread(
+            self._execute,
+            delete(models.ScreenConnection).where(models.ScreenConnection.connection_id == connection_id)
+        )
+
+    def heartbeat(self):
+        now = datetime.now(timezone.utc)
+        self._execute(
+            update(models.ScreenConnection)
+            .where(models.ScreenConnection.worker_id == WORKER_ID)
+            .values(heartbeat_at=now)
+        )
+        self._execute(
+            delete(models.ScreenConnection)
+            .where(models.ScreenConnection.heartbeat_at < now - timedelta(seconds=PRESENCE_TTL * 2))
+        )
+
+    async def _heartbeat_loop(self):
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                await asyncio.to_thread(self.heartbeat)
+            except Exception as e:
+                print(f"EROARE în bucla de heartbeat a prezenței: {e}")
+
+    def start(self):
+        if self._heartbeat_task is None:
+            self._heartbeat_task = asyncio.create_task(self._heartbeat_loop())
+
+    async def stop(self):
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            try:
+                await self._heartbeat_task
+            except asyncio.CancelledError:
+                pass
+            self._heartbeat_task = None
+        # Conexiunile acestui worker se închid odată cu el
+        await asyncio.to_thread(
+            self._execute,
+            delete(models.ScreenConnection).where(models.ScreenConnection.worker_id == WORKER_ID)
+        )
+
+    def online_since(self, db: Session, screen_keys: Iterable[str]) -> Dict[str, datetime]:
+        screen_keys = list(screen_keys)
+        if not screen_keys:
+            return {}
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=PRESENCE_TTL)
+        rows = db.query(
+            models.ScreenConnection.screen_key,
+            func.max(models.ScreenConnection.connected_at)
+        ).filter(
+            models.ScreenConnection.screen_key.in_(screen_keys),
+            models.ScreenConnection.heartbeat_at >= cutoff
+        ).group_by(models.ScreenConnection.screen_key).all()
+        return {screen_key: connected_at for screen_key, connected_at in rows}
+
+
+presence_registry = DatabasePresenceRegistry() if event_bus.distributed else LocalPresenceRegistry()
@@ -0,0 +1,146 @@
+# Cale: app/services/progress_hub.py
+# Starea curentă a procesărilor video, trimisă grupat către dashboard-uri
+
+import asyncio
+import os
+import time
+from typing import Dict, List, Optional, Set
+
+from ..connection_manager import manager
+
+# La ce interval pleacă cel mult un mesaj de progress per utilizator
+PROGRESS_PUSH_INTERVAL = float(os.getenv("PROGRESS_PUSH_INTERVAL", "0.5"))
+# Cât timp mai păstrăm starea unui job terminat (pentru tab-urile care se conectează imediat după)
+PROGRESS_FINISHED_TTL = 60.0
+
+FINISHED_STATUSES = ("COMPLETED", "FAILED")
+
+
+class ProgressHub:
+    """
+    Ține ultima stare a fiecărui fișier în procesare și o trimite utilizatorului o dată la
+    PROGRESS_PUSH_INTERVAL, într-un singur mesaj "media_progress_batch" care conține doar
+    fișierele modificate. Mesajul este serializat o dată și pus în coada fiecărui tab, deci
+    traficul depinde de numărul de tab-uri, nu de encodări x tab-uri x linii FFmpeg.
+
+    La conectarea unui dashboard se retrimite starea tuturor job-urilor active ale
+    utilizatorului. Starea vine și de la celelalte procese uvicorn (prin event_bus), deci
+    replay-ul funcționează indiferent de workerul care rulează encodarea.
+    """
+
+    def __init__(self, interval: float = PROGRESS_PUSH_INTERVAL):
+        self.interval = interval
+        self._states: Dict[int, dict] = {}  # media_id -> ultima stare
+        self._owners: Dict[int, int] = {}  # media_id -> user_id
+        self._finished_at: Dict[int, float] = {}
+        self._dirty: Dict[int, Set[int]] = {}  # user_id -> media_id-urile modificate de la ultimul mesaj
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pid: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self.received = 0
+        self.messages_sent = 0
+
+    def publish(self, user_id: int, media_file_data: dict):
+        """
+        Apelat din thread-urile sloturilor transcode_worker; starea ajunge la event loop prin
+        call_soon_threadsafe. Dacă hub-ul nu a fost pornit în acest proces, starea este
+        ignorată (progresul rămâne oricum în baza de date).
+        """
+        if self._loop is None or self._loop.is_closed() or os.getpid() != self._pid:
+            return
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+        if running_loop is self._loop:
+            self._record(user_id, media_file_data)
+        else:
+            self._loop.call_soon_threadsafe(self._record, user_id, media_file_data)
+
+    def _record(self, user_id: int, media_file_data: dict, dirty: bool = True):
+        media_id = media_file_data["id"]
+        self.received += 1
+        self._states[media_id] = {**self._states.get(media_id, {}), **media_file_data}
+        self._owners[media_id] = user_id
+        if media_file_data.get("processing_status") in FINISHED_STATUSES:
+            self._finished_at[media_id] = time.monotonic()
+        else:
+            self._finished_at.pop(media_id, None)
+        if dirty:
+            self._dirty.setdefault(user_id, set()).add(media_id)
+
+    def remember_remote(self, user_id: int, items: List[dict]):
+        """Stările trimise de alt worker: doar le reținem pentru replay, nu le retrimitem"""
+        for item in items:
+            self._record(user_id, item, dirty=False)
+
+    def forget(self, media_id: int):
+        """Fișierul a fost șters"""
+        self._states.pop(media_id, None)
+        self._finished_at.pop(media_id, None)
+        user_id = self._owners.pop(media_id, None)
+        if user_id is not None and user_id in self._dirty:
+            self._dirty[user_id].discard(media_id)
+
+    def live_state(self, media_id: int) -> Optional[dict]:
+        return self._states.get(media_id)
+
+    def snapshot(self, user_id: int) -> List[dict]:
+        return [self._states[media_id] for media_id, owner in self._owners.items() if owner == user_id]
+
+    def replay(self, connection, user_id: int):
+        """Trimite unui dashboard abia conectat starea curentă a job-urilor utilizatorului"""
+        items = self.snapshot(user_id)
+        if items:
+            connection.enqueue({"type": "media_progress_batch", "data": items})
+
+    async def flush(self):
+        dirty, self._dirty = self._dirty, {}
+        for user_id, media_ids in dirty.items():
+            items = [self._states[media_id] for media_id in media_ids if media_id in self._states]
+            if items:
+                await manager.send_progress_update(user_id, items)
+                self.messages_sent += 1
+        self._expire_finished()
+
+    def _expire_finished(self):
+        deadline = time.monotonic() - PROGRESS_FINISHED_TTL
+        for media_id, finished_at in list(self._finished_at.items()):
+            if finished_at < deadline:
+                self.forget(media_id)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"EROARE la trimiterea progresului procesărilor: {e}")
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._pid = os.getpid()
+        manager.progress_observer = self.remember_remote
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "interval_seconds": self.interval,
+            "tracked_jobs": len(self._states),
+            "updates_received": self.received,
+            "messages_sent": self.messages_sent,
+        }
+
+
+progress_hub = ProgressHub()
@@ -0,0 +1,147 @@
+# Cale: app/services/progress_store.py
+# Buffer write-behind pentru progresul procesărilor video (processing_progress / eta / speed)
+
+import asyncio
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import case, update
+
+from .. import models
+from ..database import SessionLocal
+from ..models import ProcessingStatus
+
+# La câte secunde ajunge progresul în baza de date (statusurile finale se scriu imediat)
+PROGRESS_FLUSH_INTERVAL = float(os.getenv("PROGRESS_FLUSH_INTERVAL", "10"))
+
+LiveProgress = Tuple[float, Optional[int], Optional[str]]  # (progress, eta, speed)
+
+
+class ProgressStore:
+    """
+    Progresul venit din FFmpeg (până la o actualizare pe secundă per job) rămâne în memorie
+    și este scris în `media_files` printr-un singur UPDATE pentru toate job-urile, cel mult
+    o dată la PROGRESS_FLUSH_INTERVAL. Statusul final (COMPLETED / FAILED) este scris de
+    procesare în același commit cu ultimele valori (vezi `end`).
+
+    Flush-ul este declanșat din thread-ul slotului transcode_worker care raportează progresul,
+    nu din event loop: funcționează la fel în procesul API și în workerul dedicat.
+    """
+
+    def __init__(self, flush_interval: float = PROGRESS_FLUSH_INTERVAL):
+        self.flush_interval = flush_interval
+        self._jobs: Dict[int, Tuple[int, str]] = {}  # media_id -> (user_id, filename)
+        self._live: Dict[int, LiveProgress] = {}
+        self._dirty: Dict[int, LiveProgress] = {}
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self.updates = 0
+        self.flushes = 0
+        self.rows_written = 0
+
+    def begin(self, media_file: models.MediaFile):
+        """Procesarea a pornit (statusul PROCESSING tocmai a fost scris)"""
+        with self._lock:
+            self._jobs[media_file.id] = (media_file.uploaded_by_id, media_file.filename)
+            self._live[media_file.id] = (0.0, None, None)
+
+    def record(self, media_file_id: int, progress: float, eta: Optional[int] = None,
+               speed: Optional[str] = None) -> Optional[Tuple[int, dict]]:
+        """
+        Reține progresul. Returnează (user_id, starea pentru dashboard) sau None dacă
+        job-ul nu a fost pornit prin `begin`.
+        """
+        with self._lock:
+            job = self._jobs.get(media_file_id)
+            if job is None:
+                return None
+            previous = self._live.get(media_file_id, (0.0, None, None))
+            live = (progress, eta if eta is not None else previous[1], speed if speed is not None else previous[2])
+            self._live[media_file_id] = live
+            self._dirty[media_file_id] = live
+            self.updates += 1
+            flush_due = time.monotonic() - self._last_flush >= self.flush_interval
+            if flush_due:
+                self._last_flush = time.monotonic()
+
+        if flush_due:
+            self.flush()
+
+        user_id, filename = job
+        return user_id, {
+            "id": media_file_id,
+            "filename": filename,
+            "processing_status": ProcessingStatus.PROCESSING.value,
+            "processing_progress": live[0],
+            "processing_eta": live[1],
+            "processing_speed": live[2],
+        }
+
+    def live(self, media_file_id: int) -> Optional[LiveProgress]:
+        with self._lock:
+            return self._live.get(media_file_id)
+
+    def end(self, media_file_id: int) -> Optional[LiveProgress]:
+        """
+        Job terminat: scoate valorile din buffer și le returnează, ca apelantul să le
+        scrie în același commit cu statusul final.
+        """
+        with self._lock:
+            self._jobs.pop(media_file_id, None)
+            self._dirty.pop(media_file_id, None)
+            return self._live.pop(media_file_id, None)
+
+    def flush(self) -> int:
+        """Scrie progresul acumulat. Returnează numărul de fișiere actualizate."""
+        with self._lock:
+            dirty, self._dirty = self._dirty, {}
+
+        if not dirty:
+            return 0
+
+        db = SessionLocal()
+        try:
+            db.execute(
+                update(models.MediaFile)
+                # Un job marcat între timp ca eșuat (reset-stuck) nu este readus la viață
+                .where(models.MediaFile.id.in_(dirty.keys()),
+                       models.MediaFile.processing_status == ProcessingStatus.PROCESSING)
+                .values(
+                    processing_progress=case({k: v[0] for k, v in dirty.items()}, value=models.MediaFile.id),
+                    processing_eta=case({k: v[1] for k, v in dirty.items()}, value=models.MediaFile.id),
+                    processing_speed=case({k: v[2] for k, v in dirty.items()}, value=models.MediaFile.id),
+                )
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+            self.flushes += 1
+            self.rows_written += len(dirty)
+            return len(dirty)
+        except Exception as e:
+            db.rollback()
+            print(f"EROARE la scrierea progresului procesărilor: {e}")
+            with self._lock:
+                for key, value in dirty.items():
+                    if key in self._jobs:
+                        self._dirty.setdefault(key, value)
+            return 0
+        finally:
+            db.close()
+
+    async def stop(self):
+        """La shutdown scriem ultimele valori"""
+        await asyncio.to_thread(self.flush)
+
+    def stats(self) -> dict:
+        return {
+            "flush_interval_seconds": self.flush_interval,
+            "active_jobs": len(self._jobs),
+            "updates": self.updates,
+            "flushes": self.flushes,
+            "rows_written": self.rows_written,
+        }
+
+
+progress_store = ProgressStore()
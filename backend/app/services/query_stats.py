@@ -0,0 +1,86 @@
+# Cale: app/services/query_stats.py
+# Contorizează interogările SQL per endpoint (activat doar pentru benchmark-uri)
+
+import contextvars
+import os
+import threading
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Activat cu QUERY_STATS_ENABLED=1; în producție rămâne oprit (listener-ul nu este instalat)
+QUERY_STATS_ENABLED = os.getenv("QUERY_STATS_ENABLED", "0") == "1"
+
+
+class _RequestCounter:
+    __slots__ = ("queries",)
+
+    def __init__(self):
+        self.queries = 0
+
+
+_current_request: contextvars.ContextVar[Optional[_RequestCounter]] = contextvars.ContextVar(
+    "query_stats_request", default=None
+)
+
+
+class QueryStats:
+    """
+    Numără interogările trimise la baza de date și le atribuie endpoint-ului care le-a
+    generat (template-ul rutei, ex: "GET /api/client/sync"). Folosit de harness-ul de
+    încărcare din backend/fleet_simulator.py pentru a raporta interogări / request.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints: Dict[str, Dict[str, int]] = {}
+        self._background_queries = 0
+
+    def install(self, engine: Engine):
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        counter = _current_request.get()
+        if counter is not None:
+            counter.queries += 1
+        else:
+            with self._lock:
+                self._background_queries += 1
+
+    def begin_request(self) -> contextvars.Token:
+        return _current_request.set(_RequestCounter())
+
+    def end_request(self, token: contextvars.Token, endpoint: str):
+        counter = _current_request.get()
+        _current_request.reset(token)
+        if counter is None:
+            return
+        with self._lock:
+            entry = self._endpoints.setdefault(endpoint, {"requests": 0, "queries": 0, "max_queries": 0})
+            entry["requests"] += 1
+            entry["queries"] += counter.queries
+            entry["max_queries"] = max(entry["max_queries"], counter.queries)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            endpoints: List[dict] = [
+                {
+                    "endpoint": endpoint,
+                    "requests": entry["requests"],
+                    "queries": entry["queries"],
+                    "queries_per_request": round(entry["queries"] / entry["requests"], 2) if entry["requests"] else 0,
+                    "max_queries": entry["max_queries"],
+                }
+                for endpoint, entry in sorted(self._endpoints.items())
+            ]
+            # Interogările făcute în afara unui request HTTP (WebSocket, flush-uri, task-uri de fundal)
+            return {"endpoints": endpoints, "background_queries": self._background_queries}
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+            self._background_queries = 0
+
+
+query_stats = QueryStats()
@@ -0,0 +1,103 @@
+# Cale: app/services/renditions.py
+# Variantele la rezoluție redusă ale video-urilor, alese după ecranele care le redau
+
+import os
+from typing import Iterable, List, Optional, Set
+
+from sqlalchemy.orm import Session
+
+from .. import models
+
+# Treptele scării: latura scurtă a imaginii (px) -> bitrate video țintă (kbps)
+RENDITION_LADDER = {
+    480: 1200,
+    720: 2500,
+    1080: 5000,
+    1440: 8000,
+    2160: 14000,
+}
+# Interval fix între keyframe-uri, independent de fps-ul sursei (seek și pornire rapidă pe player)
+RENDITION_KEYFRAME_SECONDS = 2
+RENDITIONS_ENABLED = os.getenv("RENDITIONS_ENABLED", "1") == "1"
+
+
+def parse_resolution(resolution: Optional[str]) -> Optional[tuple]:
+    """'1920x1080' -> (1920, 1080); None pentru valori lipsă sau invalide"""
+    try:
+        width, height = (int(part) for part in (resolution or "").lower().split("x"))
+    except ValueError:
+        return None
+    return (width, height) if width > 0 and height > 0 else None
+
+
+def screen_rung(resolution: Optional[str]) -> Optional[int]:
+    """
+    Treapta potrivită unui ecran: cea mai mică latură scurtă >= latura scurtă a ecranului.
+    Latura scurtă nu depinde de orientare, deci ecranele rotite primesc aceeași treaptă.
+    """
+    size = parse_resolution(resolution)
+    if size is None:
+        return None
+    short_side = min(size)
+    return next((rung for rung in sorted(RENDITION_LADDER) if rung >= short_side), max(RENDITION_LADDER))
+
+
+def fleet_rungs(db: Session, owner_id: int) -> Set[int]:
+    """Treptele cerute de ecranele active ale utilizatorului care au raportat rezoluția"""
+    resolutions = (
+        db.query(models.Screen.screen_resolution)
+        .filter(models.Screen.created_by_id == owner_id,
+                models.Screen.is_active.is_(True),
+                models.Screen.screen_resolution.isnot(None))
+        .distinct()
+        .all()
+    )
+    return {rung for (resolution,) in resolutions if (rung := screen_rung(resolution)) is not None}
+
+
+def rungs_to_encode(media_file: models.MediaFile, rungs: Iterable[int]) -> List[int]:
+    """Doar micșorări: o treaptă >= rezoluția sursei este servită direct din original"""
+    if not media_file.width or not media_file.height:
+        return []
+    source_short_side = min(media_file.width, media_file.height)
+    return sorted(rung for rung in rungs if rung < source_short_side)
+
+
+def rendition_path(media_file: models.MediaFile, rung: int) -> str:
+    return f"{media_file.path}_{rung}p.mp4"
+
+
+def rendition_command(source_path: str, output_path: str, rung: int, preset: str, threads: int = 0) -> List[str]:
+    """H.264 la latura scurtă `rung`, cu bitrate plafonat și keyframe-uri la interval fix"""
+    bitrate = RENDITION_LADDER[rung]
+    command = [
+        "ffmpeg",
+        "-i", source_path,
+        "-map", "0:v:0",
+        "-map", "0:a:0?",
+        # Latura scurtă devine `rung`, indiferent de orientarea video-ului (după autorotate)
+        "-vf", f"scale='if(gt(iw,ih),-2,{rung})':'if(gt(iw,ih),{rung},-2)'",
+        "-c:v", "libx264",
+        "-preset", preset,
+        "-profile:v", "high",
+        "-pix_fmt", "yuv420p",
+        "-b:v", f"{bitrate}k",
+        "-maxrate", f"{bitrate * 3 // 2}k",
+        "-bufsize", f"{bitrate * 2}k",
+        "-force_key_frames", f"expr:gte(t,n_forced*{RENDITION_KEYFRAME_SECONDS})",
+        "-sc_threshold", "0",
+        "-c:a", "aac",
+        "-b:a", "128k",
+        "-movflags", "+faststart",
+    ]
+    if threads > 0:
+        command += ["-threads", str(threads)]
+    return command + ["-y", output_path]
+
+
+def pick_rendition(media_file: models.MediaFile, rung: Optional[int]) -> Optional[models.MediaRendition]:
+    """Cea mai mică variantă care acoperă ecranul; None = se trimite originalul"""
+    if rung is None:
+        return None
+    candidates = [rendition for rendition in media_file.renditions if rendition.height >= rung]
+    return min(candidates, key=lambda rendition: rendition.height, default=None)
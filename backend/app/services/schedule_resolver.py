@@ -0,0 +1,193 @@
+# Cale: app/services/schedule_resolver.py
+# Rezolvă playlist-ul activ al unui ecran pe baza programărilor (dayparting)
+
+import bisect
+import heapq
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from sqlalchemy.orm import Session, joinedload
+
+from .. import models
+
+# Fusul orar în care sunt interpretate orele din programări (ex: 08:00-12:00)
+SCHEDULE_TIMEZONE = os.getenv("SCHEDULE_TIMEZONE", "Europe/Bucharest")
+# Indexul unui ecran acoperă intervalul [acum - 1h, acum + 48h] și este reconstruit
+# când nu mai acoperă următoarele SCHEDULE_TIMELINE_HOURS ore
+SCHEDULE_HORIZON_HOURS = 48
+SCHEDULE_TIMELINE_HOURS = 24
+ALL_DAYS = 0b1111111  # bit 0 = luni ... bit 6 = duminică
+
+# Prioritatea playlist-ului asignat direct ecranului (se aplică doar în afara programărilor)
+DEFAULT_PLAYLIST_PRIORITY = -1
+
+Segment = Tuple[datetime, datetime, Optional[int]]
+
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Datele fără fus orar (ex: Playlist.schedule_start) sunt considerate UTC"""
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def _clip(start: datetime, end: datetime, *bounds: Tuple[Optional[datetime], Optional[datetime]]):
+    for lower, upper in bounds:
+        if lower is not None and start < lower:
+            start = lower
+        if upper is not None and end > upper:
+            end = upper
+    return (start, end) if start < end else None
+
+
+class ScheduleIndex:
+    """
+    Index de intervale pentru un ecran: orizontul este împărțit în segmente elementare
+    consecutive, fiecare cu playlist-ul câștigător deja calculat. O căutare este un
+    bisect pe lista de începuturi de segment - O(log n), fără a parcurge programările.
+    """
+
+    def __init__(self, starts: List[datetime], playlist_ids: List[Optional[int]],
+                 horizon_start: datetime, horizon_end: datetime):
+        self.starts = starts
+        self.playlist_ids = playlist_ids
+        self.horizon_start = horizon_start
+        self.horizon_end = horizon_end
+
+    def covers(self, start: datetime, end: datetime) -> bool:
+        return self.horizon_start <= start and end <= self.horizon_end
+
+    def lookup(self, when: datetime) -> Optional[int]:
+        position = bisect.bisect_right(self.starts, when) - 1
+        if position < 0:
+            return None
+        return self.playlist_ids[position]
+
+    def segments(self, start: datetime, end: datetime) -> List[Segment]:
+        """Segmentele (început, sfârșit, playlist_id) care se suprapun cu [start, end)"""
+        result = []
+        first = max(bisect.bisect_right(self.starts, start) - 1, 0)
+        for position in range(first, len(self.starts)):
+            segment_start = self.starts[position]
+            if segment_start >= end:
+                break
+            segment_end = self.starts[position + 1] if position + 1 < len(self.starts) else self.horizon_end
+            result.append((max(segment_start, start), min(segment_end, end), self.playlist_ids[position]))
+        return result
+
+
+def expand_schedule_entry(entry: models.ScreenSchedule, horizon_start: datetime, horizon_end: datetime,
+                          tz: ZoneInfo) -> List[Tuple[datetime, datetime]]:
+    """Transformă o programare recurentă în intervale concrete (UTC) în interiorul orizontului"""
+    intervals = []
+    playlist = entry.playlist
+    bounds = (
+        (horizon_start, horizon_end),
+        (_as_utc(entry.valid_from), _as_utc(entry.valid_until)),
+        (_as_utc(playlist.schedule_start), _as_utc(playlist.schedule_end)),
+    )
+    # Începem cu o zi mai devreme pentru ferestrele care trec peste miezul nopții
+    day = horizon_start.astimezone(tz).date() - timedelta(days=1)
+    last_day = horizon_end.astimezone(tz).date()
+    while day <= last_day:
+        if entry.days_of_week & (1 << day.weekday()):
+            local_start = datetime.combine(day, entry.start_time, tzinfo=tz)
+            end_day = day if entry.end_time > entry.start_time else day + timedelta(days=1)
+            local_end = datetime.combine(end_day, entry.end_time, tzinfo=tz)
+            clipped = _clip(local_start.astimezone(timezone.utc), local_end.astimezone(timezone.utc), *bounds)
+            if clipped:
+                intervals.append(clipped)
+        day += timedelta(days=1)
+    return intervals
+
+
+def build_schedule_index(entries: List[models.ScreenSchedule], default_playlist: Optional[models.Playlist],
+                         horizon_start: datetime, horizon_end: datetime, tz: ZoneInfo) -> ScheduleIndex:
+    # (început, sfârșit, prioritate, id programare, playlist_id)
+    intervals = []
+    if default_playlist is not None:
+        # Fereastra Playlist.schedule_start/end limitează doar programările; playlist-ul asignat
+        # direct rămâne activ tot timpul, ca înainte de introducerea programărilor
+        intervals.append((horizon_start, horizon_end, DEFAULT_PLAYLIST_PRIORITY, 0, default_playlist.id))
+    for entry in entries:
+        for start, end in expand_schedule_entry(entry, horizon_start, horizon_end, tz):
+            intervals.append((start, end, entry.priority, entry.id, entry.playlist_id))
+
+    boundaries = sorted({horizon_start, horizon_end} | {i[0] for i in intervals} | {i[1] for i in intervals})
+    intervals.sort(key=lambda i: i[0])
+
+    # Baleiere: la fiecare graniță câștigă intervalul activ cu prioritatea cea mai mare,
+    # iar la egalitate programarea cea mai nouă. Intervalele expirate sunt scoase leneș din heap.
+    starts: List[datetime] = []
+    playlist_ids: List[Optional[int]] = []
+    active = []
+    next_interval = 0
+    for boundary in boundaries[:-1]:
+        while next_interval < len(intervals) and intervals[next_interval][0] <= boundary:
+            start, end, priority, entry_id, playlist_id = intervals[next_interval]
+            heapq.heappush(active, (-priority, -entry_id, end, playlist_id))
+            next_interval += 1
+        while active and active[0][2] <= boundary:
+            heapq.heappop(active)
+        winner = active[0][3] if active else None
+        if not playlist_ids or playlist_ids[-1] != winner:
+            starts.append(boundary)
+            playlist_ids.append(winner)
+
+    return ScheduleIndex(starts, playlist_ids, horizon_start, horizon_end)
+
+
+class ScheduleResolver:
+    """
+    Păstrează indexul de programări al fiecărui ecran. Cheia de cache include
+    `Screen.schedule_version` și playlist-ul asignat, care sunt deja încărcate la
+    fiecare sync, deci un cache hit nu costă nicio interogare în plus.
+    """
+
+    def __init__(self, tz_name: str = SCHEDULE_TIMEZONE):
+        self.tz = ZoneInfo(tz_name)
+        self._indexes: Dict[int, Tuple[tuple, ScheduleIndex]] = {}
+        self._lock = threading.Lock()
+
+    def get_index(self, db: Session, screen: models.Screen, now: Optional[datetime] = None) -> ScheduleIndex:
+        now = now or datetime.now(timezone.utc)
+        cache_key = (screen.schedule_version, screen.assigned_playlist_id)
+        with self._lock:
+            cached = self._indexes.get(screen.id)
+        if cached and cached[0] == cache_key and cached[1].covers(now, now + timedelta(hours=SCHEDULE_TIMELINE_HOURS)):
+            return cached[1]
+
+        entries = (
+            db.query(models.ScreenSchedule)
+            .options(joinedload(models.ScreenSchedule.playlist))
+            .filter(models.ScreenSchedule.screen_id == screen.id)
+            .all()
+        )
+        index = build_schedule_index(
+            entries, screen.assigned_playlist,
+            now - timedelta(hours=1), now + timedelta(hours=SCHEDULE_HORIZON_HOURS), self.tz
+        )
+        with self._lock:
+            self._indexes[screen.id] = (cache_key, index)
+        return index
+
+    def active_playlist_id(self, db: Session, screen: models.Screen, now: Optional[datetime] = None) -> Optional[int]:
+        now = now or datetime.now(timezone.utc)
+        return self.get_index(db, screen, now).lookup(now)
+
+    def timeline(self, db: Session, screen: models.Screen, now: Optional[datetime] = None,
+                 hours: int = SCHEDULE_TIMELINE_HOURS) -> List[Segment]:
+        now = now or datetime.now(timezone.utc)
+        return self.get_index(db, screen, now).segments(now, now + timedelta(hours=hours))
+
+    def forget(self, screen_id: int):
+        with self._lock:
+            self._indexes.pop(screen_id, None)
+
+
+schedule_resolver = ScheduleResolver()
@@ -0,0 +1,127 @@
+# Cale: app/services/segment_encode.py
+# Encodarea paralelă a video-urilor lungi: împărțire la keyframe-uri, segmente encodate simultan, concat fără pierderi
+
+import csv
+import os
+import threading
+import time
+from typing import List, NamedTuple, Optional
+
+# Doar video-urile cel puțin atât de lungi sunt împărțite (la cele scurte, împărțirea nu se amortizează)
+SEGMENT_ENCODE_MIN_SECONDS = float(os.getenv("SEGMENT_ENCODE_MIN_SECONDS", "300"))
+# Durata țintă a unui segment; tăietura cade la primul keyframe de după acest punct
+SEGMENT_SECONDS = int(os.getenv("SEGMENT_SECONDS", "60"))
+# Thread-uri libx264 per segment: puține thread-uri pe mai multe procese scalează mai bine decât un singur proces
+SEGMENT_THREADS = int(os.getenv("SEGMENT_THREADS", "2"))
+SEGMENT_ENCODE_ENABLED = os.getenv("SEGMENT_ENCODE_ENABLED", "1") == "1"
+
+
+class Segment(NamedTuple):
+    path: str
+    start: float
+    end: float
+
+    @property
+    def duration(self) -> float:
+        return max(self.end - self.start, 0.0)
+
+
+def segment_workers(threads: int) -> int:
+    """Câte segmente rulează simultan în bugetul de thread-uri al job-ului"""
+    return max(threads // SEGMENT_THREADS, 1)
+
+
+def should_segment(duration: Optional[float], threads: int) -> bool:
+    return (SEGMENT_ENCODE_ENABLED and (duration or 0) >= SEGMENT_ENCODE_MIN_SECONDS
+            and segment_workers(threads) > 1)
+
+
+def split_command(source_path: str, work_dir: str) -> List[str]:
+    """Copiază stream-ul video în segmente (fără re-encodare, deci tăieturile sunt pe keyframe-uri)"""
+    return [
+        "ffmpeg",
+        "-i", source_path,
+        "-map", "0:v:0",
+        "-c", "copy",
+        "-f", "segment",
+        "-segment_time", str(SEGMENT_SECONDS),
+        "-segment_format", "matroska",
+        "-segment_list", os.path.join(work_dir, "segments.csv"),
+        "-segment_list_type", "csv",
+        "-reset_timestamps", "1",
+        "-y",
+        os.path.join(work_dir, "source_%05d.mkv"),
+    ]
+
+
+def read_segments(work_dir: str) -> List[Segment]:
+    """Lista scrisă de muxer-ul segment: fișier, start, end (secunde în sursă)"""
+    with open(os.path.join(work_dir, "segments.csv"), newline="") as f:
+        return [Segment(os.path.join(work_dir, name), float(start), float(end))
+                for name, start, end in csv.reader(f)]
+
+
+def encoded_path(segment: Segment) -> str:
+    return segment.path.replace("source_", "encoded_")
+
+
+def segment_command(segment: Segment, preset: str, crf: str) -> List[str]:
+    return [
+        "ffmpeg",
+        "-i", segment.path,
+        "-c:v", "libx264",
+        "-preset", preset,
+        "-crf", crf,
+        "-pix_fmt", "yuv420p",
+        "-threads", str(SEGMENT_THREADS),
+        "-y",
+        encoded_path(segment),
+    ]
+
+
+def audio_command(source_path: str, work_dir: str) -> List[str]:
+    """Audio-ul este encodat o singură dată, întreg (fără goluri la granițele segmentelor)"""
+    return [
+        "ffmpeg",
+        "-i", source_path,
+        "-map", "0:a:0",
+        "-vn",
+        "-c:a", "aac",
+        "-b:a", "128k",
+        "-y",
+        os.path.join(work_dir, "audio.m4a"),
+    ]
+
+
+def concat_command(segments: List[Segment], work_dir: str, output_path: str, has_audio: bool) -> List[str]:
+    """Lipește segmentele encodate cu demuxer-ul concat (stream copy) și adaugă audio-ul"""
+    list_path = os.path.join(work_dir, "concat.txt")
+    with open(list_path, "w") as f:
+        for segment in segments:
+            f.write(f"file '{os.path.basename(encoded_path(segment))}'\n")
+    command = ["ffmpeg", "-f", "concat", "-safe", "0", "-i", list_path]
+    if has_audio:
+        command += ["-i", os.path.join(work_dir, "audio.m4a"), "-map", "0:v:0", "-map", "1:a:0"]
+    return command + ["-c", "copy", "-movflags", "+faststart", "-y", output_path]
+
+
+class SegmentProgress:
+    """Progresul agregat al segmentelor, ponderat cu durata lor (segmentele rulează în thread-uri diferite)"""
+
+    def __init__(self, segments: List[Segment]):
+        self.durations = [segment.duration for segment in segments]
+        self.total = sum(self.durations) or 1.0
+        self.done = [0.0] * len(segments)
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+
+    def update(self, index: int, percent: float) -> tuple:
+        """Segmentul `index` a ajuns la `percent`; returnează (progres total, eta, viteză)"""
+        with self._lock:
+            self.done[index] = self.durations[index] * min(percent, 100.0) / 100.0
+            encoded = sum(self.done)
+        elapsed = max(time.time() - self.started_at, 0.001)
+        progress = encoded / self.total * 100.0
+        speed_value = encoded / elapsed
+        eta = int((self.total - encoded) / speed_value) if speed_value > 0 and 5 <= progress < 99 else None
+        return progress, eta, f"{speed_value:.1f}x"
@@ -0,0 +1,117 @@
+# Cale: app/services/thumbnail_engine.py
+# Alegerea frame-ului pentru thumbnail-ul unui video: o singură decodare a candidaților + scor NumPy
+
+import subprocess
+from typing import List, Optional
+
+import numpy as np
+
+# Rezoluția la care sunt analizați candidații (suficientă pentru statistici de luminanță)
+ANALYSIS_WIDTH = 160
+ANALYSIS_HEIGHT = 90
+HISTOGRAM_BINS = 32
+THUMBNAIL_FFMPEG_TIMEOUT = 60
+
+# Pozițiile candidate (fracțiuni din durată) și preferința pentru fiecare; mijlocul primei treimi e preferat
+CANDIDATE_POSITIONS = (
+    (0.30, 1.0), (0.25, 0.9), (0.35, 0.9), (0.40, 0.8), (0.20, 0.8),
+    (0.45, 0.75), (0.50, 0.7), (0.60, 0.6), (0.70, 0.5),
+)
+
+
+def candidate_timestamps(duration: float) -> List[tuple]:
+    """(timestamp, preferință) în afara intro-ului și a outro-ului (fade-in / credite)"""
+    start_safe = max(min(3.0, duration * 0.2), duration * 0.1)
+    end_safe = duration * 0.85
+    candidates = [(duration * fraction, priority) for fraction, priority in CANDIDATE_POSITIONS
+                  if start_safe <= duration * fraction <= end_safe]
+    return candidates or [(duration / 2, 0.5)]
+
+
+def decode_gray_frames(video_path: str, timestamps: List[float]) -> np.ndarray:
+    """
+    Decodează câte un frame la fiecare timestamp, într-un singur proces FFmpeg: fiecare
+    poziție este o intrare separată cu seek rapid (-ss înainte de -i), iar frame-urile sunt
+    scalate, convertite la tonuri de gri și concatenate într-un flux rawvideo.
+    Returnează un array (n, ANALYSIS_HEIGHT, ANALYSIS_WIDTH) uint8.
+    """
+    command = ["ffmpeg", "-hide_banner", "-loglevel", "error"]
+    for timestamp in timestamps:
+        command += ["-ss", f"{timestamp:.3f}", "-i", video_path]
+    filters = [
+        f"[{i}:v:0]trim=end_frame=1,scale={ANALYSIS_WIDTH}:{ANALYSIS_HEIGHT},setsar=1,format=gray[f{i}]"
+        for i in range(len(timestamps))
+    ]
+    inputs = "".join(f"[f{i}]" for i in range(len(timestamps)))
+    filters.append(f"{inputs}concat=n={len(timestamps)}:v=1:a=0[out]")
+    command += [
+        "-filter_complex", ";".join(filters),
+        "-map", "[out]",
+        "-vsync", "0",  # un frame per poziție, fără duplicare / eliminare după fps
+        "-frames:v", str(len(timestamps)),
+        "-f", "rawvideo", "-pix_fmt", "gray",
+        "pipe:1",
+    ]
+    result = subprocess.run(command, capture_output=True, timeout=THUMBNAIL_FFMPEG_TIMEOUT)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.decode("utf-8", errors="ignore").strip()[-500:])
+    frame_size = ANALYSIS_WIDTH * ANALYSIS_HEIGHT
+    count = len(result.stdout) // frame_size
+    if count == 0:
+        raise RuntimeError("FFmpeg nu a returnat niciun frame")
+    return np.frombuffer(result.stdout[:count * frame_size], dtype=np.uint8).reshape(count, ANALYSIS_HEIGHT, ANALYSIS_WIDTH)
+
+
+def score_frames(frames: np.ndarray) -> np.ndarray:
+    """
+    Scor 0-1 pentru fiecare frame, calculat vectorizat:
+    - expunere: luminanța medie aproape de 45% (penalizate frame-urile negre sau arse)
+    - contrast: deviația standard a luminanței
+    - entropie: cât de variată este histograma (un ecran uniform sau un fade are entropie mică)
+    """
+    count = frames.shape[0]
+    pixels = frames.reshape(count, -1)
+    mean = pixels.mean(axis=1) / 255.0
+    contrast = np.clip(pixels.std(axis=1) / 80.0, 0.0, 1.0)
+
+    bins = (pixels.astype(np.int32) * HISTOGRAM_BINS) // 256 + np.arange(count)[:, None] * HISTOGRAM_BINS
+    histogram = np.bincount(bins.ravel(), minlength=count * HISTOGRAM_BINS).reshape(count, HISTOGRAM_BINS)
+    probabilities = histogram / pixels.shape[1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        entropy = -np.where(probabilities > 0, probabilities * np.log2(probabilities), 0.0).sum(axis=1)
+    entropy /= np.log2(HISTOGRAM_BINS)
+
+    exposure = np.clip(1.0 - np.abs(mean - 0.45) * 2.0, 0.0, 1.0)
+    score = 0.4 * entropy + 0.35 * contrast + 0.25 * exposure
+    # Frame-uri practic negre sau albe: doar dacă nu există altceva
+    score[(mean < 0.08) | (mean > 0.95)] *= 0.1
+    return score
+
+
+def find_best_thumbnail_timestamp(video_path: str, duration: float) -> float:
+    candidates = candidate_timestamps(duration)
+    timestamps = [timestamp for timestamp, _ in candidates]
+    frames = decode_gray_frames(video_path, timestamps)
+    # Dacă unele poziții nu au putut fi decodate, frame-urile primite corespund primelor poziții
+    priorities = np.array([priority for _, priority in candidates[:frames.shape[0]]])
+    scores = 0.9 * score_frames(frames) + 0.1 * priorities
+    best = int(np.argmax(scores))
+    print(f"DEBUG: Thumbnail: {frames.shape[0]} poziții analizate, aleasă {timestamps[best]:.1f}s (scor {scores[best]:.2f})")
+    return timestamps[best]
+
+
+def write_frame(video_path: str, timestamp: float, thumbnail_path: str, quality: int = 2):
+    result = subprocess.run(
+        ["ffmpeg", "-hide_banner", "-loglevel", "error", "-ss", f"{timestamp:.3f}", "-i", video_path,
+         "-frames:v", "1", "-q:v", str(quality), "-y", thumbnail_path],
+        capture_output=True, timeout=THUMBNAIL_FFMPEG_TIMEOUT,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.decode("utf-8", errors="ignore").strip()[-500:])
+
+
+def generate_best_thumbnail(video_path: str, thumbnail_path: str, duration: float) -> Optional[float]:
+    """Scrie thumbnail-ul la cel mai bun timestamp (două procese FFmpeg în total); returnează timestamp-ul"""
+    timestamp = find_best_thumbnail_timestamp(video_path, duration)
+    write_frame(video_path, timestamp, thumbnail_path)
+    return timestamp
@@ -0,0 +1,119 @@
+# Cale: app/services/transcode_plan.py
+# Alegerea celei mai ieftine prelucrări care face un video redabil pe playere (pe baza ffprobe)
+
+import os
+import struct
+from typing import List, NamedTuple, Optional
+
+# Nivelul H.264 maxim decodat fără probleme de playerele Android / Windows (42 = 4.2, 1080p60)
+MAX_H264_LEVEL = int(os.getenv("MAX_H264_LEVEL", "42"))
+
+COMPATIBLE_H264_PROFILES = {"baseline", "constrained baseline", "main", "high"}
+COMPATIBLE_PIXEL_FORMATS = {"yuv420p", "yuvj420p"}
+COMPATIBLE_AUDIO_CODECS = {"aac"}
+MP4_FORMAT_NAMES = {"mov", "mp4"}
+
+# Acțiunile, de la cea mai ieftină la cea mai scumpă
+ACTION_NONE = "none"            # fișierul rămâne neschimbat
+ACTION_REMUX = "remux"          # stream copy într-un MP4 cu moov la început (+faststart)
+ACTION_AUDIO = "audio"          # video copiat, audio re-encodat în AAC
+ACTION_TRANSCODE = "transcode"  # re-encodare completă H.264 / AAC
+
+
+class TranscodePlan(NamedTuple):
+    action: str
+    reason: str
+    # Indexurile (ffprobe) stream-urilor evaluate, pentru remux / audio: primul stream
+    # video poate fi o copertă (attached_pic), deci `-map 0:v:0` nu este suficient
+    video_index: Optional[int] = None
+    audio_index: Optional[int] = None
+
+
+def stream_maps(plan: TranscodePlan) -> List[str]:
+    """Argumentele `-map` pentru remux / audio: exact stream-urile evaluate de plan"""
+    maps = ["-map", f"0:{plan.video_index}"]
+    if plan.audio_index is not None:
+        maps += ["-map", f"0:{plan.audio_index}"]
+    return maps
+
+
+def has_faststart(path: str) -> bool:
+    """True dacă atomul `moov` apare înaintea lui `mdat` (redarea poate începe înainte de descărcarea completă)"""
+    try:
+        with open(path, "rb") as f:
+            while True:
+                header = f.read(8)
+                if len(header) < 8:
+                    return False
+                size, box_type = struct.unpack(">I4s", header)
+                if box_type == b"moov":
+                    return True
+                if box_type == b"mdat":
+                    return False
+                if size == 1:
+                    size = struct.unpack(">Q", f.read(8))[0]
+                    f.seek(size - 16, os.SEEK_CUR)
+                elif size == 0:
+                    return False  # ultimul atom se întinde până la sfârșitul fișierului
+                else:
+                    f.seek(size - 8, os.SEEK_CUR)
+    except (OSError, struct.error):
+        return False
+
+
+def _video_problem(stream: dict) -> Optional[str]:
+    codec = stream.get("codec_name", "").lower()
+    if codec != "h264":
+        return f"codec video {codec or 'necunoscut'}"
+    profile = stream.get("profile", "").lower()
+    if profile not in COMPATIBLE_H264_PROFILES:
+        return f"profil H.264 {profile or 'necunoscut'}"
+    level = stream.get("level") or 0
+    if level > MAX_H264_LEVEL:
+        return f"nivel H.264 {level / 10:.1f}"
+    pix_fmt = stream.get("pix_fmt", "")
+    if pix_fmt not in COMPATIBLE_PIXEL_FORMATS:
+        return f"format pixeli {pix_fmt or 'necunoscut'}"
+    if stream.get("field_order", "progressive") not in ("progressive", "unknown"):
+        return "video întrețesut (interlaced)"
+    return None
+
+
+def plan_transcode(probe: Optional[dict], path: str) -> TranscodePlan:
+    """
+    Decide ce prelucrare are nevoie fișierul:
+    - video H.264 compatibil + audio AAC (sau fără audio) într-un MP4 cu faststart -> none
+    - același conținut, dar alt container sau fără faststart -> remux
+    - video compatibil, audio în alt codec -> audio
+    - orice altceva (sau ffprobe a eșuat) -> transcode
+    """
+    if not probe:
+        return TranscodePlan(ACTION_TRANSCODE, "ffprobe indisponibil")
+
+    streams = [dict(s, index=s.get("index", position)) for position, s in enumerate(probe.get("streams", []))]
+    video_streams = [s for s in streams if s.get("codec_type") == "video"
+                     and not s.get("disposition", {}).get("attached_pic")]
+    audio_streams = [s for s in streams if s.get("codec_type") == "audio"]
+    if not video_streams:
+        return TranscodePlan(ACTION_TRANSCODE, "nu există stream video")
+    video_index = video_streams[0]["index"]
+    audio_index = audio_streams[0]["index"] if audio_streams else None
+
+    problem = _video_problem(video_streams[0])
+    if problem:
+        return TranscodePlan(ACTION_TRANSCODE, problem)
+
+    if audio_streams and audio_streams[0].get("codec_name", "").lower() not in COMPATIBLE_AUDIO_CODECS:
+        return TranscodePlan(ACTION_AUDIO, f"codec audio {audio_streams[0].get('codec_name', 'necunoscut')}",
+                             video_index, audio_index)
+
+    format_names = set(probe.get("format", {}).get("format_name", "").split(","))
+    if not format_names & MP4_FORMAT_NAMES:
+        return TranscodePlan(ACTION_REMUX, f"container {probe.get('format', {}).get('format_name', 'necunoscut')}",
+                             video_index, audio_index)
+    if len(video_streams) > 1 or len(audio_streams) > 1:
+        return TranscodePlan(ACTION_REMUX, "stream-uri suplimentare", video_index, audio_index)
+    if not has_faststart(path):
+        return TranscodePlan(ACTION_REMUX, "fără faststart", video_index, audio_index)
+
+    return TranscodePlan(ACTION_NONE, "deja compatibil")
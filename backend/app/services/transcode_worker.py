@@ -0,0 +1,237 @@
+# Cale: app/services/transcode_worker.py
+# Worker-ul care execută job-urile din coada de procesare video
+
+import asyncio
+import os
+import signal
+import threading
+from typing import Dict, Optional
+
+from .. import models
+from ..database import SessionLocal
+from ..models import ProcessingStatus
+from . import job_queue, video_pipeline
+from .encode_budget import EncodeTicket, encode_budget
+from .encode_registry import encode_registry
+from .event_bus import WORKER_ID, event_bus
+from .progress_hub import progress_hub
+from .progress_store import progress_store
+from .video_pipeline import process_video_background_task
+
+# Câte video-uri procesează simultan un worker; nesetat, urmează MAX_PARALLEL_PROCESSES din
+# video_pipeline (modificabil la runtime prin /optimize-settings)
+_concurrency_env = os.getenv("TRANSCODE_WORKER_CONCURRENCY")
+TRANSCODE_WORKER_CONCURRENCY = int(_concurrency_env) if _concurrency_env else None
+# Cât așteaptă un slot liber înainte să verifice din nou coada (job-uri adăugate de alte procese)
+TRANSCODE_POLL_INTERVAL = float(os.getenv("TRANSCODE_POLL_INTERVAL", "2"))
+# Procesele API rulează și ele un worker; cu 0, procesarea rămâne doar la workerii dedicați
+EMBEDDED_TRANSCODE_WORKER = os.getenv("EMBEDDED_TRANSCODE_WORKER", "1") == "1"
+
+
+class TranscodeWorker:
+    """
+    Un thread per slot: fiecare revendică un job din `transcode_jobs`, îl procesează și
+    raportează rezultatul. Cât timp rulează, un thread separat reînnoiește lease-ul; dacă
+    procesul moare, lease-ul expiră și job-ul este preluat de alt worker.
+
+    Rulează fie în procesul API (EMBEDDED_TRANSCODE_WORKER=1), fie separat, pe aceeași
+    mașină sau pe altele care văd aceeași bază de date și același MEDIA_DIRECTORY:
+        python -m app.services.transcode_worker
+    """
+
+    def __init__(self, worker_id: str = WORKER_ID, concurrency: Optional[int] = TRANSCODE_WORKER_CONCURRENCY,
+                 poll_interval: float = TRANSCODE_POLL_INTERVAL):
+        self.worker_id = worker_id
+        self.fixed_concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.running: Dict[int, int] = {}  # job_id -> media_file_id
+        self.completed = 0
+        self.failed = 0
+        self._stopping = threading.Event()
+        self._aborting = threading.Event()
+        self._threads: Dict[int, threading.Thread] = {}  # slot -> thread
+        self._slots_lock = threading.Lock()
+
+    @property
+    def concurrency(self) -> int:
+        """Citit la fiecare revendicare, ca modificările din /optimize-settings să aibă efect"""
+        if self.fixed_concurrency is not None:
+            return max(self.fixed_concurrency, 1)
+        return max(video_pipeline.MAX_PARALLEL_PROCESSES, 1)
+
+    def start(self):
+        if self._threads:
+            return
+        self._stopping.clear()
+        self.sync_slots()
+        print(f"INFO: Worker de procesare video pornit ({self.concurrency} sloturi, worker {self.worker_id})")
+
+    def sync_slots(self):
+        """Pornește thread-urile lipsă; sloturile peste `concurrency` se opresc singure după job-ul curent"""
+        with self._slots_lock:
+            if self._stopping.is_set():
+                return
+            for slot in range(self.concurrency):
+                thread = self._threads.get(slot)
+                if thread is not None and thread.is_alive():
+                    continue
+                thread = threading.Thread(target=self._slot_loop, args=(slot,), name=f"transcode-{slot}", daemon=True)
+                self._threads[slot] = thread
+                thread.start()
+
+    def _join_threads(self, timeout: Optional[float]):
+        for thread in list(self._threads.values()):
+            thread.join(timeout)
+        with self._slots_lock:
+            self._threads = {slot: thread for slot, thread in self._threads.items() if thread.is_alive()}
+
+    def stop(self, timeout: Optional[float] = None):
+        """Nu mai revendică job-uri noi; cu `timeout`, așteaptă job-urile în curs"""
+        self._stopping.set()
+        job_queue.job_available.set()
+        self._join_threads(timeout)
+
+    def abort(self, timeout: float = 5.0):
+        """
+        Oprirea procesului API: FFmpeg rulează în propria sesiune și ar supraviețui procesului,
+        iar după expirarea lease-ului un alt worker ar scrie în același fișier temporar. Oprim
+        deci encodările în curs și punem job-urile lor înapoi în coadă.
+        """
+        self._aborting.set()
+        self._stopping.set()
+        job_queue.job_available.set()
+        encode_registry.close()
+        self._join_threads(timeout)
+
+    def _slot_loop(self, slot: int):
+        while not self._stopping.is_set():
+            if slot >= self.concurrency:
+                # Numărul de sloturi a fost redus: slotul se închide
+                with self._slots_lock:
+                    if self._threads.get(slot) is threading.current_thread():
+                        del self._threads[slot]
+                return
+            if slot == 0:
+                # Numărul de sloturi a fost mărit: pornim sloturile noi
+                self.sync_slots()
+            # Job-ul este revendicat doar dacă mașina are resurse; altfel rămâne pentru alt worker
+            ticket = encode_budget.admit(self.concurrency)
+            if ticket is None:
+                self._stopping.wait(self.poll_interval)
+                continue
+            try:
+                job = job_queue.claim_next_job(self.worker_id)
+            except Exception as e:
+                print(f"EROARE la revendicarea unui job de procesare: {e}")
+                job = None
+            if job is None:
+                encode_budget.release(ticket)
+                job_queue.job_available.wait(self.poll_interval)
+                job_queue.job_available.clear()
+                continue
+            try:
+                self._run_job(job, ticket)
+            finally:
+                encode_budget.release(ticket)
+
+    def _run_job(self, job: job_queue.ClaimedJob, ticket: EncodeTicket):
+        self.running[job.id] = job.media_file_id
+        done = threading.Event()
+        heartbeat_thread = threading.Thread(target=self._heartbeat_loop, args=(job, done), daemon=True)
+        heartbeat_thread.start()
+        error = None
+        try:
+            if job.path is None:
+                print(f"INFO: Fișierul pentru job-ul {job.id} a fost șters, job-ul este închis")
+            else:
+                print(f"INFO: Job {job.id} (media ID {job.media_file_id}), încercarea {job.attempt}")
+                process_video_background_task(job.media_file_id, job.path, ticket.threads)
+                error = self._outcome(job.media_file_id)
+        except Exception as e:
+            error = str(e)
+        finally:
+            done.set()
+            self.running.pop(job.id, None)
+
+        if error is not None and self._aborting.is_set():
+            # Întrerupt de oprirea procesului, nu un eșec al fișierului
+            if job_queue.release_job(job, self.worker_id):
+                print(f"INFO: Job-ul {job.id} a fost pus înapoi în coadă (oprire worker)")
+            return
+
+        try:
+            status = job_queue.finish_job(job, self.worker_id, error)
+        except Exception as e:
+            # Lease-ul expiră și job-ul va fi reluat
+            print(f"EROARE la închiderea job-ului {job.id}: {e}")
+            return
+        if status == models.JobStatus.DONE:
+            self.completed += 1
+        elif status == models.JobStatus.FAILED:
+            self.failed += 1
+
+    def _outcome(self, media_file_id: int) -> Optional[str]:
+        """process_video_background_task raportează eșecul doar prin statusul fișierului"""
+        db = SessionLocal()
+        try:
+            media_file = db.get(models.MediaFile, media_file_id)
+            if media_file is None or media_file.processing_status == ProcessingStatus.COMPLETED:
+                return None
+            return f"Procesarea s-a terminat cu statusul {media_file.processing_status.value}"
+        finally:
+            db.close()
+
+    def _heartbeat_loop(self, job: job_queue.ClaimedJob, done: threading.Event):
+        while not done.wait(job_queue.TRANSCODE_JOB_HEARTBEAT):
+            try:
+                if not job_queue.heartbeat(job, self.worker_id):
+                    print(f"AVERTISMENT: Lease-ul job-ului {job.id} a fost pierdut (anulat sau preluat de alt worker)")
+                    # Rezultatul nu mai aparține acestui worker: oprim FFmpeg-ul
+                    encode_registry.cancel([job.media_file_id])
+                    return
+            except Exception as e:
+                print(f"EROARE la heartbeat pentru job-ul {job.id}: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "worker_id": self.worker_id,
+            "slots": self.concurrency,
+            "threads_per_job": encode_budget.threads_per_job(self.concurrency),
+            "running_jobs": len(self.running),
+            "completed": self.completed,
+            "failed": self.failed,
+        }
+
+
+transcode_worker = TranscodeWorker()
+
+
+async def run_standalone_worker():
+    """
+    Worker dedicat. Pornește și magistrala de evenimente, ca progresul să ajungă la
+    dashboard-urile conectate la procesele API (necesită EVENT_BUS_BACKEND distribuit).
+    """
+    async def handle_event(event: dict):
+        # Dintre evenimentele magistralei, worker-ul dedicat folosește doar anulările
+        if event.get("kind") == "cancel_encodes":
+            await asyncio.to_thread(encode_registry.cancel, event["media_ids"])
+
+    await event_bus.start(handle_event)
+    progress_hub.start()
+    transcode_worker.start()
+
+    stop_requested = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop_requested.set)
+    await stop_requested.wait()
+
+    print("INFO: Oprire worker: se așteaptă finalizarea job-urilor în curs")
+    await asyncio.to_thread(transcode_worker.stop)
+    await progress_hub.stop()
+    await progress_store.stop()
+    await event_bus.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(run_standalone_worker())
@@ -0,0 +1,765 @@
+# Cale: app/services/video_pipeline.py
+# Procesarea video după upload (thumbnail, prelucrare FFmpeg, variante de rezoluție) și configurarea encodării
+
+import hashlib
+import multiprocessing
+import os
+import re
+import shutil
+import subprocess
+import threading
+import time
+import uuid
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+from functools import partial
+from typing import Callable, List, Optional
+
+import ffmpeg
+from sqlalchemy.orm import Session
+
+from .. import models
+from ..database import SessionLocal
+from ..models import ProcessingStatus
+from . import encoder_benchmark, renditions, segment_encode, thumbnail_engine, transcode_plan
+from .encode_budget import apply_encoder_priority, encode_budget
+from .encode_registry import EncodeCancelled, encode_registry
+from .manifest_cache import manifest_cache
+from .media_probe import probe_media_file, stored_probe
+from .progress_hub import progress_hub
+from .progress_store import progress_store
+
+
+MEDIA_DIRECTORY = os.getenv("MEDIA_DIRECTORY", "/srv/signage-app/media_files")
+THUMBNAIL_DIRECTORY = os.getenv("THUMBNAIL_DIRECTORY", os.path.join(MEDIA_DIRECTORY, "thumbnails"))
+
+# Configurări optimizare video (pot fi modificate prin API)
+# Calculează procesele paralele optime bazat pe numărul de core-uri
+def calculate_optimal_processes():
+    cpu_count = multiprocessing.cpu_count()
+    if cpu_count <= 4:
+        return cpu_count
+    elif cpu_count <= 8:
+        return cpu_count - 1  # Lasă 1 core pentru sistem
+    elif cpu_count <= 16:
+        return cpu_count // 2  # Jumătate din core-uri
+    else:
+        return min(cpu_count // 3, 12)  # Pentru servere mari, max 12 procese paralele
+
+MAX_PARALLEL_PROCESSES = calculate_optimal_processes()
+USE_HARDWARE_ACCELERATION = True
+FFMPEG_THREADS = 0  # 0 = lasă FFmpeg să aleagă; worker-ul transmite thread-urile alocate de encode_budget
+FFMPEG_PRESET = "faster"  # ultrafast, superfast, veryfast, faster, fast, medium, slow, slower, veryslow
+FFMPEG_CRF = "23"  # 18-28 (mai mic = calitate mai bună, fișier mai mare)
+
+# Profilul măsurat pe această mașină (python -m app.services.encoder_benchmark) înlocuiește valorile implicite
+ENCODER_PROFILE = encoder_benchmark.load_profile()
+if ENCODER_PROFILE:
+    FFMPEG_PRESET = ENCODER_PROFILE["preset"]
+    FFMPEG_CRF = str(ENCODER_PROFILE["crf"])
+    if ENCODER_PROFILE["cores"] == multiprocessing.cpu_count():
+        MAX_PARALLEL_PROCESSES = ENCODER_PROFILE["max_parallel_processes"]
+    else:
+        # Profil copiat de pe altă mașină: preset-ul și CRF-ul rămân valabile, paralelismul nu
+        print(f"AVERTISMENT: Profilul encoderului a fost măsurat pe {ENCODER_PROFILE['cores']} core-uri, "
+              f"nu pe {multiprocessing.cpu_count()}; procesele paralele rămân la {MAX_PARALLEL_PROCESSES}")
+
+def validate_ffmpeg_installation():
+    """Validează că FFmpeg este instalat și funcțional"""
+    try:
+        result = subprocess.run(["ffmpeg", "-version"], capture_output=True, text=True, timeout=5)
+        if result.returncode == 0:
+            version_line = result.stdout.split('\n')[0]
+            print(f"INFO: FFmpeg detectat: {version_line}")
+            return True
+        else:
+            print(f"EROARE: FFmpeg nu funcționează corect (exit code: {result.returncode})")
+            return False
+    except (FileNotFoundError, subprocess.TimeoutExpired, Exception) as e:
+        print(f"EROARE: FFmpeg nu este instalat sau nu este în PATH: {e}")
+        return False
+
+# Validează FFmpeg la startup
+if not validate_ffmpeg_installation():
+    print("AVERTISMENT: FFmpeg nu funcționează corect. Re-encodingul video nu va funcționa!")
+
+print(f"INFO: Configurație video encoding inițializată:")
+print(f"  - CPU cores disponibile: {multiprocessing.cpu_count()}")
+print(f"  - Max procese paralele: {MAX_PARALLEL_PROCESSES}")
+print(f"  - Threads per proces FFmpeg: {encode_budget.threads_per_job(MAX_PARALLEL_PROCESSES)} (din {encode_budget.usable_cores} core-uri utilizabile)")
+print(f"  - Accelerare hardware: {'Activată' if USE_HARDWARE_ACCELERATION else 'Dezactivată'}")
+print(f"  - FFmpeg preset: {FFMPEG_PRESET}")
+print(f"  - FFmpeg CRF: {FFMPEG_CRF}")
+print(f"  - Profil encoder: {ENCODER_PROFILE['created_at'] if ENCODER_PROFILE else 'nu există (valori implicite)'}")
+print(f"  - Scalabilitate estimată: {MAX_PARALLEL_PROCESSES * encode_budget.threads_per_job(MAX_PARALLEL_PROCESSES)} total threads")
+
+os.makedirs(THUMBNAIL_DIRECTORY, exist_ok=True)
+
+# Dimensiunea blocurilor citite/scrise la upload și la calculul hash-ului
+HASH_CHUNK_SIZE = 1024 * 1024
+
+def compute_file_sha256(path: str):
+    """Calculează în streaming SHA-256 și dimensiunea unui fișier de pe disc"""
+    hasher = hashlib.sha256()
+    size = 0
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            hasher.update(block)
+            size += len(block)
+    return hasher.hexdigest(), size
+
+def detect_hardware_acceleration():
+    """Detectează dacă accelerarea hardware este disponibilă"""
+    print("INFO: Testez accelerarea hardware...")
+    
+    try:
+        # Test VAAPI
+        result = subprocess.run(
+            ["ffmpeg", "-f", "lavfi", "-i", "testsrc=duration=1:size=320x240:rate=1", 
+             "-f", "null", "-c:v", "h264_vaapi", "-"], 
+            capture_output=True, text=True, timeout=10
+        )
+        if result.returncode == 0:
+            print("INFO: VAAPI hardware acceleration detectată și disponibilă")
+            return "vaapi"
+        else:
+            print(f"INFO: VAAPI nu este disponibil (exit code: {result.returncode})")
+    except (subprocess.TimeoutExpired, FileNotFoundError, Exception) as e:
+        print(f"INFO: VAAPI test eșuat: {e}")
+    
+    try:
+        # Test NVENC
+        result = subprocess.run(
+            ["ffmpeg", "-f", "lavfi", "-i", "testsrc=duration=1:size=320x240:rate=1", 
+             "-f", "null", "-c:v", "h264_nvenc", "-"], 
+            capture_output=True, text=True, timeout=10
+        )
+        if result.returncode == 0:
+            print("INFO: NVENC hardware acceleration detectată și disponibilă")
+            return "nvenc"
+        else:
+            print(f"INFO: NVENC nu este disponibil (exit code: {result.returncode})")
+    except (subprocess.TimeoutExpired, FileNotFoundError, Exception) as e:
+        print(f"INFO: NVENC test eșuat: {e}")
+    
+    print("INFO: Nicio accelerare hardware detectată, se va folosi CPU")
+    return None
+
+# Cache pentru detectarea accelerării hardware
+_hardware_accel_cache = None
+
+def get_hardware_acceleration():
+    global _hardware_accel_cache
+    if _hardware_accel_cache is None:
+        _hardware_accel_cache = detect_hardware_acceleration() if USE_HARDWARE_ACCELERATION else None
+    return _hardware_accel_cache
+
+def reset_hardware_acceleration():
+    """Următoarea encodare detectează din nou accelerarea hardware"""
+    global _hardware_accel_cache
+    _hardware_accel_cache = None
+
+def parse_ffmpeg_stderr(line: str, total_duration: float):
+    """
+    Parsează stderr-ul FFmpeg pentru informații de progress
+    FFmpeg progress pe stderr arată ca:
+    frame= 1234 fps= 25 q=28.0 size=    2048kB time=00:01:30.40 bitrate= 185.3kbits/s speed=1.23x
+    """
+    line = line.strip()
+    
+    # Verificare rapidă: linia trebuie să conțină toate elementele necesare
+    if not ('frame=' in line and 'time=' in line and ('speed=' in line or 'fps=' in line)):
+        return None, None, None
+    
+    try:
+        # Extrage timpul curent (time=HH:MM:SS.ss)
+        # Pattern mai flexibil pentru diferite formate de timp
+        time_match = re.search(r'time=(\d{1,2}):(\d{2}):(\d{2}\.\d{2})', line)
+        if not time_match or total_duration <= 0:
+            return None, None, None
+            
+        hours = int(time_match.group(1))
+        minutes = int(time_match.group(2))
+        seconds = float(time_match.group(3))
+        current_time = hours * 3600 + minutes * 60 + seconds
+        
+        # Calculează progresul procentual
+        progress = min((current_time / total_duration) * 100, 100.0)
+        if progress < 0:
+            return None, None, None
+        
+        # Extrage viteza (speed=X.XXx) - pattern mai flexibil
+        speed = None
+        speed_match = re.search(r'speed=\s*([0-9.]+)x', line)
+        if speed_match:
+            speed_value = float(speed_match.group(1))
+            # Formatare frumoasă pentru speed
+            if speed_value >= 10:
+                speed = f"{speed_value:.0f}x"
+            elif speed_value >= 1:
+                speed = f"{speed_value:.1f}x"
+            else:
+                speed = f"{speed_value:.2f}x"
+        
+        # Calculează ETA doar pentru progress semnificativ
+        eta = None
+        if speed_match and 5 <= progress < 99:  # Doar între 5% și 99%
+            try:
+                speed_factor = float(speed_match.group(1))
+                if speed_factor > 0.1:  # Evită diviziunea cu valori foarte mici
+                    remaining_duration = total_duration - current_time
+                    if remaining_duration > 0:
+                        eta_seconds = remaining_duration / speed_factor
+                        # Limitează ETA la valori rezonabile (max 24 ore)
+                        eta = int(min(eta_seconds, 24 * 3600))
+            except (ValueError, ZeroDivisionError):
+                pass
+        
+        return progress, eta, speed
+        
+    except (ValueError, AttributeError, TypeError):
+        # Returnează None pentru linii care nu pot fi parsate
+        return None, None, None
+
+def media_progress_data(media_file: models.MediaFile) -> dict:
+    return {
+        "id": media_file.id,
+        "filename": media_file.filename,
+        "processing_status": media_file.processing_status.value,
+        "processing_progress": media_file.processing_progress,
+        "processing_eta": media_file.processing_eta,
+        "processing_speed": media_file.processing_speed
+    }
+
+def report_media_state(media_file: models.MediaFile):
+    """Trimite starea fișierului către hub-ul de progress (grupat per utilizator, vezi progress_hub)"""
+    progress_hub.publish(media_file.uploaded_by_id, media_progress_data(media_file))
+
+def update_progress(media_file_id: int, progress: float, eta: int = None, speed: str = None):
+    """Reține progresul în memorie (scris în lot de progress_store) și îl trimite hub-ului de progress"""
+    job = progress_store.record(media_file_id, min(progress, 100.0), eta, speed)
+    if job is not None:
+        user_id, progress_data = job
+        progress_hub.publish(user_id, progress_data)
+
+def end_progress_tracking(media_file: models.MediaFile):
+    """Job terminat: ultimele valori din memorie intră în același commit cu statusul final"""
+    live = progress_store.end(media_file.id)
+    if live is not None:
+        media_file.processing_progress, media_file.processing_eta, media_file.processing_speed = live
+
+def generate_thumbnail(video_path: str, thumbnail_path: str, duration: Optional[float] = None):
+    """
+    Generează thumbnail inteligent pentru video
+    Alege frame-ul după expunere, contrast și entropia luminanței
+    `duration` vine din metadatele salvate (media_probe); fără ea, se trece direct la fallback
+    """
+    try:
+        if not duration:
+            raise ValueError("durata video-ului este necunoscută")
+        
+        # Candidații sunt decodați într-o singură trecere și evaluați cu NumPy (vezi thumbnail_engine)
+        best_timestamp = thumbnail_engine.generate_best_thumbnail(video_path, thumbnail_path, duration)
+        
+        print(f"INFO: Thumbnail generat cu succes la {best_timestamp:.1f}s pentru {video_path}")
+        return True
+        
+    except Exception as e:
+        print(f"EROARE la generarea thumbnail-ului inteligent: {e}")
+        
+        # Fallback la metoda simplă dacă cea inteligentă eșuează
+        try:
+            print("DEBUG: Algoritmul inteligent a eșuat, încerc metoda simplă de fallback...")
+            
+            # Încercare cu mai multe poziții de fallback
+            fallback_positions = [5, 10, 3, 15, 8]  # Poziții în secunde
+            
+            for fb_position in fallback_positions:
+                try:
+                    (
+                        ffmpeg
+                        .input(video_path, ss=fb_position)
+                        .output(thumbnail_path, vframes=1, **{'q:v': 3})
+                        .overwrite_output()
+                        .run(capture_stdout=True, capture_stderr=True, quiet=True)
+                    )
+                    print(f"INFO: Thumbnail generat cu metoda de fallback la {fb_position}s")
+                    return True
+                except ffmpeg.Error:
+                    continue
+            
+            # Ultima încercare - primul frame disponibil
+            try:
+                (
+                    ffmpeg
+                    .input(video_path)
+                    .output(thumbnail_path, vframes=1, **{'q:v': 3})
+                    .overwrite_output()
+                    .run(capture_stdout=True, capture_stderr=True, quiet=True)
+                )
+                print("INFO: Thumbnail generat cu ultimul fallback (primul frame)")
+                return True
+            except ffmpeg.Error as final_error:
+                print(f"EROARE: Toate metodele de generare thumbnail au eșuat: {final_error}")
+                return False
+                
+        except Exception as fallback_error:
+            print(f"EROARE în fallback-ul de thumbnail: {fallback_error}")
+            return False
+
+def run_ffmpeg_with_progress(command: list, media_file_id: int, total_duration: float,
+                             aggregate_progress: Optional[Callable[[float], tuple]] = None):
+    """
+    Rulează FFmpeg cu progress tracking în timp real din stderr.
+    Cu `aggregate_progress`, progresul acestui proces (ex. un segment) este transformat în
+    progresul întregului fișier (progres, eta, viteză) înainte de a fi raportat.
+    """
+    print(f"DEBUG: Pornesc FFmpeg cu progress tracking REAL pentru media ID {media_file_id}, durată: {total_duration}s")
+    
+    # Pornește procesul FFmpeg cu prioritate CPU / I/O redusă, ca API-ul să rămână responsiv.
+    # Are propriul grup de procese, ca anularea să oprească și eventualele procese copil.
+    process = subprocess.Popen(
+        command,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        universal_newlines=True,
+        start_new_session=os.name != "nt"
+    )
+    apply_encoder_priority(process.pid)
+    encode_registry.attach(media_file_id, process)
+    
+    last_progress_update = 0
+    last_update_time = time.time()
+    
+    # Citește stderr în timp real pentru progress
+    def monitor_stderr():
+        nonlocal last_progress_update, last_update_time
+        
+        while process.poll() is None:
+            try:
+                # Citește o linie din stderr
+                line = process.stderr.readline()
+                if not line:
+                    continue
+                    
+                # Parsează linia pentru informații de progress
+                progress, eta, speed = parse_ffmpeg_stderr(line, total_duration)
+                
+                current_time = time.time()
+                # Actualizează progresul doar dacă:
+                # 1. S-a schimbat cu cel puțin 1% SAU
+                # 2. Au trecut cel puțin 3 secunde de la ultima actualizare
+                if (progress is not None and 
+                    (abs(progress - last_progress_update) >= 1.0 or 
+                     current_time - last_update_time >= 3.0)):
+                    
+                    last_progress_update = progress
+                    last_update_time = current_time
+                    if aggregate_progress is not None:
+                        progress, eta, speed = aggregate_progress(progress)
+                    update_progress(media_file_id, progress, eta, speed)
+                    print(f"INFO: Progress REAL media ID {media_file_id}: {progress:.1f}%, speed: {speed}, ETA: {eta}s")
+                    
+            except Exception as e:
+                print(f"DEBUG: Eroare la citirea stderr FFmpeg: {e}")
+                break
+    
+    # Pornește thread-ul de monitoring stderr
+    stderr_thread = threading.Thread(target=monitor_stderr, daemon=True)
+    stderr_thread.start()
+    
+    # Așteaptă finalizarea procesului principal
+    stdout, stderr = process.communicate()
+    
+    # Așteaptă și thread-ul de monitoring să se termine
+    stderr_thread.join(timeout=5)
+
+    # Procesul a fost oprit de encode_registry (fișier șters sau resetat)
+    encode_registry.check(media_file_id)
+    
+    if process.returncode != 0:
+        # Analizează ultima linie de stderr pentru informații de debugging
+        if stderr:
+            lines = stderr.strip().split('\n')
+            for line in reversed(lines[-10:]):  # Ultimele 10 linii
+                progress, eta, speed = parse_ffmpeg_stderr(line, total_duration)
+                if progress is not None:
+                    print(f"DEBUG: Ultima linie de progress detectată: {progress:.1f}% - {line}")
+                    break
+        
+        raise subprocess.CalledProcessError(process.returncode, command, stdout, stderr)
+    
+    return subprocess.CompletedProcess(command, process.returncode, stdout, stderr)
+
+def encode_in_segments(media_file_id: int, original_path: str, output_path: str, threads: int, has_audio: bool):
+    """
+    Encodare CPU a unui video lung pe toate thread-urile alocate job-ului: sursa este împărțită
+    la keyframe-uri, segmentele sunt encodate simultan (câte SEGMENT_THREADS thread-uri fiecare),
+    apoi lipite fără re-encodare cu demuxer-ul concat. Audio-ul este encodat o dată, în paralel.
+    """
+    work_dir = original_path + "_segments"
+    os.makedirs(work_dir, exist_ok=True)
+    try:
+        run_ffmpeg_with_progress(segment_encode.split_command(original_path, work_dir), media_file_id, 0.0)
+        segments = segment_encode.read_segments(work_dir)
+        workers = segment_encode.segment_workers(threads)
+        print(f"INFO: Media ID {media_file_id}: {len(segments)} segmente, {workers} encodări simultane")
+
+        progress = segment_encode.SegmentProgress(segments)
+        aborted = threading.Event()
+
+        def run_part(command: list, duration: float, aggregate_progress=None):
+            if not aborted.is_set():
+                run_ffmpeg_with_progress(command, media_file_id, duration, aggregate_progress)
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"segment-{media_file_id}") as executor:
+            futures = []
+            if has_audio:
+                futures.append(executor.submit(run_part, segment_encode.audio_command(original_path, work_dir), 0.0))
+            for index, segment in enumerate(segments):
+                futures.append(executor.submit(
+                    run_part, segment_encode.segment_command(segment, FFMPEG_PRESET, FFMPEG_CRF),
+                    segment.duration, partial(progress.update, index)
+                ))
+            done, pending = wait(futures, return_when=FIRST_EXCEPTION)
+            failed = next((future for future in done if future.exception() is not None), None)
+            if failed is not None:
+                # La prima eroare (sau anulare): segmentele care nu au pornit nu mai pornesc, iar cele
+                # active sunt oprite, ca reluarea cu un singur proces să nu le aștepte
+                aborted.set()
+                for future in pending:
+                    future.cancel()
+                # Un segment abia pornit își înregistrează procesul cu o clipă mai târziu, deci repetăm
+                while pending:
+                    encode_registry.stop_processes(media_file_id)
+                    _, pending = wait(pending, timeout=0.2)
+                failed.result()
+
+        run_ffmpeg_with_progress(
+            segment_encode.concat_command(segments, work_dir, output_path, has_audio), media_file_id, 0.0
+        )
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+def remove_rendition_files(media_file: models.MediaFile):
+    """Șterge de pe disc variantele de rezoluție ale fișierului (rândurile dispar prin cascade)"""
+    for rendition in media_file.renditions:
+        if os.path.exists(rendition.path):
+            try:
+                os.remove(rendition.path)
+            except OSError as e:
+                print(f"EROARE la ștergerea variantei {rendition.path}: {e}")
+
+def generate_renditions(db: Session, media_file: models.MediaFile, threads: int = FFMPEG_THREADS):
+    """
+    Encodează variantele la rezoluție redusă cerute de ecranele utilizatorului (doar micșorări).
+    Se rulează după ce fișierul a fost marcat FINALIZAT, deci originalul e redabil între timp;
+    o variantă eșuată doar lipsește (ecranul primește originalul). Erorile de aici nu schimbă
+    statusul fișierului; doar anularea (EncodeCancelled) ajunge la apelant.
+    """
+    if not renditions.RENDITIONS_ENABLED:
+        return
+    media_file_id = media_file.id
+    try:
+        _encode_renditions(db, media_file, threads)
+    except EncodeCancelled:
+        raise
+    except Exception as e:
+        db.rollback()
+        print(f"EROARE la generarea variantelor de rezoluție pentru media ID {media_file_id}: {e}")
+
+def _encode_renditions(db: Session, media_file: models.MediaFile, threads: int):
+    media_file_id = media_file.id
+    # Variantele vechi descriu conținutul de dinainte de procesare
+    remove_rendition_files(media_file)
+    media_file.renditions.clear()
+    db.commit()
+
+    rungs = renditions.rungs_to_encode(media_file, renditions.fleet_rungs(db, media_file.uploaded_by_id))
+    if not rungs:
+        return
+    print(f"INFO: Media ID {media_file_id}: variante de rezoluție {', '.join(f'{rung}p' for rung in rungs)}")
+
+    for rung in rungs:
+        final_path = renditions.rendition_path(media_file, rung)
+        temp_path = final_path + "_tmp.mp4"
+        encode_registry.begin(media_file_id, temp_path)
+        try:
+            command = renditions.rendition_command(media_file.path, temp_path, rung, FFMPEG_PRESET, threads)
+            print(f"DEBUG: Comanda FFmpeg pentru varianta {rung}p: {' '.join(command)}")
+            run_ffmpeg_with_progress(command, media_file_id, 0.0)
+            sha256, size = compute_file_sha256(temp_path)
+            with encode_registry.finalizing(media_file_id):
+                if not os.path.exists(media_file.path):
+                    raise EncodeCancelled(f"Fișierul {media_file.path} a fost șters în timpul procesării")
+                shutil.move(temp_path, final_path)
+            # Latura lungă, rotunjită la par ca în filtrul scale (-2)
+            long_side = round(rung * max(media_file.width, media_file.height) / min(media_file.width, media_file.height) / 2) * 2
+            media_file.renditions.append(models.MediaRendition(
+                height=rung,
+                width=long_side,
+                bitrate_kbps=renditions.RENDITION_LADDER[rung],
+                path=final_path,
+                size=size,
+                content_sha256=sha256,
+            ))
+            db.commit()
+        except subprocess.CalledProcessError as e:
+            stderr_output = e.stderr if isinstance(e.stderr, str) else "N/A"
+            print(f"EROARE: Varianta {rung}p pentru media ID {media_file_id} a eșuat: {stderr_output[-500:]}")
+        except OSError as e:
+            print(f"EROARE: Varianta {rung}p pentru media ID {media_file_id} nu a putut fi salvată: {e}")
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    # Ecranele trebuie să descarce noile variante
+    bump_playlist_versions_for_media(db, [media_file_id])
+    db.commit()
+
+def process_video_background_task(media_file_id: int, original_path: str, threads: int = FFMPEG_THREADS):
+    """
+    Gestionează întregul proces de post-upload pentru un video:
+    1. Setează statusul la PROCESSING.
+    2. Generează thumbnail.
+    3. Re-encodează video (cu `threads` thread-uri FFmpeg; 0 = automat).
+    4. Setează statusul la COMPLETED sau FAILED.
+    """
+    db = SessionLocal()
+    media_file_to_update = db.query(models.MediaFile).filter(models.MediaFile.id == media_file_id).first()
+    if not media_file_to_update:
+        print(f"EROARE: Nu s-a găsit media_file cu ID {media_file_id} pentru procesare.")
+        db.close()
+        return
+
+    temp_output_path = original_path + "_processed.mp4"
+    encode_registry.begin(media_file_id, temp_output_path)
+
+    try:
+        # Pasul 1: Setează statusul la PROCESSING și inițializează progress
+        media_file_to_update.processing_status = ProcessingStatus.PROCESSING
+        media_file_to_update.processing_progress = 0.0
+        media_file_to_update.processing_started_at = datetime.now(timezone.utc)
+        media_file_to_update.processing_eta = None
+        media_file_to_update.processing_speed = None
+        db.commit()
+        progress_store.begin(media_file_to_update)
+        report_media_state(media_file_to_update)
+        print(f"INFO: Pornire procesare pentru fișierul: {original_path}")
+
+        # Metadatele sunt salvate la upload; fișierele mai vechi sunt analizate acum, o singură dată
+        if media_file_to_update.probed_at is None:
+            probe_media_file(media_file_to_update, original_path)
+            db.commit()
+
+        # Pasul 2: Generează thumbnail
+        thumb_filename = f"{uuid.uuid4()}.jpg"
+        thumbnail_full_path = f"{THUMBNAIL_DIRECTORY}/{thumb_filename}"
+        if generate_thumbnail(original_path, thumbnail_full_path, media_file_to_update.duration):
+            media_file_to_update.thumbnail_path = thumb_filename
+            db.commit()
+            print(f"INFO: Thumbnail generat pentru media ID {media_file_id}.")
+
+        # Pasul 3: Alegem prelucrarea cea mai ieftină care face fișierul redabil
+        probe = stored_probe(media_file_to_update)
+        plan = transcode_plan.plan_transcode(probe, original_path)
+        media_file_to_update.transcode_action = plan.action
+        print(f"INFO: Media ID {media_file_id}: prelucrare '{plan.action}' ({plan.reason})")
+
+        if plan.action == transcode_plan.ACTION_NONE:
+            end_progress_tracking(media_file_to_update)
+            media_file_to_update.processing_status = ProcessingStatus.COMPLETED
+            media_file_to_update.processing_progress = 100.0
+            db.commit()
+            report_media_state(media_file_to_update)
+            print(f"INFO: Statusul pentru media ID {media_file_id} a fost setat la FINALIZAT (fără re-encoding).")
+            generate_renditions(db, media_file_to_update, threads)
+            return
+
+        hw_accel = get_hardware_acceleration() if plan.action == transcode_plan.ACTION_TRANSCODE else None
+
+        if plan.action == transcode_plan.ACTION_REMUX:
+            # Stream-urile sunt copiate; se schimbă doar containerul / poziția atomului moov
+            command = [
+                "ffmpeg",
+                "-i", original_path,
+                *transcode_plan.stream_maps(plan),
+                "-c", "copy",
+                "-movflags", "+faststart",
+                "-y",
+                temp_output_path
+            ]
+        elif plan.action == transcode_plan.ACTION_AUDIO:
+            command = [
+                "ffmpeg",
+                "-i", original_path,
+                *transcode_plan.stream_maps(plan),
+                "-c:v", "copy",
+                "-c:a", "aac",
+                "-b:a", "128k",
+                "-movflags", "+faststart",
+                "-y",
+                temp_output_path
+            ]
+        elif hw_accel == "vaapi":
+            command = [
+                "ffmpeg",
+                "-hwaccel", "vaapi",
+                "-hwaccel_device", "/dev/dri/renderD128",
+                "-i", original_path,
+                "-c:v", "h264_vaapi",
+                "-profile:v", "main",
+                "-level", "4.0",
+                "-qp", FFMPEG_CRF,
+                "-c:a", "aac",
+                "-b:a", "128k",
+                "-movflags", "+faststart",
+                "-y",
+                temp_output_path
+            ]
+        elif hw_accel == "nvenc":
+            command = [
+                "ffmpeg",
+                "-hwaccel", "cuda",
+                "-i", original_path,
+                "-c:v", "h264_nvenc",
+                "-profile:v", "main",
+                "-level", "4.0",
+                "-cq", FFMPEG_CRF,
+                "-preset", "fast",
+                "-c:a", "aac",
+                "-b:a", "128k",
+                "-movflags", "+faststart",
+                "-y",
+                temp_output_path
+            ]
+        else:
+            # Fallback la CPU optimizat - comandă simplificată pentru depanare
+            command = [
+                "ffmpeg",
+                "-i", original_path,
+                "-c:v", "libx264",
+                "-preset", FFMPEG_PRESET,
+                "-crf", FFMPEG_CRF,
+                "-c:a", "aac",
+                "-b:a", "128k",
+                "-movflags", "+faststart",
+                "-y",
+                temp_output_path
+            ]
+        
+        if threads > 0:
+            command[-2:-2] = ["-threads", str(threads)]
+
+        if plan.action == transcode_plan.ACTION_TRANSCODE:
+            print(f"INFO: Utilizez {hw_accel if hw_accel else 'CPU'} pentru re-encoding")
+        print(f"DEBUG: Comanda completă FFmpeg: {' '.join(command)}")
+        
+        start_time = time.time()
+        
+        # Verificăm dacă fișierul de intrare există și este valid
+        if not os.path.exists(original_path):
+            raise Exception(f"Fișierul de intrare nu există: {original_path}")
+        
+        file_size = os.path.getsize(original_path)
+        if file_size == 0:
+            raise Exception(f"Fișierul de intrare este gol: {original_path}")
+        
+        print(f"INFO: Procesez fișierul {original_path} ({file_size / 1024 / 1024:.2f} MB)")
+        
+        # Durata pentru progress tracking vine din metadatele salvate
+        video_duration = media_file_to_update.duration or 0.0
+        
+        # Video-urile lungi encodate pe CPU sunt împărțite pe segmente encodate simultan
+        segment_threads = threads or encode_budget.usable_cores
+        segmented = (plan.action == transcode_plan.ACTION_TRANSCODE and hw_accel is None
+                     and segment_encode.should_segment(video_duration, segment_threads))
+        if segmented:
+            try:
+                encode_in_segments(media_file_id, original_path, temp_output_path, segment_threads,
+                                   media_file_to_update.audio_codec is not None)
+            except subprocess.CalledProcessError as e:
+                stderr_output = e.stderr if isinstance(e.stderr, str) else "N/A"
+                print(f"AVERTISMENT: Encodarea pe segmente a eșuat pentru media ID {media_file_id}, "
+                      f"reiau cu un singur proces: {stderr_output[-300:]}")
+                segmented = False
+        if not segmented:
+            # Rulez comanda FFmpeg cu progress tracking
+            run_ffmpeg_with_progress(command, media_file_id, video_duration)
+        
+        encoding_time = time.time() - start_time
+        print(f"INFO: Prelucrarea '{plan.action}' finalizată în {encoding_time:.2f} secunde pentru {original_path}")
+        
+        new_sha256, new_size = compute_file_sha256(temp_output_path)
+        # Metadatele descriu fișierul stocat, deci rezultatul este analizat (o dată) înainte să-l înlocuiască
+        probe_media_file(media_file_to_update, temp_output_path)
+        with encode_registry.finalizing(media_file_id):
+            # Originalul șters între timp (eventual din alt proces) nu este recreat
+            if not os.path.exists(original_path):
+                raise EncodeCancelled(f"Fișierul {original_path} a fost șters în timpul procesării")
+            shutil.move(temp_output_path, original_path)
+        print(f"SUCCES: Fișierul video {original_path} a fost prelucrat ({plan.action}).")
+
+        # Pasul 4: Setează statusul la FINALIZAT și actualizează dimensiunea și hash-ul.
+        # Conținutul s-a schimbat, deci manifestele playlist-urilor care îl folosesc trebuie reînnoite.
+        media_file_to_update.size = new_size
+        media_file_to_update.content_sha256 = new_sha256
+        bump_playlist_versions_for_media(db, [media_file_id])
+        end_progress_tracking(media_file_to_update)
+        media_file_to_update.processing_status = ProcessingStatus.COMPLETED
+        media_file_to_update.processing_progress = 100.0
+        media_file_to_update.processing_eta = 0
+        db.commit()
+        report_media_state(media_file_to_update)
+        print(f"INFO: Statusul pentru media ID {media_file_id} a fost setat la FINALIZAT.")
+
+        # Pasul 5: Variantele la rezoluție redusă pentru ecranele mai mici
+        generate_renditions(db, media_file_to_update, threads)
+
+    except EncodeCancelled as e:
+        # Fișierul a fost șters sau resetat: rândul nu mai trebuie atins
+        db.rollback()
+        print(f"INFO: {e}")
+    except subprocess.CalledProcessError as e:
+        # În Python 3.12 stderr este deja string, nu bytes
+        stderr_output = e.stderr if isinstance(e.stderr, str) else e.stderr.decode('utf-8', errors='ignore') if e.stderr else "N/A"
+        stdout_output = e.stdout if isinstance(e.stdout, str) else e.stdout.decode('utf-8', errors='ignore') if e.stdout else "N/A"
+        
+        print(f"EROARE: Procesarea FFmpeg a eșuat pentru {original_path}")
+        print(f"  - Exit code: {e.returncode}")
+        print(f"  - Comandă: {' '.join(e.cmd)}")
+        print(f"  - FFmpeg stderr: {stderr_output}")
+        print(f"  - FFmpeg stdout: {stdout_output}")
+        
+        end_progress_tracking(media_file_to_update)
+        media_file_to_update.processing_status = ProcessingStatus.FAILED
+        db.commit()
+        report_media_state(media_file_to_update)
+    except Exception as e:
+        print(f"EROARE NECUNOSCUTĂ în timpul procesării video pentru {original_path}: {e}")
+        end_progress_tracking(media_file_to_update)
+        media_file_to_update.processing_status = ProcessingStatus.FAILED
+        db.commit()
+        report_media_state(media_file_to_update)
+    finally:
+        # Ștergem fișierul temporar dacă a rămas agățat
+        if os.path.exists(temp_output_path):
+            os.remove(temp_output_path)
+        progress_store.end(media_file_id)
+        encode_registry.end(media_file_id)
+        db.close()
+
+
+def bump_playlist_versions_for_media(db: Session, media_ids: List[int]):
+    """
+    Generează o versiune nouă pentru playlist-urile care conțin fișierele media date,
+    astfel încât player-ele să nu primească 304 pentru un manifest care s-a schimbat.
+    """
+    playlists = db.query(models.Playlist).join(models.PlaylistItem).filter(
+        models.PlaylistItem.mediafile_id.in_(media_ids)
+    ).distinct().all()
+    for playlist in playlists:
+        playlist.playlist_version = str(uuid.uuid4())
+        manifest_cache.invalidate_playlist(playlist.id)
+    return playlists
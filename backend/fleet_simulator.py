@@ -0,0 +1,518 @@
+#!/usr/bin/env python3
+"""
+Simulator de flotă / harness de încărcare pentru backend-ul de signage.
+
+Simulează N player-e virtuale împotriva unei instanțe locale (SQLite sau Postgres local).
+Fiecare player face exact ce face aplicația de pe TV:
+  1. se înregistrează cu un cod de împerechere (POST /api/client/register)
+  2. este împerecheat din contul de test (POST /api/screens/pair) și primește playlist-ul
+  3. ține deschis WebSocket-ul /api/ws/connect/{screen_key} (trimite device_info)
+  4. face periodic /api/client/sync cu X-Playlist-Version
+  5. trimite periodic loguri de redare la /api/reports/player-logs/
+
+La final raportează, per endpoint: număr de request-uri, erori, p50/p99/max, throughput
+și - dacă serverul rulează cu QUERY_STATS_ENABLED=1 - numărul de interogări SQL per request.
+
+Exemplu (instanță locală cu SQLite):
+
+    export DATABASE_URL=sqlite:////tmp/bench.db QUERY_STATS_ENABLED=1 \\
+           STATIC_DIRECTORY=/tmp/bench/static MEDIA_DIRECTORY=/tmp/bench/media
+    uvicorn app.main:app --port 8000 &
+    python fleet_simulator.py --screens 500 --duration 120 --seed \\
+           --email bench@example.com --password bench --json-out rezultat.json
+
+Opțiunea --seed creează direct în baza de date (aceeași DATABASE_URL ca serverul) un cont
+verificat și un playlist cu conținut web, fără upload-uri și fără procesare FFmpeg.
+"""
+
+import argparse
+import asyncio
+import http.client
+import json
+import random
+import string
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+from urllib.parse import urlencode, urlparse
+
+import websockets
+
+
+# =====================================================================
+# COLECTAREA METRICILOR
+# =====================================================================
+
+class EndpointStats:
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.statuses: Dict[str, int] = defaultdict(int)
+        self.first_start: Optional[float] = None
+        self.last_end: Optional[float] = None
+
+    def add(self, started: float, ended: float, status: str):
+        self.latencies.append(ended - started)
+        self.statuses[status] += 1
+        if self.first_start is None or started < self.first_start:
+            self.first_start = started
+        if self.last_end is None or ended > self.last_end:
+            self.last_end = ended
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.endpoints: Dict[str, EndpointStats] = defaultdict(EndpointStats)
+        self.ws_messages = 0
+        self.ws_reconnects = 0
+        # Cât a așteptat un request după un thread liber din pool (limita harness-ului, nu a serverului)
+        self.queue_waits: List[float] = []
+
+    def record(self, endpoint: str, started: float, ended: float, status):
+        with self._lock:
+            self.endpoints[endpoint].add(started, ended, str(status))
+
+    def record_ws_message(self):
+        with self._lock:
+            self.ws_messages += 1
+
+    def record_ws_reconnect(self):
+        with self._lock:
+            self.ws_reconnects += 1
+
+    def record_queue_wait(self, seconds: float):
+        with self._lock:
+            self.queue_waits.append(seconds)
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(pct / 100.0 * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def is_error(status: str) -> bool:
+    return not status.isdigit() or int(status) >= 400
+
+
+# =====================================================================
+# PLAYER VIRTUAL
+# =====================================================================
+
+class VirtualPlayer:
+    def __init__(self, index: int, args, metrics: Metrics, pool: ThreadPoolExecutor):
+        self.index = index
+        self.args = args
+        self.metrics = metrics
+        self.pool = pool
+        self.screen_key = f"loadtest-{uuid.uuid4()}"
+        self.screen_id: Optional[int] = None
+        self.playlist_version: Optional[str] = None
+        self.playlist_id: Optional[int] = None
+        self.media_ids: List[int] = []
+        parsed = urlparse(args.base_url)
+        self._host = parsed.hostname
+        self._port = parsed.port or (443 if parsed.scheme == "https" else 80)
+        self._https = parsed.scheme == "https"
+        self._conn: Optional[http.client.HTTPConnection] = None
+        # Sync-ul declanșat de WebSocket și bucla periodică folosesc aceeași conexiune
+        self._request_lock = asyncio.Lock()
+
+    # --- HTTP (rulează în thread-urile din pool, cu o conexiune keep-alive per player) ---
+    def _http(self, method: str, path: str, endpoint: str, body: Optional[bytes] = None,
+              headers: Optional[dict] = None, submitted_at: float = 0.0):
+        started = time.perf_counter()
+        self.metrics.record_queue_wait(started - submitted_at)
+        for attempt in range(2):
+            if self._conn is None:
+                conn_class = http.client.HTTPSConnection if self._https else http.client.HTTPConnection
+                self._conn = conn_class(self._host, self._port, timeout=self.args.timeout)
+            try:
+                self._conn.request(method, path, body=body, headers=headers or {})
+                response = self._conn.getresponse()
+                payload = response.read()
+                self.metrics.record(endpoint, started, time.perf_counter(), response.status)
+                return response.status, payload
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError) as e:
+                # Conexiunea keep-alive a fost închisă de server - reîncercăm o singură dată
+                self._conn.close()
+                self._conn = None
+                if attempt == 1:
+                    self.metrics.record(endpoint, started, time.perf_counter(), type(e).__name__)
+                    return None, b""
+            except Exception as e:
+                self._conn.close()
+                self._conn = None
+                self.metrics.record(endpoint, started, time.perf_counter(), type(e).__name__)
+                return None, b""
+        return None, b""
+
+    async def request(self, method: str, path: str, endpoint: str, json_body=None, headers=None):
+        headers = dict(headers or {})
+        body = None
+        if json_body is not None:
+            body = json.dumps(json_body).encode()
+            headers["Content-Type"] = "application/json"
+        loop = asyncio.get_running_loop()
+        async with self._request_lock:
+            return await loop.run_in_executor(
+                self.pool, self._http, method, path, endpoint, body, headers, time.perf_counter()
+            )
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+
+    # --- Ciclul de viață al player-ului ---
+    async def register_and_pair(self, pairing_code: str, auth_headers: dict, playlist_id: Optional[int]) -> bool:
+        status, _ = await self.request("POST", "/api/client/register", "POST /client/register",
+                                       {"unique_key": self.screen_key, "pairing_code": pairing_code})
+        if status != 201:
+            return False
+
+        status, payload = await self.request("POST", "/api/screens/pair", "POST /screens/pair",
+                                             {"pairing_code": pairing_code, "name": f"Loadtest {self.index:05d}",
+                                              "location": "fleet-simulator"},
+                                             auth_headers)
+        if status != 200:
+            return False
+        self.screen_id = json.loads(payload)["id"]
+
+        if playlist_id is not None:
+            status, _ = await self.request("POST", f"/api/screens/{self.screen_id}/assign_playlist",
+                                           "POST /screens/{id}/assign_playlist",
+                                           {"playlist_id": playlist_id}, auth_headers)
+            if status != 200:
+                return False
+        return True
+
+    async def sync(self):
+        headers = {"X-Screen-Key": self.screen_key}
+        if self.playlist_version:
+            headers["X-Playlist-Version"] = self.playlist_version
+        status, payload = await self.request("GET", "/api/client/sync", "GET /client/sync", headers=headers)
+        if status == 200 and payload:
+            data = json.loads(payload)
+            self.playlist_version = data.get("playlist_version")
+            self.playlist_id = data.get("id")
+            self.media_ids = []
+            for item in data.get("items", []):
+                # URL-urile sunt de forma .../api/media/serve/{media_id}
+                tail = item.get("url", "").rstrip("/").rsplit("/", 1)[-1]
+                if tail.isdigit():
+                    self.media_ids.append(int(tail))
+
+    async def send_logs(self):
+        if not self.playlist_id or not self.media_ids:
+            return
+        now = datetime.now(timezone.utc).isoformat()
+        logs = [
+            {
+                "media_id": random.choice(self.media_ids),
+                "playlist_id": self.playlist_id,
+                "event_type": "START" if i % 2 == 0 else "END",
+                "timestamp": now,
+            }
+            for i in range(self.args.log_batch)
+        ]
+        await self.request("POST", "/api/reports/player-logs/", "POST /reports/player-logs/", logs,
+                           {"X-Screen-Key": self.screen_key})
+
+    async def hold_websocket(self, stop: asyncio.Event):
+        url = self.args.base_url.replace("http", "ws", 1) + f"/api/ws/connect/{self.screen_key}"
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                async with websockets.connect(url, open_timeout=self.args.timeout, ping_interval=None) as ws:
+                    self.metrics.record("WS /ws/connect/{screen_key}", started, time.perf_counter(), 101)
+                    await ws.send(json.dumps({"type": "device_info", "version": "loadtest", "resolution": "1920x1080"}))
+                    receive = asyncio.ensure_future(self._receive(ws))
+                    stopped = asyncio.ensure_future(stop.wait())
+                    await asyncio.wait({receive, stopped}, return_when=asyncio.FIRST_COMPLETED)
+                    for task in (receive, stopped):
+                        task.cancel()
+            except Exception as e:
+                self.metrics.record("WS /ws/connect/{screen_key}", started, time.perf_counter(), type(e).__name__)
+            if not stop.is_set():
+                # Player-ul real se reconectează după o pauză scurtă
+                self.metrics.record_ws_reconnect()
+                await asyncio.sleep(self.args.reconnect_delay)
+
+    async def _receive(self, ws):
+        async for message in ws:
+            self.metrics.record_ws_message()
+            if isinstance(message, str) and "playlist_updated" in message:
+                await self.sync()
+
+    async def run(self, stop: asyncio.Event):
+        # Împrăștiem primul sync pentru a nu porni toate player-ele în aceeași secundă
+        await asyncio.sleep(random.uniform(0, self.args.sync_interval))
+        next_log = time.monotonic() + random.uniform(0, self.args.log_interval)
+        while not stop.is_set():
+            await self.sync()
+            if time.monotonic() >= next_log:
+                await self.send_logs()
+                next_log = time.monotonic() + self.args.log_interval
+            jitter = self.args.sync_interval * 0.1
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=self.args.sync_interval + random.uniform(-jitter, jitter))
+            except asyncio.TimeoutError:
+                pass
+
+
+# =====================================================================
+# PREGĂTIREA DATELOR (--seed)
+# =====================================================================
+
+def seed_account(email: str, password: str, media_items: int) -> int:
+    """Creează contul de test și un playlist cu conținut web direct în baza de date serverului"""
+    from app import auth, models
+    from app.database import SessionLocal, engine
+
+    models.Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        user = db.query(models.User).filter(models.User.email == email).first()
+        if user is None:
+            user = models.User(
+                email=email,
+                username=email.split("@")[0],
+                password_hash=auth.get_password_hash(password),
+                is_verified=True,
+            )
+            db.add(user)
+            db.commit()
+            db.refresh(user)
+
+        playlist = models.Playlist(name=f"Loadtest {datetime.now(timezone.utc):%Y-%m-%d %H:%M:%S}", created_by_id=user.id)
+        db.add(playlist)
+        db.flush()
+        for order in range(media_items):
+            url = f"https://example.com/loadtest/{order}"
+            media = models.MediaFile(
+                filename=f"loadtest-{order}",
+                path=f"web://{url}",
+                type="web/html",
+                size=0,
+                uploaded_by_id=user.id,
+                web_url=url,
+                web_refresh_interval=30,
+            )
+            db.add(media)
+            db.flush()
+            db.add(models.PlaylistItem(playlist_id=playlist.id, mediafile_id=media.id, order=order, duration=10))
+        db.commit()
+        print(f"INFO: Cont de test {email} pregătit, playlist {playlist.id} cu {media_items} itemi")
+        return playlist.id
+    finally:
+        db.close()
+
+
+def login(args) -> dict:
+    parsed = urlparse(args.base_url)
+    conn_class = http.client.HTTPSConnection if parsed.scheme == "https" else http.client.HTTPConnection
+    conn = conn_class(parsed.hostname, parsed.port or (443 if parsed.scheme == "https" else 80), timeout=args.timeout)
+    try:
+        conn.request("POST", "/api/auth/login", body=urlencode({"username": args.email, "password": args.password}),
+                     headers={"Content-Type": "application/x-www-form-urlencoded"})
+        response = conn.getresponse()
+        payload = response.read()
+        if response.status != 200:
+            raise SystemExit(f"EROARE: Autentificarea a eșuat ({response.status}): {payload.decode(errors='replace')}")
+        return {"Authorization": f"Bearer {json.loads(payload)['access_token']}"}
+    finally:
+        conn.close()
+
+
+def query_stats_request(args, method: str) -> Optional[dict]:
+    """Citește / resetează statisticile de interogări ale serverului (dacă sunt active)"""
+    parsed = urlparse(args.base_url)
+    conn_class = http.client.HTTPSConnection if parsed.scheme == "https" else http.client.HTTPConnection
+    conn = conn_class(parsed.hostname, parsed.port or (443 if parsed.scheme == "https" else 80), timeout=args.timeout)
+    try:
+        conn.request(method, "/api/debug/query-stats")
+        response = conn.getresponse()
+        payload = response.read()
+        if response.status == 200:
+            return json.loads(payload)
+        return None
+    except OSError:
+        return None
+    finally:
+        conn.close()
+
+
+# =====================================================================
+# RAPORT
+# =====================================================================
+
+def normalize_server_endpoint(endpoint: str) -> str:
+    method, _, path = endpoint.partition(" ")
+    path = path.replace("/api", "", 1)
+    path = path.replace("{screen_id}", "{id}")
+    return f"{method} {path}"
+
+
+def build_report(metrics: Metrics, server_stats: Optional[dict], args, phases: dict) -> dict:
+    server_by_endpoint = {}
+    if server_stats:
+        for entry in server_stats.get("endpoints", []):
+            server_by_endpoint[normalize_server_endpoint(entry["endpoint"])] = entry
+
+    endpoints = []
+    for name, stats in sorted(metrics.endpoints.items()):
+        latencies = sorted(stats.latencies)
+        window = (stats.last_end - stats.first_start) if stats.first_start is not None else 0
+        errors = sum(count for status, count in stats.statuses.items() if is_error(status))
+        server_entry = server_by_endpoint.get(name)
+        endpoints.append({
+            "endpoint": name,
+            "requests": len(latencies),
+            "errors": errors,
+            "statuses": dict(stats.statuses),
+            "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+            "max_ms": round((latencies[-1] if latencies else 0) * 1000, 2),
+            "throughput_rps": round(len(latencies) / window, 2) if window > 0 else None,
+            "db_queries_per_request": server_entry["queries_per_request"] if server_entry else None,
+            "db_max_queries": server_entry["max_queries"] if server_entry else None,
+        })
+
+    queue_waits = sorted(metrics.queue_waits)
+    return {
+        "screens": args.screens,
+        "paired_screens": phases["paired"],
+        "setup_seconds": round(phases["setup_seconds"], 2),
+        "steady_seconds": round(phases["steady_seconds"], 2),
+        "ws_messages_received": metrics.ws_messages,
+        "ws_reconnects": metrics.ws_reconnects,
+        "harness_queue_wait_p99_ms": round(percentile(queue_waits, 99) * 1000, 2),
+        "db_background_queries": server_stats.get("background_queries") if server_stats else None,
+        "endpoints": endpoints,
+    }
+
+
+def print_report(report: dict):
+    print()
+    print("=" * 118)
+    print(f"Ecrane: {report['paired_screens']}/{report['screens']} împerecheate | "
+          f"setup {report['setup_seconds']}s | regim stabil {report['steady_seconds']}s | "
+          f"mesaje WS primite {report['ws_messages_received']} | reconectări WS {report['ws_reconnects']}")
+    print("-" * 118)
+    print(f"{'Endpoint':<40}{'Req':>8}{'Erori':>7}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}{'req/s':>9}{'SQL/req':>9}{'SQL max':>9}  Status")
+    for entry in report["endpoints"]:
+        statuses = ", ".join(f"{status}:{count}" for status, count in sorted(entry["statuses"].items()))
+        print(f"{entry['endpoint']:<40}{entry['requests']:>8}{entry['errors']:>7}{entry['p50_ms']:>10}"
+              f"{entry['p99_ms']:>10}{entry['max_ms']:>10}{str(entry['throughput_rps'] or '-'):>9}"
+              f"{str(entry['db_queries_per_request'] if entry['db_queries_per_request'] is not None else '-'):>9}"
+              f"{str(entry['db_max_queries'] if entry['db_max_queries'] is not None else '-'):>9}  {statuses}")
+    print("-" * 118)
+    if report["db_background_queries"] is not None:
+        print(f"Interogări SQL în afara request-urilor HTTP (WebSocket, flush-uri): {report['db_background_queries']}")
+    else:
+        print("Statisticile SQL nu sunt disponibile (porniți serverul cu QUERY_STATS_ENABLED=1)")
+    if report["harness_queue_wait_p99_ms"] > 50:
+        print(f"ATENȚIE: p99 de așteptare în harness este {report['harness_queue_wait_p99_ms']} ms - "
+              f"măriți --http-workers, altfel latențele măsurate sunt limitate de simulator")
+    print("=" * 118)
+
+
+# =====================================================================
+# MAIN
+# =====================================================================
+
+async def run_fleet(args) -> dict:
+    playlist_id = args.playlist_id
+    if args.seed:
+        playlist_id = seed_account(args.email, args.password, args.media_items)
+    auth_headers = login(args)
+    query_stats_request(args, "DELETE")
+
+    metrics = Metrics()
+    pool = ThreadPoolExecutor(max_workers=args.http_workers)
+    run_tag = "".join(random.choices(string.ascii_uppercase, k=2))
+    players = [VirtualPlayer(i, args, metrics, pool) for i in range(args.screens)]
+
+    # Faza 1: înregistrare + împerechere, cu concurență limitată (ca la o instalare în masă)
+    setup_started = time.perf_counter()
+    semaphore = asyncio.Semaphore(args.ramp_concurrency)
+
+    async def setup(player: VirtualPlayer) -> bool:
+        async with semaphore:
+            return await player.register_and_pair(f"{run_tag}{player.index:04d}", auth_headers, playlist_id)
+
+    results = await asyncio.gather(*(setup(p) for p in players))
+    paired = [p for p, ok in zip(players, results) if ok]
+    setup_seconds = time.perf_counter() - setup_started
+    print(f"INFO: {len(paired)}/{len(players)} ecrane împerecheate în {setup_seconds:.1f}s")
+
+    # Faza 2: regim stabil - WebSocket deschis + sync + loguri
+    stop = asyncio.Event()
+    steady_started = time.perf_counter()
+    tasks = []
+    for player in paired:
+        tasks.append(asyncio.create_task(player.hold_websocket(stop)))
+        tasks.append(asyncio.create_task(player.run(stop)))
+    await asyncio.sleep(args.duration)
+    stop.set()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    steady_seconds = time.perf_counter() - steady_started
+
+    # Lăsăm serverul să-și golească buffer-ele înainte de a citi statisticile
+    await asyncio.sleep(1)
+    server_stats = query_stats_request(args, "GET")
+
+    if args.cleanup:
+        for player in paired:
+            await player.request("DELETE", f"/api/screens/{player.screen_id}", "DELETE /screens/{id}",
+                                 headers=auth_headers)
+
+    for player in players:
+        player.close()
+    pool.shutdown(wait=True)
+
+    return build_report(metrics, server_stats, args,
+                        {"paired": len(paired), "setup_seconds": setup_seconds, "steady_seconds": steady_seconds})
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Simulator de flotă pentru backend-ul de signage")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--screens", type=int, default=100, help="Număr de player-e virtuale")
+    parser.add_argument("--duration", type=float, default=60, help="Durata regimului stabil (secunde)")
+    parser.add_argument("--sync-interval", type=float, default=30, help="Interval între două /client/sync (secunde)")
+    parser.add_argument("--log-interval", type=float, default=60, help="Interval între două trimiteri de loguri (secunde)")
+    parser.add_argument("--log-batch", type=int, default=10, help="Loguri de redare per trimitere")
+    parser.add_argument("--ramp-concurrency", type=int, default=20, help="Împerecheri simultane în faza de setup")
+    parser.add_argument("--http-workers", type=int, default=64, help="Thread-uri pentru request-urile HTTP")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--reconnect-delay", type=float, default=5)
+    parser.add_argument("--email", required=True, help="Contul în care sunt împerecheate ecranele")
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--seed", action="store_true", help="Creează contul și un playlist de test în baza de date")
+    parser.add_argument("--media-items", type=int, default=5, help="Itemi în playlist-ul creat cu --seed")
+    parser.add_argument("--playlist-id", type=int, default=None, help="Playlist existent asignat ecranelor (fără --seed)")
+    parser.add_argument("--cleanup", action="store_true", help="Șterge ecranele create la final")
+    parser.add_argument("--json-out", default=None, help="Salvează raportul și în format JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = asyncio.run(run_fleet(args))
+    print_report(report)
+    if args.json_out:
+        with open(args.json_out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"INFO: Raport salvat în {args.json_out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Teste pentru ordinea fair share a cozii de procesare video
+(fair_share_order, limitele per utilizator și queue_estimates)
+"""
+
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+# Adaugă path-ul pentru a importa modulele
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from app import models  # noqa: E402
+from app.models import JobStatus  # noqa: E402
+from app.services import job_queue  # noqa: E402
+from app.services.job_queue import QueuedJob, fair_share_order  # noqa: E402
+
+A, B = 1, 2
+BASE = datetime(2026, 10, 12, 8, 0, tzinfo=timezone.utc)
+SMALL = 1024
+BIG = job_queue.TRANSCODE_SMALL_FILE_BYTES * 2
+
+
+def queued(job_id: int, owner_id, size_bytes: int = SMALL) -> QueuedJob:
+    # run_after crește cu id-ul: în coada unui utilizator, ordinea FIFO urmează id-ul
+    return QueuedJob(job_id, job_id, owner_id, size_bytes, BASE + timedelta(seconds=job_id))
+
+
+@pytest.mark.parametrize("jobs, running, last_started, weights, expected", [
+    # Ponderi egale: round-robin, chiar dacă A are mai multe job-uri în coadă
+    ([queued(1, A), queued(2, A), queued(3, A), queued(11, B)], {}, {}, {A: 1, B: 1}, [1, 11, 2, 3]),
+    # Ponderea 0 sau lipsă este tratată ca 1
+    ([queued(1, A), queued(2, A), queued(11, B), queued(12, B)], {}, {}, {A: 0, B: None}, [1, 11, 2, 12]),
+    ([queued(1, A), queued(2, A), queued(11, B), queued(12, B)], {}, {}, {}, [1, 11, 2, 12]),
+    # Ponderea 2: fiecare job ales crește încărcarea lui A doar cu 1/2
+    ([queued(1, A), queued(2, A), queued(3, A), queued(4, A), queued(11, B), queued(12, B)],
+     {}, {}, {A: 2, B: 1}, [1, 11, 2, 12, 3, 4]),
+    # Job-urile în curs contează: B recuperează până la egalitate, apoi A (servit mai demult)
+    ([queued(1, A), queued(2, A), queued(11, B), queued(12, B), queued(13, B)],
+     {A: 2}, {}, {A: 1, B: 1}, [11, 12, 1, 13, 2]),
+    # La încărcare egală, primul este utilizatorul servit cel mai demult
+    ([queued(1, A), queued(11, B)], {}, {A: BASE, B: BASE - timedelta(hours=1)}, {A: 1, B: 1}, [11, 1]),
+    # În coada aceluiași utilizator, fișierele mici trec înaintea celor mari
+    ([queued(1, A, BIG), queued(2, A, SMALL)], {}, {}, {A: 1}, [2, 1]),
+    # Job-urile fără proprietar formează propria coadă
+    ([queued(1, None), queued(2, None), queued(11, B)], {}, {}, {B: 1}, [1, 11, 2]),
+    ([], {}, {}, {}, []),
+])
+def test_fair_share_order(jobs, running, last_started, weights, expected):
+    order = fair_share_order(jobs, running, last_started, weights)
+    assert [job.id for job in order] == expected
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    models.Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+
+def add_user(db, user_id: int, weight: int = 1, cap=None):
+    db.add(models.User(id=user_id, email=f"user{user_id}@test.ro", password_hash="x",
+                       encode_weight=weight, max_concurrent_encodes=cap))
+
+
+def add_job(db, media_file_id: int, owner_id, status=JobStatus.QUEUED, **fields):
+    now = datetime.now(timezone.utc)
+    if status == JobStatus.RUNNING:
+        fields.setdefault("lease_expires_at", now + timedelta(minutes=5))
+        fields.setdefault("started_at", now)
+    db.add(models.TranscodeJob(media_file_id=media_file_id, owner_id=owner_id, status=status,
+                               size_bytes=SMALL, run_after=now - timedelta(minutes=1) + timedelta(seconds=media_file_id),
+                               **fields))
+
+
+@pytest.mark.parametrize("cap, running, claimable", [
+    (None, 3, True),   # fără limită
+    (1, 0, True),
+    (1, 1, False),     # limita atinsă: job-urile lui A așteaptă
+    (2, 1, True),
+    (0, 0, False),     # limita 0 oprește procesarea pentru utilizator
+])
+def test_claim_candidates_respects_user_cap(db, cap, running, claimable):
+    add_user(db, A, cap=cap)
+    add_user(db, B)
+    for media_file_id in range(running):
+        add_job(db, 100 + media_file_id, A, JobStatus.RUNNING)
+    add_job(db, 1, A)
+    add_job(db, 11, B)
+    db.commit()
+
+    candidates = job_queue._claim_candidates(db, datetime.now(timezone.utc))
+    owners = [db.get(models.TranscodeJob, job_id).owner_id for job_id in candidates]
+    assert (A in owners) == claimable
+    assert B in owners
+
+
+@pytest.mark.parametrize("weights, caps, expected_positions", [
+    ({A: 1, B: 1}, {}, {1: 1, 11: 2, 2: 3, 12: 4, 3: 5}),
+    # Ponderea 0 este tratată ca 1
+    ({A: 0, B: 1}, {}, {1: 1, 11: 2, 2: 3, 12: 4, 3: 5}),
+    # Limitele per utilizator sunt ignorate în estimare
+    ({A: 1, B: 1}, {A: 0}, {1: 1, 11: 2, 2: 3, 12: 4, 3: 5}),
+    ({A: 3, B: 1}, {}, {1: 1, 11: 2, 2: 3, 3: 4, 12: 5}),
+    ({A: 1, B: 2}, {}, {1: 1, 11: 2, 12: 3, 2: 4, 3: 5}),
+])
+def test_queue_estimates_positions(db, weights, caps, expected_positions):
+    for user_id in (A, B):
+        add_user(db, user_id, weight=weights[user_id], cap=caps.get(user_id))
+    for media_file_id in (1, 2, 3):
+        add_job(db, media_file_id, A)
+    for media_file_id in (11, 12):
+        add_job(db, media_file_id, B)
+    db.commit()
+
+    estimates = job_queue.queue_estimates(db, expected_positions)
+    assert {media_file_id: position for media_file_id, (position, _) in estimates.items()} == expected_positions
+
+
+@pytest.mark.parametrize("done_seconds, running, expected_offsets", [
+    # Fără istoric și fără job-uri în curs: un slot, TRANSCODE_DEFAULT_JOB_SECONDS per job
+    ([], 0, [0, 120, 240]),
+    # Durata medie a job-urilor terminate; cu un job în curs, primul loc se eliberează la jumătate
+    ([40, 80], 1, [30, 90, 150]),
+    # Două job-uri în curs: două sloturi, job-urile pornesc câte două
+    ([60], 2, [30, 30, 90]),
+])
+def test_queue_estimates_start_times(db, done_seconds, running, expected_offsets):
+    add_user(db, A)
+    now = datetime.now(timezone.utc)
+    for index, seconds in enumerate(done_seconds):
+        add_job(db, 200 + index, A, JobStatus.DONE, started_at=now - timedelta(hours=1),
+                finished_at=now - timedelta(hours=1) + timedelta(seconds=seconds))
+    for index in range(running):
+        add_job(db, 300 + index, A, JobStatus.RUNNING)
+    for media_file_id in (1, 2, 3):
+        add_job(db, media_file_id, A)
+    db.commit()
+
+    before = datetime.now(timezone.utc)
+    estimates = job_queue.queue_estimates(db, [1, 2, 3])
+    for media_file_id, expected in zip((1, 2, 3), expected_offsets):
+        _, start_at = estimates[media_file_id]
+        assert start_at - before == pytest.approx(timedelta(seconds=expected), abs=timedelta(seconds=2))
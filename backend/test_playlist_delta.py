@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Teste pentru sincronizarea delta a playlist-urilor (compute_playlist_delta)
+"""
+
+import os
+import sys
+
+import pytest
+
+# Adaugă path-ul pentru a importa modulele
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.playlist_history import compute_playlist_delta, item_keys  # noqa: E402
+
+
+def item(name: str, duration: int = 10, sha256: str = "h", refresh=None) -> dict:
+    return {"url": f"https://cdn/{name}", "type": "video/mp4", "duration": duration,
+            "web_refresh_interval": refresh, "sha256": sha256, "size": 100}
+
+
+def key(name: str, occurrence: int = 0) -> str:
+    return f"https://cdn/{name}#{occurrence}"
+
+
+def apply_delta(old_items, delta):
+    """Aplică delta ca player-ul: elimină, rearanjează, inserează, actualizează duratele"""
+    items = dict(zip(item_keys(old_items), old_items))
+    for removed in delta["removed"]:
+        del items[removed]
+    order = delta["reordered"] or list(items)
+    result = [(k, dict(items[k])) for k in order]
+    for added in sorted(delta["added"], key=lambda a: a["index"]):
+        result.insert(added["index"], (added["key"], added["item"]))
+    retimed = {r["key"]: r for r in delta["retimed"]}
+    for k, value in result:
+        if k in retimed:
+            value["duration"] = retimed[k]["duration"]
+            value["web_refresh_interval"] = retimed[k]["web_refresh_interval"]
+    return [value for _, value in result]
+
+
+CASES = [
+    # nume, revizia veche, revizia nouă, removed, chei added, reordered, chei retimed
+    ("neschimbat", [item("a"), item("b")], [item("a"), item("b")], [], [], None, []),
+    ("doar rearanjare", [item("a"), item("b"), item("c")], [item("c"), item("a"), item("b")],
+     [], [], [key("c"), key("a"), key("b")], []),
+    # Eliminarea nu schimbă ordinea relativă a celor rămași: fără `reordered`
+    ("doar eliminare", [item("a"), item("b"), item("c")], [item("a"), item("c")],
+     [key("b")], [], None, []),
+    ("eliminare + rearanjare", [item("a"), item("b"), item("c")], [item("c"), item("a")],
+     [key("b")], [], [key("c"), key("a")], []),
+    ("adăugare la mijloc", [item("a"), item("c")], [item("a"), item("b"), item("c")],
+     [], [key("b")], None, []),
+    # Aparițiile repetate ale aceluiași URL: dispare ultima apariție, nu prima
+    ("duplicat eliminat", [item("a"), item("b"), item("a")], [item("a"), item("b")],
+     [key("a", 1)], [], None, []),
+    ("duplicat adăugat", [item("a"), item("b")], [item("a"), item("a"), item("b")],
+     [], [key("a", 1)], None, []),
+    # Conținut schimbat (alt hash): eliminat + adăugat, ca player-ul să-l descarce din nou
+    ("conținut schimbat", [item("a"), item("b")], [item("a"), item("b", sha256="nou")],
+     [key("b")], [key("b")], None, []),
+    ("durată schimbată", [item("a"), item("b")], [item("a", duration=20), item("b")],
+     [], [], None, [key("a")]),
+    ("refresh schimbat", [item("a")], [item("a", refresh=60)], [], [], None, [key("a")]),
+    ("golit", [item("a"), item("b")], [], [key("a"), key("b")], [], None, []),
+]
+
+
+@pytest.mark.parametrize("old, new, removed, added, reordered, retimed",
+                         [case[1:] for case in CASES], ids=[case[0] for case in CASES])
+def test_compute_playlist_delta(old, new, removed, added, reordered, retimed):
+    delta = compute_playlist_delta(old, new)
+    assert delta["removed"] == removed
+    assert [a["key"] for a in delta["added"]] == added
+    assert delta["reordered"] == reordered
+    assert [r["key"] for r in delta["retimed"]] == retimed
+    # Delta aplicată pe revizia veche reface exact revizia nouă
+    assert apply_delta(old, delta) == new
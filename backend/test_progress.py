@@ -14,7 +14,7 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 def test_progress():
     """Test simplu pentru progress tracking"""
     try:
-        from app.routers.media_router import parse_ffmpeg_stderr
+        from app.services.video_pipeline import parse_ffmpeg_stderr
         
         # Test parse_ffmpeg_stderr cu linii reale de FFmpeg
         test_lines = [
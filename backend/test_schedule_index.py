@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Teste pentru indexul de programări al ecranelor (build_schedule_index)
+"""
+
+import os
+import sys
+from datetime import datetime, time, timedelta, timezone
+from types import SimpleNamespace
+from zoneinfo import ZoneInfo
+
+import pytest
+
+# Adaugă path-ul pentru a importa modulele
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from app.services.schedule_resolver import ALL_DAYS, build_schedule_index  # noqa: E402
+
+UTC = ZoneInfo("UTC")
+# Luni; orizontul acoperă o singură zi
+DAY = datetime(2026, 10, 12, tzinfo=timezone.utc)
+DEFAULT = 9
+
+
+def at(hour: int) -> datetime:
+    return DAY + timedelta(hours=hour)
+
+
+def playlist(playlist_id: int, schedule_start=None, schedule_end=None):
+    return SimpleNamespace(id=playlist_id, schedule_start=schedule_start, schedule_end=schedule_end)
+
+
+def entry(entry_id: int, playlist_id: int, start: int, end: int, priority: int = 0,
+          valid_from=None, valid_until=None, days_of_week: int = ALL_DAYS, **playlist_window):
+    return SimpleNamespace(id=entry_id, playlist_id=playlist_id, playlist=playlist(playlist_id, **playlist_window),
+                           start_time=time(start), end_time=time(end), priority=priority,
+                           valid_from=valid_from, valid_until=valid_until, days_of_week=days_of_week)
+
+
+CASES = [
+    # nume, programări, playlist implicit, segmente așteptate (ora început, ora sfârșit, playlist)
+    ("fără programări", [], None, [(0, 24, None)]),
+    ("doar playlist implicit", [], DEFAULT, [(0, 24, DEFAULT)]),
+    ("programare peste implicit", [entry(1, 1, 8, 12)], DEFAULT,
+     [(0, 8, DEFAULT), (8, 12, 1), (12, 24, DEFAULT)]),
+    # Suprapunere: câștigă prioritatea mai mare, oricare ar fi ordinea
+    ("suprapunere, prioritate", [entry(1, 1, 8, 12, priority=5), entry(2, 2, 10, 14)], None,
+     [(0, 8, None), (8, 12, 1), (12, 14, 2), (14, 24, None)]),
+    # Suprapunere la prioritate egală: câștigă programarea cea mai nouă (id mai mare)
+    ("suprapunere, egalitate", [entry(1, 1, 8, 12), entry(2, 2, 10, 14)], None,
+     [(0, 8, None), (8, 10, 1), (10, 14, 2), (14, 24, None)]),
+    ("suprapunere, egalitate inversă", [entry(2, 1, 8, 12), entry(1, 2, 10, 14)], None,
+     [(0, 8, None), (8, 12, 1), (12, 14, 2), (14, 24, None)]),
+    # Interval inclus complet în altul cu prioritate mai mare: nu apare
+    ("inclus, prioritate mai mică", [entry(1, 1, 8, 16, priority=1), entry(2, 2, 10, 12)], None,
+     [(0, 8, None), (8, 16, 1), (16, 24, None)]),
+    # Intervale adiacente cu același playlist sunt unite într-un singur segment
+    ("adiacente, același playlist", [entry(1, 1, 8, 10), entry(2, 1, 10, 12)], None,
+     [(0, 8, None), (8, 12, 1), (12, 24, None)]),
+    # Peste miezul nopții: începutul zilei vine din programarea de ieri
+    ("peste miezul nopții", [entry(1, 1, 22, 6)], None, [(0, 6, 1), (6, 22, None), (22, 24, 1)]),
+    # Ora de start egală cu ora de sfârșit înseamnă 24 de ore, nu un interval gol
+    ("start == sfârșit", [entry(1, 1, 8, 8)], DEFAULT, [(0, 24, 1)]),
+    # Intervale de lungime zero după tăiere: ignorate
+    ("valid_from == valid_until", [entry(1, 1, 8, 12, valid_from=at(10), valid_until=at(10))], DEFAULT,
+     [(0, 24, DEFAULT)]),
+    ("fereastră playlist goală", [entry(1, 1, 8, 12, schedule_start=at(9), schedule_end=at(9))], DEFAULT,
+     [(0, 24, DEFAULT)]),
+    ("valabilitate expirată", [entry(1, 1, 8, 12, valid_until=at(8))], DEFAULT, [(0, 24, DEFAULT)]),
+    ("zi exclusă", [entry(1, 1, 8, 12, days_of_week=ALL_DAYS & ~1)], DEFAULT, [(0, 24, DEFAULT)]),
+    # Fereastra playlist-ului taie programarea
+    ("tăiat de fereastra playlist-ului", [entry(1, 1, 8, 12, schedule_start=at(10))], DEFAULT,
+     [(0, 10, DEFAULT), (10, 12, 1), (12, 24, DEFAULT)]),
+]
+
+
+@pytest.mark.parametrize("entries, default_playlist_id, expected",
+                         [case[1:] for case in CASES], ids=[case[0] for case in CASES])
+def test_build_schedule_index(entries, default_playlist_id, expected):
+    default_playlist = playlist(default_playlist_id) if default_playlist_id is not None else None
+    index = build_schedule_index(entries, default_playlist, at(0), at(24), UTC)
+    assert index.segments(at(0), at(24)) == [(at(start), at(end), playlist_id) for start, end, playlist_id in expected]
+    for start, end, playlist_id in expected:
+        assert index.lookup(at(start)) == playlist_id
+        assert index.lookup(at(end) - timedelta(seconds=1)) == playlist_id
+
+
+@pytest.mark.parametrize("schedule_start, schedule_end", [
+    (at(20), None),
+    (None, at(4)),
+    (at(30), at(40)),  # fereastra este complet în afara orizontului
+])
+def test_default_playlist_ignores_its_schedule_window(schedule_start, schedule_end):
+    """Fereastra schedule_start/end limitează doar programările, nu playlist-ul asignat direct"""
+    index = build_schedule_index([], playlist(DEFAULT, schedule_start, schedule_end), at(0), at(24), UTC)
+    assert index.segments(at(0), at(24)) == [(at(0), at(24), DEFAULT)]
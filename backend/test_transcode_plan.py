@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Teste pentru alegerea prelucrării unui video încărcat (plan_transcode, has_faststart)
+"""
+
+import os
+import struct
+import sys
+
+import pytest
+
+# Adaugă path-ul pentru a importa modulele
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.transcode_plan import (  # noqa: E402
+    ACTION_AUDIO, ACTION_NONE, ACTION_REMUX, ACTION_TRANSCODE, has_faststart, plan_transcode, stream_maps,
+)
+
+MP4_FORMAT = "mov,mp4,m4a,3gp,3g2,mj2"
+
+
+def box(box_type: bytes, payload: bytes = b"\0" * 8) -> bytes:
+    return struct.pack(">I4s", len(payload) + 8, box_type) + payload
+
+
+def large_box(box_type: bytes, payload: bytes = b"\0" * 8) -> bytes:
+    """Atom cu dimensiune pe 64 de biți (size == 1)"""
+    return struct.pack(">I4sQ", 1, box_type, len(payload) + 16) + payload
+
+
+def write_mp4(tmp_path, *boxes: bytes) -> str:
+    path = tmp_path / "video.mp4"
+    path.write_bytes(b"".join(boxes))
+    return str(path)
+
+
+def video(**fields) -> dict:
+    stream = {"codec_type": "video", "codec_name": "h264", "profile": "High", "level": 40,
+              "pix_fmt": "yuv420p", "field_order": "progressive"}
+    stream.update(fields)
+    return stream
+
+
+def audio(codec_name: str = "aac") -> dict:
+    return {"codec_type": "audio", "codec_name": codec_name}
+
+
+def probe(*streams: dict, format_name: str = MP4_FORMAT) -> dict:
+    return {"streams": list(streams), "format": {"format_name": format_name}}
+
+
+CASES = [
+    # nume, probe, faststart, acțiune, motiv
+    ("compatibil", probe(video(), audio()), True, ACTION_NONE, "deja compatibil"),
+    ("fără audio", probe(video()), True, ACTION_NONE, "deja compatibil"),
+    ("nivel 4.2 (limita)", probe(video(level=42), audio()), True, ACTION_NONE, "deja compatibil"),
+    ("nivel peste 4.2", probe(video(level=51), audio()), True, ACTION_TRANSCODE, "nivel H.264 5.1"),
+    # Problema video câștigă în fața celor ieftine (container, faststart)
+    ("nivel peste 4.2 în mkv", probe(video(level=50), format_name="matroska,webm"), False,
+     ACTION_TRANSCODE, "nivel H.264 5.0"),
+    ("fără faststart", probe(video(), audio()), False, ACTION_REMUX, "fără faststart"),
+    ("container mkv", probe(video(), audio(), format_name="matroska,webm"), True,
+     ACTION_REMUX, "container matroska,webm"),
+    ("stream-uri suplimentare", probe(video(), audio(), audio()), True, ACTION_REMUX, "stream-uri suplimentare"),
+    ("audio mp3", probe(video(), audio("mp3")), False, ACTION_AUDIO, "codec audio mp3"),
+    ("codec hevc", probe(video(codec_name="hevc"), audio()), True, ACTION_TRANSCODE, "codec video hevc"),
+    ("profil High 10", probe(video(profile="High 10"), audio()), True, ACTION_TRANSCODE, "profil H.264 high 10"),
+    ("pixeli 4:2:2", probe(video(pix_fmt="yuv422p"), audio()), True, ACTION_TRANSCODE, "format pixeli yuv422p"),
+    ("interlaced", probe(video(field_order="tt"), audio()), True, ACTION_TRANSCODE, "video întrețesut (interlaced)"),
+    # Coperta (attached_pic) nu este considerată stream video
+    ("doar copertă", probe({**video(), "disposition": {"attached_pic": 1}}, audio()), True,
+     ACTION_TRANSCODE, "nu există stream video"),
+    ("ffprobe eșuat", None, True, ACTION_TRANSCODE, "ffprobe indisponibil"),
+]
+
+
+@pytest.mark.parametrize("probe_result, faststart, action, reason",
+                         [case[1:] for case in CASES], ids=[case[0] for case in CASES])
+def test_plan_transcode(tmp_path, probe_result, faststart, action, reason):
+    if faststart:
+        path = write_mp4(tmp_path, box(b"ftyp"), box(b"moov"), box(b"mdat"))
+    else:
+        path = write_mp4(tmp_path, box(b"ftyp"), box(b"mdat"), box(b"moov"))
+    plan = plan_transcode(probe_result, path)
+    assert (plan.action, plan.reason) == (action, reason)
+
+
+COVER = {**video(codec_name="mjpeg"), "disposition": {"attached_pic": 1}}
+
+
+@pytest.mark.parametrize("probe_result, action, maps", [
+    (probe(video(), audio(), format_name="matroska,webm"), ACTION_REMUX, ["-map", "0:0", "-map", "0:1"]),
+    (probe(video(), format_name="matroska,webm"), ACTION_REMUX, ["-map", "0:0"]),
+    # Coperta este primul stream: se copiază stream-ul video evaluat, nu `0:v:0`
+    (probe(COVER, video(), audio()), ACTION_REMUX, ["-map", "0:1", "-map", "0:2"]),
+    (probe(audio("mp3"), COVER, video()), ACTION_AUDIO, ["-map", "0:2", "-map", "0:0"]),
+    # Indexurile din ffprobe au prioritate față de poziția în listă
+    (probe({**video(), "index": 3}, {**audio(), "index": 5}, format_name="matroska,webm"), ACTION_REMUX,
+     ["-map", "0:3", "-map", "0:5"]),
+])
+def test_stream_maps(tmp_path, probe_result, action, maps):
+    plan = plan_transcode(probe_result, write_mp4(tmp_path, box(b"ftyp"), box(b"mdat"), box(b"moov")))
+    assert plan.action == action
+    assert stream_maps(plan) == maps
+
+
+@pytest.mark.parametrize("boxes, expected", [
+    ([box(b"ftyp"), box(b"moov"), box(b"mdat")], True),
+    ([box(b"ftyp"), box(b"mdat"), box(b"moov")], False),
+    ([box(b"ftyp"), box(b"free"), box(b"moov"), box(b"mdat")], True),
+    # Atom mare (size == 1) înaintea lui moov
+    ([box(b"ftyp"), large_box(b"free"), box(b"moov")], True),
+    ([box(b"ftyp"), large_box(b"mdat"), box(b"moov")], False),
+    # size == 0: ultimul atom, moov nu mai poate urma
+    ([box(b"ftyp"), struct.pack(">I4s", 0, b"free")], False),
+    ([box(b"ftyp")], False),
+    ([b"\0\0"], False),
+])
+def test_has_faststart(tmp_path, boxes, expected):
+    assert has_faststart(write_mp4(tmp_path, *boxes)) == expected
+
+
+def test_has_faststart_missing_file(tmp_path):
+    assert has_faststart(str(tmp_path / "lipsa.mp4")) is False
@@ -1,16 +1,19 @@
 // Cale fișier: src/components/VideoProcessingProgress.jsx
 
-import React, { useEffect, useState } from 'react';
+import React, { useEffect, useRef, useState } from 'react';
 import { Progress } from './ui/progress';
 import { useAuth } from '../contexts/AuthContext';
+import { subscribeToMediaProgress } from '../lib/progressSocket';
 
 const VideoProcessingProgress = ({ mediaFile, onProcessingComplete }) => {
   const [progress, setProgress] = useState(mediaFile?.processing_progress || 0);
   const [eta, setEta] = useState(mediaFile?.processing_eta);
   const [speed, setSpeed] = useState(mediaFile?.processing_speed);
   const [processingStatus, setProcessingStatus] = useState(mediaFile?.processing_status);
-  const [ws, setWs] = useState(null);
   const { user } = useAuth();
+  // Părintele trimite de obicei o funcție nouă la fiecare render; nu vrem să refacem abonarea
+  const onCompleteRef = useRef(onProcessingComplete);
+  onCompleteRef.current = onProcessingComplete;
 
   // Formatare timp ETA
   const formatETA = (seconds) => {
@@ -29,74 +32,26 @@ const VideoProcessingProgress = ({ mediaFile, onProcessingComplete }) => {
     }
   };
 
-  // Configurare WebSocket pentru progress updates
+  // Abonare la progress updates prin conexiunea WebSocket partajată a tab-ului
   useEffect(() => {
     if (!user?.id || processingStatus === 'COMPLETED' || processingStatus === 'FAILED') {
       return;
     }
 
-    const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
-    const host = window.location.host;
-    const wsUrl = `${protocol}//${host}/api/media/progress/${user.id}`;
-    
-    console.log('Conectez la WebSocket pentru progress updates:', wsUrl);
-    
-    const websocket = new WebSocket(wsUrl);
-    
-    websocket.onopen = () => {
-      console.log('WebSocket conectat pentru progress updates');
-      setWs(websocket);
-    };
-    
-    websocket.onmessage = (event) => {
-      try {
-        const message = JSON.parse(event.data);
-        if (message.type === 'media_progress' && message.data.id === mediaFile.id) {
-          const data = message.data;
-          
-          setProgress(data.processing_progress);
-          setEta(data.processing_eta);
-          setSpeed(data.processing_speed);
-          setProcessingStatus(data.processing_status);
-          
-          console.log(`Progress update pentru ${data.filename}: ${data.processing_progress}%`);
-          
-          // Notifică componenta părinte când procesarea e completă
-          if (data.processing_status === 'COMPLETED' || data.processing_status === 'FAILED') {
-            if (onProcessingComplete) {
-              onProcessingComplete(data);
-            }
-          }
-        }
-      } catch (error) {
-        console.error('Eroare la parsarea mesajului WebSocket:', error);
-      }
-    };
-    
-    websocket.onclose = () => {
-      console.log('WebSocket închis');
-      setWs(null);
-    };
-    
-    websocket.onerror = (error) => {
-      console.error('Eroare WebSocket:', error);
-    };
-    
-    return () => {
-      if (websocket.readyState === WebSocket.OPEN) {
-        websocket.close();
-      }
-    };
-  }, [user?.id, mediaFile.id, processingStatus, onProcessingComplete]);
+    return subscribeToMediaProgress(user.id, mediaFile.id, (data) => {
+      setProgress(data.processing_progress);
+      setEta(data.processing_eta);
+      setSpeed(data.processing_speed);
+      setProcessingStatus(data.processing_status);
 
-  // Cleanup WebSocket când componenta se demontează
-  useEffect(() => {
-    return () => {
-      if (ws) {
-        ws.close();
+      // Notifică componenta părinte când procesarea e completă
+      if (data.processing_status === 'COMPLETED' || data.processing_status === 'FAILED') {
+        if (onCompleteRef.current) {
+          onCompleteRef.current(data);
+        }
       }
-    };
-  }, [ws]);
+    });
+  }, [user?.id, mediaFile.id, processingStatus]);
 
   if (processingStatus === 'COMPLETED') {
     return (
@@ -0,0 +1,104 @@
+// Cale fișier: src/lib/progressSocket.js
+
+// O singură conexiune /api/media/progress per tab, partajată de toate componentele
+// care afișează progresul procesării. Serverul trimite mesaje "media_progress_batch"
+// (mai multe fișiere într-un mesaj) și retrimite starea curentă la conectare.
+
+let socket = null;
+let socketUserId = null;
+let reconnectTimer = null;
+const listeners = new Map(); // mediaId -> Set(callback)
+const lastState = new Map(); // mediaId -> ultima stare primită
+
+const RECONNECT_DELAY_MS = 3000;
+
+const dispatch = (data) => {
+  if (!data || data.id === undefined) return;
+  lastState.set(data.id, data);
+  const callbacks = listeners.get(data.id);
+  if (callbacks) {
+    callbacks.forEach((callback) => callback(data));
+  }
+};
+
+const connect = (userId) => {
+  const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
+  const wsUrl = `${protocol}//${window.location.host}/api/media/progress/${userId}`;
+  const websocket = new WebSocket(wsUrl);
+  socket = websocket;
+  socketUserId = userId;
+
+  websocket.onmessage = (event) => {
+    try {
+      const message = JSON.parse(event.data);
+      if (message.type === 'media_progress_batch') {
+        message.data.forEach(dispatch);
+      } else if (message.type === 'media_progress') {
+        dispatch(message.data);
+      }
+    } catch (error) {
+      console.error('Eroare la parsarea mesajului WebSocket:', error);
+    }
+  };
+
+  websocket.onclose = () => {
+    if (socket !== websocket) return;
+    socket = null;
+    // Reconectare doar dacă mai există componente abonate
+    if (listeners.size > 0) {
+      reconnectTimer = setTimeout(() => {
+        reconnectTimer = null;
+        if (!socket && listeners.size > 0) connect(userId);
+      }, RECONNECT_DELAY_MS);
+    }
+  };
+
+  websocket.onerror = (error) => {
+    console.error('Eroare WebSocket progress:', error);
+  };
+};
+
+const closeSocket = () => {
+  if (reconnectTimer) {
+    clearTimeout(reconnectTimer);
+    reconnectTimer = null;
+  }
+  if (socket) {
+    const websocket = socket;
+    socket = null;
+    websocket.close();
+  }
+  socketUserId = null;
+};
+
+/**
+ * Abonează un callback la progresul unui fișier. Returnează funcția de dezabonare;
+ * conexiunea se închide când nu mai rămâne niciun abonat.
+ */
+export const subscribeToMediaProgress = (userId, mediaId, callback) => {
+  if (socketUserId !== null && socketUserId !== userId) {
+    closeSocket();
+  }
+  if (!listeners.has(mediaId)) {
+    listeners.set(mediaId, new Set());
+  }
+  listeners.get(mediaId).add(callback);
+  if (!socket && !reconnectTimer) {
+    connect(userId);
+  }
+  if (lastState.has(mediaId)) {
+    callback(lastState.get(mediaId));
+  }
+
+  return () => {
+    const callbacks = listeners.get(mediaId);
+    if (callbacks) {
+      callbacks.delete(callback);
+      if (callbacks.size === 0) listeners.delete(mediaId);
+    }
+    if (listeners.size === 0) {
+      closeSocket();
+      lastState.clear();
+    }
+  };
+};
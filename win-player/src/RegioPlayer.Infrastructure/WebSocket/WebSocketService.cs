@@ -145,8 +145,12 @@ public class WebSocketService : IWebSocketService
                     var message = Encoding.UTF8.GetString(buffer, 0, result.Count);
                     _logger.LogDebug("Message received: {Message}", message);
                     
-                    // Don't notify for ping messages
-                    if (!message.Contains("\"type\":\"ping\""))
+                    // Answer server pings so it can detect dead connections; don't notify for them
+                    if (message.Contains("\"type\":\"ping\""))
+                    {
+                        await SendAsync("{\"type\":\"pong\"}");
+                    }
+                    else
                     {
                         MessageReceived?.Invoke(message);
                     }